@@ -0,0 +1,63 @@
+"""
+Copies and memory of multi-MB binary secrets.
+
+`copies` is the peak of the memory allocated while loading (and then reading 16 chunks of 64 KB)
+divided by the payload size. The legacy path decoded the payload with base64 and handed out
+`bytes`, so every chunk read was another copy. The payload returned by botocore is not counted.
+The locked mmap region is allocated outside of the Python allocator: tracemalloc doesn't see its
+single copy, so it reports the allocations besides that copy (~0).
+"""
+import base64
+import tracemalloc
+
+from common import FakeSecretsClient, measure, report
+
+from supersecret import SecretManager
+
+CHUNK = 64 * 1024
+
+
+def legacy(payload: bytes):
+    data = base64.b64decode(payload)
+    return [data[i * CHUNK:(i + 1) * CHUNK] for i in range(16)]
+
+
+def zero_copy(client: FakeSecretsClient, lock: bool = False):
+    manager = SecretManager('binary', lock_binary=lock)
+    manager.load(client=client)
+    view = manager.binary()
+    chunks = [view[i * CHUNK:(i + 1) * CHUNK] for i in range(16)]
+    manager.close()
+    return chunks
+
+
+def copies(func, size: int) -> float:
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return round(peak / size, 2)
+
+
+def run(sizes_mb=(1, 4, 16)) -> list:
+    results = []
+    for size_mb in sizes_mb:
+        size = size_mb * 1024 * 1024
+        payload = bytes(size)
+        encoded = base64.b64encode(payload)
+        client = FakeSecretsClient()
+        client.put_binary('binary', payload)
+        results.append({
+            'size_mb': size_mb,
+            'legacy_base64': {'copies': copies(lambda: legacy(encoded), size),
+                              **measure(lambda: legacy(encoded), repeat=5)},
+            'bytearray': {'copies': copies(lambda: zero_copy(client), size),
+                          **measure(lambda: zero_copy(client), repeat=5)},
+            'locked_mmap': {'copies': copies(lambda: zero_copy(client, lock=True), size),
+                            **measure(lambda: zero_copy(client, lock=True), repeat=5)},
+        })
+    return results
+
+
+if __name__ == '__main__':
+    report('binary', run())
@@ -0,0 +1,65 @@
+"""
+Concurrency of `SecretManager` against the local fake Secrets Manager server (20ms per call).
+
+`reads` are cached reads from threads, asyncio tasks and processes (with threads and asyncio, a background
+thread reloads the secret every 50ms). `cold_start` is 32 threads reading from a manager that has not loaded yet, the
+number of GetSecretValue calls shows how many of them fetched. `throttled_refresh` is reloads with a
+deadline against a server throttling above 5 calls per second: the tier keeps being served.
+"""
+from functools import partial
+
+from common import report
+
+from supersecret import SecretManager
+from supersecret.testing import FakeSecretsManager, load_test
+
+DURATION = 0.5
+
+
+def secret_values(keys: int = 50) -> dict:
+    return {f'KEY_{i}': str(i) for i in range(keys)}
+
+
+def reads(server: FakeSecretsManager) -> list:
+    results = []
+    for mode in ('threads', 'asyncio', 'processes'):
+        manager = SecretManager('app', **server.aws_kwargs())
+        manager.load()
+        background = manager.reload if mode != 'processes' else None
+        results.append(load_test(partial(manager.str, 'KEY_0'), workers=8, duration=DURATION, mode=mode,
+                                 server=server, background=background, interval=0.05))
+        manager.close()
+    return results
+
+
+def cold_start(server: FakeSecretsManager) -> dict:
+    manager = SecretManager('app', **server.aws_kwargs())
+    manager.connect()  # Clients are created once, only the loads race
+    try:
+        return load_test(partial(manager.str, 'KEY_0'), workers=32, iterations=1, server=server)
+    finally:
+        manager.close()
+
+
+def throttled_refresh(server: FakeSecretsManager) -> dict:
+    manager = SecretManager('app', **server.aws_kwargs())
+    manager.load()
+    server.throttle(5.0, burst=1)
+    try:
+        return load_test(partial(manager.reload, deadline=0.1), workers=8, duration=DURATION, server=server)
+    finally:
+        server.throttle(None)
+        manager.close()
+
+
+def run() -> dict:
+    with FakeSecretsManager({'app': secret_values()}, latency=0.02) as server:
+        return {
+            'reads': reads(server),
+            'cold_start': cold_start(server),
+            'throttled_refresh': throttled_refresh(server),
+        }
+
+
+if __name__ == '__main__':
+    report('concurrency', run())
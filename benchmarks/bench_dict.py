@@ -0,0 +1,74 @@
+"""
+`dict()` over prefixes of a growing size.
+
+The prefix keys are nested two levels deep (`app__group{n}__key{m}`) and the secret also holds
+as many unrelated keys. `cold` clears the dict cache before every call, `cached` returns the shared
+dict (the environment has no key with the prefix).
+
+`blocks` counts the memory blocks still allocated per `dict()` call when every result is kept:
+`cold` builds a new tree, `cached` shares it and `reload` rebuilds it after one key changed
+(the unchanged groups are shared with the previous tree).
+"""
+import gc
+import sys
+
+from common import FakeSecretsClient, measure, report
+
+from supersecret import SecretManager
+
+
+def secret_values(size: int) -> dict:
+    values = {f'app__group{i // 10}__key{i % 10}': str(i) for i in range(size)}
+    values.update({f'other__{i}': str(i) for i in range(size)})
+    return values
+
+
+def blocks_per_call(func, number: int = 20) -> float:
+    """
+    Memory blocks held per call when the results are kept
+    """
+    results = []
+    gc.collect()
+    gc.disable()
+    try:
+        before = sys.getallocatedblocks()
+        for _ in range(number):
+            results.append(func())
+        return round((sys.getallocatedblocks() - before) / number, 1)
+    finally:
+        gc.enable()
+
+
+def run(sizes=(10, 100, 1000, 10000)) -> list:
+    results = []
+    for size in sizes:
+        values = secret_values(size)
+        client = FakeSecretsClient({'large': values})
+        manager = SecretManager('large', env={})
+        manager.load(client=client)
+        number = max(1, 10000 // size)
+
+        def cold():
+            manager._dicts.clear()
+            return manager.dict('app')
+
+        def reload():
+            values['app__group0__key0'] = str(int(values['app__group0__key0']) + 1)
+            client.put('large', values)
+            manager.reload()
+            return manager.dict('app')
+        results.append({
+            'keys': size,
+            'cold': measure(cold, repeat=5, number=number),
+            'cached': measure(lambda: manager.dict('app'), repeat=5, number=number),
+            'blocks': {
+                'cold': blocks_per_call(cold),
+                'cached': blocks_per_call(lambda: manager.dict('app')),
+                'reload': blocks_per_call(reload),
+            },
+        })
+    return results
+
+
+if __name__ == '__main__':
+    report('dict', run())
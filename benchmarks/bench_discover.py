@@ -0,0 +1,50 @@
+"""
+`discover()` against the equivalent sequential `load()` calls, with simulated AWS latency.
+
+`discover` lists the secrets once (then reuses the listing for its TTL) and fetches the tiers in parallel,
+so its cost should stay close to two round trips whatever the number of tiers.
+"""
+from common import FakeSecretsClient, measure, report
+
+from supersecret import SecretManager
+
+LATENCY = 0.02
+
+
+def build(tiers: int) -> FakeSecretsClient:
+    return FakeSecretsClient({f'org/tier-{tier:03}': {f'key__{i}': str(i) for i in range(50)} for tier in range(tiers)},
+                             latency=LATENCY)
+
+
+def run(tier_counts=(5, 10, 25)) -> list:
+    results = []
+    for tiers in tier_counts:
+        client = build(tiers)
+
+        def sequential():
+            manager = SecretManager()
+            for name in sorted(client.secrets):
+                manager.load(name, client=client)
+
+        def discover():
+            with SecretManager() as manager:
+                manager.discover('org/', client=client)
+
+        cached_manager = SecretManager()
+        cached_manager.discover('org/', client=client)
+
+        def rediscover():
+            cached_manager.discover('org/', client=client)  # Listing cached, tiers loaded
+        results.append({
+            'tiers': tiers,
+            'latency_ms': LATENCY * 1000,
+            'sequential_load': measure(sequential, repeat=3),
+            'discover': measure(discover, repeat=3),
+            'discover_cached': measure(rediscover, repeat=3, number=100),
+        })
+        cached_manager.close()
+    return results
+
+
+if __name__ == '__main__':
+    report('discover', run())
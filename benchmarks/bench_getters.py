@@ -0,0 +1,55 @@
+"""
+Every typed getter of `SecretManager`, on a cold conversion cache and on a warm one.
+
+`cold` clears the conversion cache before every call, so it measures the conversion itself;
+`cached` is the cost of a repeated read of an unchanged key.
+"""
+from common import FakeSecretsClient, measure, report
+
+from supersecret import SecretManager
+
+NUMBER = 2000
+
+VALUES = {
+    'str': 'value',
+    'int': '5432',
+    'float': '1.5',
+    'decimal': '1.50',
+    'bool': 'true',
+    'list': 'a,b,c,d,e,f,g,h',
+    'choices': 'a:A,b:B,c:C,d:D',
+    'datetime': '2023-01-01 12:00:00',
+    'date': '2023-01-01',
+    'time': '12:00:00',
+    'timedelta': '1:30:00',
+    'timedelta_seconds': '5400',
+    'uuid': '1b4e28ba-2fa1-41d2-883f-0016d3cca427',
+    'log_level': 'INFO',
+    'path': '/var/lib/app',
+}
+
+
+def build() -> SecretManager:
+    manager = SecretManager('getters')
+    manager.load(client=FakeSecretsClient({'getters': VALUES}))
+    return manager
+
+
+def run() -> dict:
+    manager = build()
+    results = {}
+    for getter, key in ((name, name) for name in VALUES):
+        read = getattr(manager, getter)
+
+        def cold():
+            manager._converted.clear()
+            read(key)
+        results[getter] = {
+            'cold': measure(cold, repeat=5, number=NUMBER),
+            'cached': measure(lambda: read(key), repeat=5, number=NUMBER),
+        }
+    return results
+
+
+if __name__ == '__main__':
+    report('getters', run())
@@ -0,0 +1,65 @@
+"""
+Eager vs lazy decoding of a secret string near the 64 KB Secrets Manager limit.
+
+The secret holds certificate-sized values and a few JSON blobs. A service typically reads
+two keys of it. Memory is the size of the allocations still held after the load and the two reads.
+"""
+import json
+import tracemalloc
+
+from common import FakeSecretsClient, measure, report
+
+from supersecret import SecretManager
+
+CERTIFICATE = '-----BEGIN CERTIFICATE-----\n' + 'MIIBIjANBgkqhkiG9w0BAQEFAAOCAQ8AMIIBCgKCAQEA\n' * 30
+
+
+def secret_values(size: int = 63 * 1024) -> dict:
+    values = {'DATABASE__host': 'db.example.com', 'DATABASE__port': '5432'}
+    i = 0
+    while len(json.dumps(values)) < size:
+        if i % 4:
+            values[f'cert_{i}'] = CERTIFICATE
+        else:
+            values[f'blob_{i}'] = {'keys': [f'key-{n}' for n in range(60)], 'enabled': True, 'limit': i}
+        i += 1
+    return values
+
+
+def load(client: FakeSecretsClient, lazy: bool) -> SecretManager:
+    manager = SecretManager('large', lazy=lazy)
+    manager.load(client=client)
+    return manager
+
+
+def read(manager: SecretManager):
+    manager.str('DATABASE__host')
+    manager.int('DATABASE__port')
+
+
+def retained_memory(client: FakeSecretsClient, lazy: bool) -> int:
+    response = client.get_secret_value('large')  # Keep the document allocation out of the measure
+    client.get_secret_value = lambda SecretId: dict(response)
+    tracemalloc.start()
+    manager = load(client, lazy)
+    read(manager)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del client.get_secret_value
+    return current
+
+
+def run() -> dict:
+    client = FakeSecretsClient({'large': secret_values()})
+    results = {'secret_bytes': len(client.secrets['large']), 'keys': len(secret_values())}
+    for mode, lazy in (('eager', False), ('lazy', True)):
+        results[mode] = {
+            'load': measure(lambda: load(client, lazy), repeat=7, number=20),
+            'load_and_read_two_keys': measure(lambda: read(load(client, lazy)), repeat=7, number=20),
+            'retained_bytes': retained_memory(client, lazy),
+        }
+    return results
+
+
+if __name__ == '__main__':
+    report('lazy', run())
@@ -0,0 +1,32 @@
+"""
+`load()` against a stubbed client with simulated AWS latency.
+
+`overhead_ms` is the load time minus the simulated latency: the parsing, DTO construction and
+index build cost of a tier.
+"""
+from common import FakeSecretsClient, measure, report
+
+from supersecret import SecretManager
+
+
+def run(latencies_ms=(0, 5, 50), key_counts=(10, 100, 1000)) -> list:
+    results = []
+    for latency_ms in latencies_ms:
+        for keys in key_counts:
+            client = FakeSecretsClient({'app': {f'key__{i}': f'value-{i}' for i in range(keys)}},
+                                       latency=latency_ms / 1000)
+
+            def load():
+                SecretManager('app').load(client=client)
+            timing = measure(load, repeat=5)
+            results.append({
+                'latency_ms': latency_ms,
+                'keys': keys,
+                'load': timing,
+                'overhead_ms': round(timing['best_ms'] - latency_ms, 4),
+            })
+    return results
+
+
+if __name__ == '__main__':
+    report('load', run())
@@ -0,0 +1,47 @@
+"""
+`value()` with a growing number of tiers.
+
+Every tier defines 200 keys, the key read is served by the top tier, the bottom tier, the
+environment, or the default. With the merged index the lookup cost should not depend on the
+number of tiers.
+"""
+from common import FakeSecretsClient, measure, report
+
+from supersecret import SecretManager
+
+KEYS_PER_TIER = 200
+NUMBER = 20000
+
+
+def tier_values(tier: int) -> dict:
+    values = {f'shared__{i}': f'{tier}-{i}' for i in range(KEYS_PER_TIER // 2)}
+    values.update({f'tier{tier}__{i}': str(i) for i in range(KEYS_PER_TIER // 2)})
+    return values
+
+
+def build(tiers: int) -> SecretManager:
+    client = FakeSecretsClient({f'tier-{tier}': tier_values(tier) for tier in range(tiers)})
+    manager = SecretManager('tier-0', env={'ENV_ONLY': 'value'})
+    for tier in range(tiers):
+        manager.load(f'tier-{tier}', client=client)
+    return manager
+
+
+def run(tier_counts=(1, 5, 10, 25, 50)) -> list:
+    results = []
+    for tiers in tier_counts:
+        manager = build(tiers)
+        top = f'tier{tiers - 1}__1'
+        results.append({
+            'tiers': tiers,
+            'top_tier': measure(lambda: manager.value(top), repeat=5, number=NUMBER),
+            'bottom_tier': measure(lambda: manager.value('tier0__1'), repeat=5, number=NUMBER),
+            'shared_key': measure(lambda: manager.value('shared__1'), repeat=5, number=NUMBER),
+            'env_fallback': measure(lambda: manager.value('ENV_ONLY'), repeat=5, number=NUMBER),
+            'default_fallback': measure(lambda: manager.value('missing', default=None), repeat=5, number=NUMBER),
+        })
+    return results
+
+
+if __name__ == '__main__':
+    report('lookup', run())
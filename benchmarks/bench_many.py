@@ -0,0 +1,53 @@
+"""
+`many()` against the equivalent per-key getter calls of a settings module.
+
+The keys cycle through str, int, bool and float values. `cold` clears the conversion cache before
+every call, so it measures the lookups and conversions; `cached` is a repeated read of unchanged keys.
+"""
+from common import FakeSecretsClient, measure, report
+
+from supersecret import SecretManager, fields
+
+NUMBER = 50
+
+KINDS = (('str', fields.Str, 'value'), ('int', fields.Int, '5432'), ('bool', fields.Bool, 'true'),
+         ('float', fields.Float, '1.5'))
+
+
+def build(keys: int):
+    kinds = [KINDS[i % len(KINDS)] for i in range(keys)]
+    values = {f'KEY_{i}': raw for i, (_, _, raw) in enumerate(kinds)}
+    manager = SecretManager('settings')
+    manager.load(client=FakeSecretsClient({'settings': values}))
+    getters = [(getattr(manager, getter), f'KEY_{i}') for i, (getter, _, _) in enumerate(kinds)]
+    spec = {f'KEY_{i}': field for i, (_, field, _) in enumerate(kinds)}
+    return manager, getters, spec
+
+
+def run(key_counts=(50, 100, 250, 500)) -> list:
+    results = []
+    for keys in key_counts:
+        manager, getters, spec = build(keys)
+
+        def per_key():
+            return {name: getter(name) for getter, name in getters}
+
+        def per_key_cold():
+            manager._converted.clear()
+            per_key()
+
+        def many_cold():
+            manager._converted.clear()
+            manager.many(spec)
+        results.append({
+            'keys': keys,
+            'per_key_cold': measure(per_key_cold, repeat=5, number=NUMBER),
+            'many_cold': measure(many_cold, repeat=5, number=NUMBER),
+            'per_key_cached': measure(per_key, repeat=5, number=NUMBER),
+            'many_cached': measure(lambda: manager.many(spec), repeat=5, number=NUMBER),
+        })
+    return results
+
+
+if __name__ == '__main__':
+    report('many', run())
@@ -0,0 +1,48 @@
+"""
+Overhead of the instrumentation on the hot paths (nanoseconds per call, best of 7).
+
+`index_probe` is the floor of a lookup (the merged index access `value()` ends with).
+`disabled_check` is what a disabled manager pays per hot path: one `self._metrics is not None`
+check, measured against an empty call. `enabled - disabled` is the cost of recording a lookup
+or a conversion cache hit.
+"""
+import timeit
+
+from common import FakeSecretsClient, report
+
+from supersecret import SecretManager
+
+NUMBER = 200000
+
+
+def manager(instrumented: bool) -> SecretManager:
+    client = FakeSecretsClient({'app': {'key': 'value', 'port': '5432'}})
+    result = SecretManager('app')
+    result.load(client=client)
+    if instrumented:
+        result.instrument()
+    return result
+
+
+def per_call_ns(func) -> float:
+    return round(min(timeit.repeat(func, repeat=7, number=NUMBER)) * 1e9 / NUMBER, 1)
+
+
+def run() -> dict:
+    disabled, enabled = manager(False), manager(True)
+    index = disabled._index
+    results = {
+        'disabled_check': round(per_call_ns(lambda: disabled._metrics is not None)
+                                - per_call_ns(lambda: disabled), 1),
+        'index_probe': per_call_ns(lambda: 'key' in index and index['key']),
+    }
+    for name, call in (('value', lambda m: m.value('key')), ('int_cached', lambda m: m.int('port'))):
+        results[name] = {
+            'disabled': per_call_ns(lambda: call(disabled)),
+            'enabled': per_call_ns(lambda: call(enabled)),
+        }
+    return results
+
+
+if __name__ == '__main__':
+    report('metrics', run())
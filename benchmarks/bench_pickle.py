@@ -0,0 +1,78 @@
+"""
+Time for a process pool to get ready, with and without handing a loaded manager to the workers.
+
+`refetch`: every worker creates its manager and loads the tiers (simulated AWS latency per call).
+`pickled`: the parent loads once and passes the manager to the workers, which unpickle the loaded tiers,
+the merged index and the conversion caches without any AWS call.
+Workers are started with `spawn` (the default on macOS and Windows), so the manager is really pickled.
+"""
+import multiprocessing
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from common import FakeSecretsClient, report
+
+from supersecret import SecretManager
+
+TIERS = 5
+KEYS_PER_TIER = 200
+LATENCY = 0.05
+
+_manager = None
+_calls = 0
+
+
+def secrets() -> dict:
+    return {f'tier-{tier}': {f'key__{i}': str(i) for i in range(KEYS_PER_TIER)} for tier in range(TIERS)}
+
+
+def load() -> tuple:
+    client = FakeSecretsClient(secrets(), latency=LATENCY)
+    manager = SecretManager('tier-0')
+    for tier in range(TIERS):
+        manager.load(f'tier-{tier}', client=client)
+    for i in range(KEYS_PER_TIER):
+        manager.int(f'key__{i}')
+    return manager, client.calls
+
+
+def init_refetch():
+    global _manager, _calls
+    _manager, _calls = load()
+
+
+def init_pickled(manager):
+    global _manager
+    _manager = manager
+
+
+def task(_) -> int:
+    _manager.int('key__1')
+    return _calls
+
+
+def ready_time(workers: int, initializer, initargs=()) -> dict:
+    start = time.perf_counter()
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(workers, mp_context=context, initializer=initializer, initargs=initargs) as executor:
+        calls = list(executor.map(task, range(workers * 4)))
+        elapsed = time.perf_counter() - start
+    return {'ready_ms': round(elapsed * 1000, 1), 'aws_calls_per_worker': max(calls)}
+
+
+def run(worker_counts=(2, 4)) -> list:
+    manager, _ = load()
+    results = []
+    for workers in worker_counts:
+        results.append({
+            'workers': workers,
+            'pickled_size_bytes': len(pickle.dumps(manager)),
+            'refetch': ready_time(workers, init_refetch),
+            'pickled': ready_time(workers, init_pickled, (manager,)),
+        })
+    return results
+
+
+if __name__ == '__main__':
+    report('pickle', run())
@@ -0,0 +1,54 @@
+"""
+Reload cost of one tier with a growing number of tiers.
+
+Every tier defines 500 keys, half of them shared with the other tiers. The reloaded tier
+changes all of its values. With the merged index the reload cost should stay flat while the
+total number of tiers (and keys) grows, and the caches of untouched keys are kept.
+"""
+from common import FakeSecretsClient, measure, report
+
+from supersecret import SecretManager
+
+KEYS_PER_TIER = 500
+
+
+def tier_values(tier: int, version: int = 0) -> dict:
+    values = {f'shared__{i}': f'{tier}-{version}-{i}' for i in range(KEYS_PER_TIER // 2)}
+    values.update({f'tier{tier}__{i}': f'{version}-{i}' for i in range(KEYS_PER_TIER // 2)})
+    return values
+
+
+def build(client: FakeSecretsClient, tiers: int) -> SecretManager:
+    manager = SecretManager('tier-0')
+    for tier in range(tiers):
+        manager.load(f'tier-{tier}', client=client)
+    return manager
+
+
+def run(tier_counts=(1, 5, 10, 20)) -> list:
+    results = []
+    for tiers in tier_counts:
+        client = FakeSecretsClient({f'tier-{tier}': tier_values(tier) for tier in range(tiers)})
+        manager = build(client, tiers)
+        for name in manager._index:
+            manager.str(name)
+        target = tiers // 2
+        version = iter(range(1, 1000))
+
+        def reload():
+            client.put(f'tier-{target}', tier_values(target, next(version)))
+            manager.reload(f'tier-{target}')
+
+        reload_timing = measure(reload, repeat=7)
+        results.append({
+            'tiers': tiers,
+            'keys': tiers * KEYS_PER_TIER,
+            'reload_one_tier': reload_timing,
+            'rebuild_all_tiers': measure(lambda: build(client, tiers), repeat=3),
+            'cached_conversions_kept': len(manager._converted),
+        })
+    return results
+
+
+if __name__ == '__main__':
+    report('reload', run())
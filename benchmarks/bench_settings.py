@@ -0,0 +1,59 @@
+"""
+Lazy settings against a settings module reading every value when it is imported.
+
+`startup` is the cost of building the settings with a simulated AWS latency: `eager` loads the secret
+and calls a getter per setting, `lazy` only declares them (what a `manage.py` command pays if it reads no
+setting). `read` is the cost of one read once resolved: a memoized attribute, a `LazyValue` proxy and the
+cached getter.
+"""
+from common import FakeSecretsClient, measure, report
+
+from supersecret import SecretManager, fields
+from supersecret.settings import SecretSettings, Setting
+
+NUMBER = 10000
+
+
+def settings_class(keys: int):
+    return type('Settings', (SecretSettings,), {f'KEY_{i}': Setting(fields.Int) for i in range(keys)})
+
+
+def startup(keys: int, latency: float) -> dict:
+    client = FakeSecretsClient({'settings': {f'KEY_{i}': str(i) for i in range(keys)}}, latency=latency)
+    settings = settings_class(keys)
+
+    def eager():
+        manager = SecretManager('settings')
+        manager.load(client=client)
+        return {f'KEY_{i}': manager.int(f'KEY_{i}') for i in range(keys)}
+
+    def lazy():
+        manager = SecretManager('settings')
+        manager.client = client
+        return settings(manager)
+    return {'eager': measure(eager), 'lazy': measure(lazy)}
+
+
+def read() -> dict:
+    manager = SecretManager('settings')
+    manager.load(client=FakeSecretsClient({'settings': {'KEY_0': '5432'}}))
+    settings = settings_class(1)(manager)
+    proxy = settings.lazy()['KEY_0']
+    settings.KEY_0
+    proxy + 0
+    return {
+        'attribute': measure(lambda: settings.KEY_0, number=NUMBER),
+        'proxy': measure(lambda: proxy + 0, number=NUMBER),
+        'getter': measure(lambda: manager.int('KEY_0'), number=NUMBER),
+    }
+
+
+def run(key_counts=(10, 100)) -> dict:
+    return {
+        'startup': [dict(keys=keys, **startup(keys, latency=0.02)) for keys in key_counts],
+        'read': read(),
+    }
+
+
+if __name__ == '__main__':
+    report('settings', run())
@@ -0,0 +1,56 @@
+"""
+Startup cost: `import supersecret` time and the memory held per loaded secret.
+
+The import time is the cumulative `-X importtime` figure of a fresh interpreter (best of 5).
+Memory is the size of the allocations still held after loading the secrets (eager and lazy),
+the responses of the stubbed client are built before the measure.
+"""
+import subprocess
+import sys
+import tracemalloc
+from pathlib import Path
+
+from common import FakeSecretsClient, report
+
+from supersecret import SecretManager
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def import_time_ms() -> float:
+    """
+    Cumulative import time of supersecret in a fresh interpreter
+    """
+    output = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import supersecret'],
+                            cwd=ROOT, capture_output=True, text=True, check=True).stderr
+    for line in output.splitlines():
+        parts = line.split('|')
+        if len(parts) == 3 and parts[2].strip() == 'supersecret':
+            return int(parts[1]) / 1000
+    raise RuntimeError('supersecret not found in the -X importtime output')
+
+
+def memory_per_secret(secrets: int, keys: int, lazy: bool) -> dict:
+    client = FakeSecretsClient({f'secret-{n}': {f'key__{i}': f'value-{n}-{i}' for i in range(keys)}
+                                for n in range(secrets)})
+    responses = {name: client.get_secret_value(name) for name in client.secrets}
+    client.get_secret_value = lambda SecretId: dict(responses[SecretId])
+    tracemalloc.start()
+    manager = SecretManager('secret-0', lazy=lazy)
+    for name in responses:
+        manager.load(name, client=client)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'bytes_per_secret': current // secrets, 'bytes_per_key': current // (secrets * keys)}
+
+
+def run() -> dict:
+    return {
+        'import_ms': round(min(import_time_ms() for _ in range(5)), 3),
+        'memory': [{'keys_per_secret': keys, 'eager': memory_per_secret(50, keys, False),
+                    'lazy': memory_per_secret(50, keys, True)} for keys in (10, 100)],
+    }
+
+
+if __name__ == '__main__':
+    report('startup', run())
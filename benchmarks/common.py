@@ -0,0 +1,84 @@
+"""
+Shared helpers for the benchmark scripts.
+
+Run a benchmark from the repository root, e.g. `python benchmarks/bench_reload.py`.
+Every benchmark prints its results as JSON.
+"""
+import datetime
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+class FakeSecretsClient:
+    """
+    In-memory stand-in for the boto3 Secrets Manager client
+    """
+
+    def __init__(self, secrets: dict = None, latency: float = 0.0):
+        self.secrets = {}
+        self.versions = {}
+        self.latency = latency
+        self.calls = 0
+        for name, values in (secrets or {}).items():
+            self.put(name, values)
+
+    def put(self, name: str, values: dict):
+        self.versions[name] = self.versions.get(name, 0) + 1
+        self.secrets[name] = json.dumps(values)
+
+    def put_binary(self, name: str, payload: bytes):
+        self.versions[name] = self.versions.get(name, 0) + 1
+        self.secrets[name] = payload
+
+    def get_secret_value(self, SecretId, **kwargs):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        secret = self.secrets[SecretId]
+        return {
+            'ARN': f'arn:aws:secretsmanager:us-east-1:123456789012:secret:{SecretId}',
+            'Name': SecretId,
+            'VersionId': str(self.versions[SecretId]),
+            'SecretBinary' if isinstance(secret, bytes) else 'SecretString': secret,
+            'VersionStages': ['AWSCURRENT'],
+            'CreatedDate': datetime.datetime.now(),
+            'ResponseMetadata': {'RequestId': 'benchmark', 'HTTPStatusCode': 200, 'HTTPHeaders': {},
+                                 'RetryAttempts': 0},
+        }
+
+    def get_paginator(self, operation: str):
+        assert operation == 'list_secrets'
+        return self
+
+    def paginate(self, **kwargs):
+        """
+        ListSecrets pages (the filters are ignored, every secret is listed)
+        """
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        names = list(self.secrets)
+        for start in range(0, len(names), kwargs.get('MaxResults', 100)):
+            yield {'SecretList': [{'Name': name} for name in names[start:start + kwargs.get('MaxResults', 100)]]}
+
+
+def measure(func, repeat: int = 5, number: int = 1) -> dict:
+    """
+    Time `func` and return the median and best time per call in milliseconds
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - start) * 1000 / number)
+    return {'median_ms': round(statistics.median(timings), 6), 'best_ms': round(min(timings), 6)}
+
+
+def report(name: str, results):
+    print(json.dumps({'benchmark': name, 'results': results}, indent=2, default=str))
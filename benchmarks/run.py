@@ -0,0 +1,91 @@
+"""
+Run the benchmark suite and write the results as JSON.
+
+    python benchmarks/run.py --output results.json            # every benchmark
+    python benchmarks/run.py --only lookup getters            # a subset
+    python benchmarks/run.py --output new.json --compare old.json
+
+`--compare` prints the ratio (new / old) of every `best_ms` timing found in both result files,
+e.g. to compare two commits. Ratios above 1 are slower.
+"""
+import argparse
+import datetime
+import importlib
+import json
+import platform
+import subprocess
+import sys
+from pathlib import Path
+
+from common import report
+
+BENCHMARKS = ('startup', 'load', 'lookup', 'getters', 'dict', 'reload', 'lazy', 'binary', 'metrics', 'pickle',
+              'many', 'discover', 'settings', 'concurrency')
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=Path(__file__).parent,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def run(names) -> dict:
+    results = {}
+    for name in names:
+        print(f'Running {name}...', file=sys.stderr)
+        results[name] = importlib.import_module(f'bench_{name}').run()
+    return {
+        'meta': {
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'date': datetime.datetime.now().isoformat(),
+        },
+        'benchmarks': results,
+    }
+
+
+def timings(results, path: str = '') -> dict:
+    """
+    Flatten the `best_ms` timings of a result tree into {path: milliseconds}
+    """
+    if isinstance(results, dict):
+        if 'best_ms' in results:
+            return {path: results['best_ms']}
+        items = results.items()
+    elif isinstance(results, list):
+        items = ((str(i), item) for i, item in enumerate(results))
+    else:
+        return {}
+    flat = {}
+    for key, value in items:
+        flat.update(timings(value, f'{path}/{key}' if path else key))
+    return flat
+
+
+def compare(old: dict, new: dict) -> dict:
+    old_timings, new_timings = timings(old['benchmarks']), timings(new['benchmarks'])
+    return {path: round(new_timings[path] / old_timings[path], 3)
+            for path in new_timings if old_timings.get(path)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--only', nargs='+', choices=BENCHMARKS, default=BENCHMARKS)
+    parser.add_argument('--output', type=Path, help='Write the results to this file (default: stdout)')
+    parser.add_argument('--compare', type=Path, help='Results file to compare with')
+    args = parser.parse_args(argv)
+
+    results = run(args.only)
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2, default=str))
+    else:
+        print(json.dumps(results, indent=2, default=str))
+    if args.compare:
+        report('compare', compare(json.loads(args.compare.read_text()), results))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,6 @@
 # Version of the supersecret library
 
-__version__ = "1.1.0"
+__version__ = "2.0.0"
 
 from .manager import SecretManager  # noqa: F401
 
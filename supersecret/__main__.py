@@ -0,0 +1,9 @@
+"""
+`python -m supersecret`, see `supersecret.cli`
+"""
+import sys
+
+from .cli import main
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""
+Binary secrets (`SecretBinary`).
+
+The payload is copied once into a zeroable buffer (a `bytearray`, or an anonymous `mmap` locked in
+memory with `mlock`) and exposed as read-only `memoryview`s without further copies.
+The buffer is zeroed when the tier is replaced or the manager is closed.
+"""
+import base64
+import ctypes
+import ctypes.util
+import mmap
+
+_libc = None
+
+
+def _mlock_functions():
+    global _libc
+    if _libc is None:
+        _libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        for function in (_libc.mlock, _libc.munlock):
+            function.argtypes = (ctypes.c_void_p, ctypes.c_size_t)
+            function.restype = ctypes.c_int
+    return _libc.mlock, _libc.munlock
+
+
+def _address(buffer) -> ctypes.Array:
+    return (ctypes.c_char * len(buffer)).from_buffer(buffer)
+
+
+class BinaryValues:
+    """
+    The payload of a binary secret tier. It has no keys, read it with `view()`.
+    """
+
+    def __init__(self, buffer, locked: bool = False):
+        self._buffer = buffer
+        self.locked = locked
+        self.closed = False
+
+    @classmethod
+    def from_payload(cls, payload, lock: bool = False) -> 'BinaryValues':
+        """
+        Copy a payload (raw bytes, or base64 text) into a zeroable buffer.
+        With `lock`, the buffer is an anonymous mmap locked in memory (best effort: `locked` tells
+        if `mlock` succeeded, e.g. it fails above RLIMIT_MEMLOCK).
+        """
+        if isinstance(payload, str):
+            payload = base64.b64decode(payload)
+        if not lock or not payload:
+            return cls(bytearray(payload))
+        buffer = mmap.mmap(-1, len(payload))
+        buffer.write(payload)
+        return cls(buffer, locked=cls._lock(buffer))
+
+    @staticmethod
+    def _lock(buffer) -> bool:
+        try:
+            mlock, _ = _mlock_functions()
+            return mlock(ctypes.addressof(_address(buffer)), len(buffer)) == 0
+        except (OSError, AttributeError, TypeError, ctypes.ArgumentError):
+            return False
+
+    def view(self) -> memoryview:
+        """
+        A read-only view of the payload (no copy)
+        """
+        if self.closed:
+            raise ValueError('The binary secret was closed')
+        return memoryview(self._buffer).toreadonly()
+
+    def __len__(self):
+        return len(self._buffer)
+
+    def __bytes__(self):
+        return bytes(self._buffer)
+
+    def __contains__(self, item):
+        return False
+
+    def __repr__(self):
+        return f'<BinaryValues {len(self)} bytes{" locked" if self.locked else ""}{" closed" if self.closed else ""}>'
+
+    def __reduce__(self):
+        return self.__class__.from_payload, (bytes(self._buffer), self.locked)
+
+    def close(self):
+        """
+        Zero the payload and release the buffer.
+        Views handed out before keep pointing at the zeroed memory.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        if len(self._buffer):
+            ctypes.memset(_address(self._buffer), 0, len(self._buffer))
+        if isinstance(self._buffer, mmap.mmap):
+            if self.locked:
+                _, munlock = _mlock_functions()
+                munlock(ctypes.addressof(_address(self._buffer)), len(self._buffer))
+            try:
+                self._buffer.close()
+            except BufferError:
+                pass  # Views are still exported, the zeroed mapping is released with them
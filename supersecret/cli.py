@@ -0,0 +1,192 @@
+"""
+Command line interface: `python -m supersecret`.
+
+    python -m supersecret dump my-default my-service              # Merged keys (redacted) and their tier
+    python -m supersecret snapshot my-default my-service -o /opt/secrets.snapshot
+    python -m supersecret bench my-default my-service             # Micro-benchmarks against these tiers
+
+The tiers are fetched in parallel and merged in the given order (the last one has the highest precedence)
+by `load_many`, like an application loads them, so `bench` measures the library's own pipeline.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from typing import List
+
+from botocore.exceptions import BotoCoreError
+
+from . import __version__, fields
+from .exceptions import BaseSecretsManagerException
+from .manager import SecretManager
+
+REDACTED = '********'
+
+
+def measure(func, repeat: int = 5, number: int = 1) -> dict:
+    """
+    Time `func` and return the median and best time per call in milliseconds
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - start) * 1000 / number)
+    return {'median_ms': round(statistics.median(timings), 6), 'best_ms': round(min(timings), 6)}
+
+
+def build_manager(args) -> SecretManager:
+    aws_kwargs = {'region_name': args.region} if args.region else {}
+    return SecretManager(args.secrets[0] if args.secrets else None, **aws_kwargs)
+
+
+def load(manager: SecretManager, args) -> List[str]:
+    """
+    Load the discovered tiers, then the named ones. Tiers that could not be fetched are reported on stderr.
+    :return: The loaded tier names in precedence order
+    """
+    names = []
+    if args.discover is not None:
+        names.extend(manager.discover(args.discover, required=args.required, max_workers=args.max_workers,
+                                      deadline=args.deadline))
+    secret_names = list(args.secrets)
+    if not secret_names and args.discover is None:
+        secret_names = [manager.default_secret_name]
+    tiers = manager.load_many(secret_names, required=args.required, max_workers=args.max_workers,
+                              deadline=args.deadline)
+    degraded = manager.degraded
+    for name, tier in zip(secret_names, tiers):
+        if name in degraded:
+            print(f'{name}: missed the deadline, served by: {degraded[name]}', file=sys.stderr)
+        elif tier is None:
+            print(f'{name}: could not be fetched', file=sys.stderr)
+    names.extend(secret_names)
+    return [name for name in dict.fromkeys(names) if name in manager._secrets]
+
+
+def dump(manager: SecretManager, args) -> int:
+    """
+    Print the effective keys with the tier serving them (values are redacted unless --reveal)
+    """
+    load(manager, args)
+    config = {key: {'tier': tier, 'value': str(manager.value(key)) if args.reveal else REDACTED}
+              for key, tier in sorted(manager.owners().items()) if key.startswith(args.prefix or '')}
+    if args.json:
+        print(json.dumps(config, indent=2))
+        return 0
+    width = max((len(key) for key in config), default=0)
+    tier_width = max((len(item['tier']) for item in config.values()), default=0)
+    for key, item in config.items():
+        print(f'{key:<{width}}  {item["tier"]:<{tier_width}}  {item["value"]}')
+    return 0
+
+
+def snapshot(manager: SecretManager, args) -> int:
+    """
+    Write the loaded tiers to a snapshot file (see `SecretManager.from_snapshot`)
+    """
+    names = load(manager, args)
+    key = None
+    if args.key_file:
+        with open(args.key_file, 'rb') as file:
+            key = file.read()
+    manager.export_snapshot(args.output, key=key)
+    print(f'Wrote {len(names)} tiers ({len(manager.owners())} keys) to {args.output}', file=sys.stderr)
+    return 0
+
+
+def bench(manager: SecretManager, args) -> int:
+    """
+    Time connecting, loading and reading the tiers from this environment, print the results as JSON
+    """
+    names = load(manager, args)
+    client = manager.connect()
+    keys = [key for key in manager.owners() if isinstance(manager.value(key), str)]
+    repeat, number = args.repeat, args.number
+
+    def load_tiers(instrument=False):
+        fresh = SecretManager(manager.default_secret_name, **manager.aws_kwargs)
+        fresh.client = client  # Only the fetches are timed, not the connection
+        if instrument:
+            fresh.instrument()
+        try:
+            fresh.load_many(names, max_workers=args.max_workers)
+            return fresh.stats()
+        finally:
+            fresh.close()
+
+    def read_snapshot():
+        restored = SecretManager.from_snapshot(path)
+        for key in keys:
+            restored.value(key)
+
+    spec = {key: fields.Str for key in keys}
+    results = {
+        'connect': measure(lambda: SecretManager(**manager.aws_kwargs).connect(), repeat=repeat),
+        'load_many': measure(load_tiers, repeat=repeat),
+        'lookup': measure(lambda: [manager.value(key) for key in keys], repeat=repeat, number=number),
+        'str': measure(lambda: [manager.str(key) for key in keys], repeat=repeat, number=number),
+        'many': measure(lambda: manager.many(spec), repeat=repeat, number=number),
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'secrets.snapshot')
+        results['export_snapshot'] = measure(lambda: manager.export_snapshot(path), repeat=repeat)
+        results['from_snapshot'] = measure(read_snapshot, repeat=repeat)
+    results['aws'] = load_tiers(instrument=True)['aws']
+    print(json.dumps({
+        'meta': {'version': __version__, 'python': platform.python_version(), 'tiers': names, 'keys': len(keys)},
+        'results': results,
+    }, indent=2))
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='python -m supersecret', description='Fetch, dump and snapshot secret tiers')
+    parser.add_argument('--version', action='version', version=__version__)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    def command(name, func, help):
+        subparser = commands.add_parser(name, help=help, description=help)
+        subparser.set_defaults(func=func)
+        subparser.add_argument('secrets', nargs='*', help='Secret names in precedence order (default: $SECRET_NAME)')
+        subparser.add_argument('--discover', metavar='PREFIX', help='Also load the secrets with this name prefix '
+                                                                    '(below the named secrets)')
+        subparser.add_argument('--region', help='AWS region (default: $AWS_REGION or us-east-1)')
+        subparser.add_argument('--deadline', type=float, help='Seconds to wait for the tiers')
+        subparser.add_argument('--max-workers', type=int, help='Parallel fetches (default: 16)')
+        subparser.add_argument('--required', action='store_true', help='Fail if a tier cannot be fetched')
+        return subparser
+
+    subparser = command('dump', dump, 'Print the merged keys and the tier serving each of them')
+    subparser.add_argument('--prefix', help='Only the keys starting with this prefix')
+    subparser.add_argument('--reveal', action='store_true', help='Print the values instead of redacting them')
+    subparser.add_argument('--json', action='store_true', help='Print JSON')
+
+    subparser = command('snapshot', snapshot, 'Write the tiers to a snapshot file, e.g. when baking an image')
+    subparser.add_argument('-o', '--output', required=True, help='The snapshot file path')
+    subparser.add_argument('--key-file', help='File holding the AES key (16, 24 or 32 bytes) to encrypt with')
+
+    subparser = command('bench', bench, 'Time loading and reading the tiers from this environment')
+    subparser.add_argument('--repeat', type=int, default=5, help='Timed runs of every benchmark (default: 5)')
+    subparser.add_argument('--number', type=int, default=100, help='Reads per run (default: 100)')
+    return parser
+
+
+def main(argv: List[str] = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    manager = build_manager(args)
+    if not args.secrets and manager.default_secret_name is None and args.discover is None:
+        parser.error('no secret name: pass secret names, --discover or set SECRET_NAME')
+    try:
+        return args.func(manager, args)
+    except manager.provider.ERRORS + (BotoCoreError, BaseSecretsManagerException, OSError) as error:
+        print(f'supersecret: {error}', file=sys.stderr)
+        return 1
+    finally:
+        manager.close()
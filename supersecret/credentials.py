@@ -0,0 +1,172 @@
+"""
+Cross-account and cross-region tiers.
+
+A `TierSpec` tells the manager to fetch a tier with the credentials of an assumed role and/or in another
+region: `SecretManager(tier_specs={"shared": TierSpec(role_arn=..., region="eu-west-1")})`.
+
+The `ClientPool` caches the assumed role credentials in process, refreshing them `refresh_margin` seconds
+before they expire, and keeps one client per (account, role, region, service, connection kwargs). Every manager
+of a process shares `CLIENT_POOL` by default, so only the first manager pays the `AssumeRole` round trip;
+managers with other credentials or another endpoint get their own credentials and clients.
+"""
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Mapping, Optional, Tuple
+
+from botocore.client import BaseClient
+
+# Connection kwargs replaced by the assumed role credentials
+CREDENTIAL_KWARGS = ('aws_access_key_id', 'aws_secret_access_key', 'aws_session_token')
+
+
+@dataclass(frozen=True)
+class TierSpec:
+    """
+    Role and region of a tier (None: the manager's credentials or region)
+    """
+    role_arn: Optional[str] = None
+    region: Optional[str] = None
+    external_id: Optional[str] = None
+    session_name: str = 'supersecret'
+    duration: int = 3600  # Seconds, the assumed role credentials are refreshed before they expire
+
+    @property
+    def account(self) -> Optional[str]:
+        """
+        Account id of the role (arn:aws:iam::123456789012:role/name -> 123456789012)
+        """
+        if self.role_arn is None:
+            return None
+        parts = self.role_arn.split(':')
+        return parts[4] if len(parts) > 5 else None
+
+
+@dataclass(frozen=True)
+class Credentials:
+    access_key_id: str
+    secret_access_key: str
+    session_token: str
+    expiration: float  # Epoch seconds
+
+    def as_kwargs(self) -> dict:
+        return {'aws_access_key_id': self.access_key_id, 'aws_secret_access_key': self.secret_access_key,
+                'aws_session_token': self.session_token}
+
+
+def kwargs_fingerprint(aws_kwargs: Mapping) -> tuple:
+    """
+    Hashable identity of connection kwargs, except the region (credentials, endpoint_url, config, ...).
+    Unhashable values are keyed by their repr.
+    """
+    items = []
+    for name in sorted(aws_kwargs):
+        if name == 'region_name':
+            continue
+        value = aws_kwargs[name]
+        try:
+            hash(value)
+        except TypeError:
+            value = repr(value)
+        items.append((name, value))
+    return tuple(items)
+
+
+_FACTORY_LOCK = threading.Lock()
+
+
+def default_client_factory(service: str, **kwargs) -> BaseClient:
+    import boto3
+    with _FACTORY_LOCK:  # Pooled clients are built from the fetch threads, the default session isn't thread safe
+        return boto3.client(service, **kwargs)
+
+
+class ClientPool:
+    """
+    Assumed role credentials and the clients built with them, shared by the managers of a process
+    """
+
+    def __init__(self, sts_client: BaseClient = None, client_factory: Callable[..., BaseClient] = None,
+                 refresh_margin: float = 300.0):
+        """
+        :param sts_client: The STS client (default: one per connection kwargs, created on first use)
+        :param client_factory: Called with `(service, **kwargs)` to build a client (default: boto3.client)
+        :param refresh_margin: Refresh the credentials this many seconds before they expire
+        """
+        self.sts_client = sts_client
+        self.client_factory = client_factory or default_client_factory
+        self.refresh_margin = refresh_margin
+        self._sts_clients: Dict[tuple, BaseClient] = {}  # kwargs fingerprint -> STS client
+        self._credentials: Dict[tuple, Credentials] = {}
+        self._clients: Dict[tuple, Tuple[BaseClient, Optional[Credentials]]] = {}
+        self._lock = threading.Lock()
+        self._role_locks: Dict[tuple, threading.Lock] = {}  # One AssumeRole call at a time per role
+
+    def credentials(self, spec: TierSpec, **aws_kwargs) -> Credentials:
+        """
+        Credentials of the role of `spec`, assumed again when they expire within `refresh_margin`
+        :param aws_kwargs: The connection kwargs the role is assumed with (cached separately)
+        """
+        key = (spec.role_arn, spec.external_id, spec.session_name, spec.duration, kwargs_fingerprint(aws_kwargs))
+        with self._lock:
+            role_lock = self._role_locks.setdefault(key, threading.Lock())
+        with role_lock:
+            credentials = self._credentials.get(key)
+            if credentials is None or credentials.expiration - time.time() < self.refresh_margin:
+                credentials = self._assume_role(spec, **aws_kwargs)
+                self._credentials[key] = credentials
+            return credentials
+
+    def _assume_role(self, spec: TierSpec, **aws_kwargs) -> Credentials:
+        sts_client = self.sts_client
+        if sts_client is None:
+            fingerprint = kwargs_fingerprint(aws_kwargs)
+            with self._lock:
+                sts_client = self._sts_clients.get(fingerprint)
+                if sts_client is None:
+                    sts_client = self._sts_clients[fingerprint] = self.client_factory('sts', **aws_kwargs)
+        kwargs = {'RoleArn': spec.role_arn, 'RoleSessionName': spec.session_name, 'DurationSeconds': spec.duration}
+        if spec.external_id is not None:
+            kwargs['ExternalId'] = spec.external_id
+        response = sts_client.assume_role(**kwargs)['Credentials']
+        return Credentials(
+            access_key_id=response['AccessKeyId'],
+            secret_access_key=response['SecretAccessKey'],
+            session_token=response['SessionToken'],
+            expiration=response['Expiration'].timestamp(),
+        )
+
+    def client(self, service: str, spec: TierSpec, **aws_kwargs) -> BaseClient:
+        """
+        Client of `service` for the role and region of `spec`, rebuilt when the credentials are refreshed
+        :param aws_kwargs: The manager's connection kwargs (its credentials are replaced by the role's),
+            callers with other kwargs get another client
+        """
+        region = spec.region or aws_kwargs.get('region_name')
+        credentials = self.credentials(spec, **aws_kwargs) if spec.role_arn else None
+        key = (spec.account, spec.role_arn, region, service, kwargs_fingerprint(aws_kwargs))
+        with self._lock:
+            pooled = self._clients.get(key)
+            if pooled is not None and pooled[1] is credentials:
+                return pooled[0]
+        kwargs = dict(aws_kwargs, region_name=region)
+        if credentials is not None:
+            for name in CREDENTIAL_KWARGS:
+                kwargs.pop(name, None)
+            kwargs.update(credentials.as_kwargs())
+        client = self.client_factory(service, **kwargs)
+        with self._lock:
+            self._clients[key] = (client, credentials)
+        return client
+
+    def clear(self):
+        """
+        Drop the cached credentials and clients
+        """
+        with self._lock:
+            self._sts_clients.clear()
+            self._credentials.clear()
+            self._clients.clear()
+
+
+CLIENT_POOL = ClientPool()
@@ -43,11 +43,15 @@ class SecretValues:
     data: dataclasses.field(default_factory=AttrDict) = None
 
     def __post_init__(self):
-        [setattr(self, k, v) for k, v in self.data.items()]
+        if isinstance(self.data, dict):  # Lazy mappings are resolved by __getattr__ on access
+            [setattr(self, k, v) for k, v in self.data.items()]
 
     def __getattr__(self, item):
-        if item in self.data:
-            return self.data[item]
+        if item.startswith('__'):  # Protocol lookups (e.g. by pickle) before `data` is set
+            raise AttributeError(item)
+        data = self.__dict__.get('data')
+        if data is not None and item in data:
+            return data[item]
         raise KeyError(f'Key "{item}" is not found.')
 
     def __getitem__(self, item):
@@ -68,6 +72,7 @@ class ResponseMetadata:
     HTTPStatusCode: int
     RequestId: str
     RetryAttempts: int
+    MaxAttemptsReached: bool = False  # Set by botocore when the last retry attempt was made
 
 
 @nested_dataclass
@@ -80,3 +85,4 @@ class GetValue:
     VersionStages: List[str]
     CreatedDate: datetime
     ResponseMetadata: ResponseMetadata
+    Stages: Dict[str, 'GetValue'] = None  # Versions of the other stages fetched with the tier, by stage
@@ -0,0 +1,59 @@
+"""
+Frozen environment snapshot
+"""
+from collections.abc import Mapping
+from typing import Optional
+
+
+class EnvSnapshot(Mapping):
+    """
+    A frozen copy of the environment with a case-folded lookup table.
+
+    `lookup(name)` resolves `name` and then `name.upper()` (like the live environment fallback)
+    with a single probe of the table. Keys are also grouped by their first `__` segment so
+    `SecretManager.dict` doesn't have to scan the whole environment.
+    """
+
+    def __init__(self, source: Mapping):
+        self._values = dict(source)
+        self._folded = {}
+        self._by_head = {}
+        for key, value in self._values.items():
+            self._folded.setdefault(key.casefold(), {})[key] = value
+            head, separator, _ = key.partition('__')
+            if separator:
+                self._by_head.setdefault(head, {})[key] = value
+
+    def __getitem__(self, key):
+        return self._values[key]
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __len__(self):
+        return len(self._values)
+
+    def __repr__(self):
+        return f'<EnvSnapshot {len(self)} keys>'
+
+    def lookup(self, name: str) -> Optional[str]:
+        """
+        Value of `name` or `name.upper()`, None if neither is set
+        """
+        candidates = self._folded.get(name.casefold())
+        if candidates is None:
+            return None
+        value = candidates.get(name)
+        if value is None:
+            value = candidates.get(name.upper())
+        return value
+
+    def with_prefix(self, prefix: str) -> dict:
+        """
+        Keys starting with `{prefix}__` or `{PREFIX}__`
+        """
+        head = prefix.partition('__')[0]
+        found = dict(self._by_head.get(head, {}))
+        found.update(self._by_head.get(head.upper(), {}))
+        filters = (f'{prefix}__', f'{prefix}__'.upper())
+        return {key: value for key, value in found.items() if key.startswith(filters)}
@@ -46,3 +46,15 @@ class ResourceNotFoundException(BaseSecretsManagerException):
     """
     We can't find the resource that you asked for. Deal with the exception here, and/or rethrow at your discretion.
     """
+
+
+class InvalidSnapshotException(BaseSecretsManagerException):
+    """
+    The snapshot file is not valid, uses an unsupported format version or can't be decrypted.
+    """
+
+
+class DeadlineExceededException(BaseSecretsManagerException):
+    """
+    A required secret could not be fetched before the deadline and has no last-known-good version.
+    """
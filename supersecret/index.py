@@ -0,0 +1,181 @@
+"""
+Merged index of the tier stack.
+
+The index records which tier currently serves every key so lookups are a single probe
+and a change to one tier only touches the keys that tier defines (or used to define).
+"""
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Mapping, Optional, Tuple
+
+from .util import same_value
+
+# key -> (mapping that served the key before, mapping that serves it now)
+Moves = Dict[str, Tuple[Optional[Mapping], Optional[Mapping]]]
+
+
+@dataclass(frozen=True)
+class ChangeSet:
+    """
+    Difference of the effective merged values after a tier changed.
+
+    * `added`: key -> new value
+    * `removed`: key -> old value
+    * `changed`: key -> (old value, new value)
+    """
+    added: Dict[str, Any] = field(default_factory=dict)
+    removed: Dict[str, Any] = field(default_factory=dict)
+    changed: Dict[str, Tuple[Any, Any]] = field(default_factory=dict)
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed)
+
+    def keys(self) -> set:
+        return set(self.added) | set(self.removed) | set(self.changed)
+
+    @classmethod
+    def from_moves(cls, moves: Moves, keys: Iterable[str] = None) -> 'ChangeSet':
+        """
+        Build a change set from index moves, only comparing values for `keys` (default: all moved keys)
+        """
+        changes = cls()
+        for key in (moves if keys is None else keys):
+            before, after = moves[key]
+            if before is None and after is None:
+                continue
+            if before is None:
+                changes.added[key] = after[key]
+            elif after is None:
+                changes.removed[key] = before[key]
+            else:
+                old, new = before[key], after[key]
+                if old != new:
+                    changes.changed[key] = (old, new)
+        return changes
+
+
+class MergedIndex:
+    """
+    Maps every key of the tier stack to the tier that serves it.
+    Tiers are ordered lowest precedence first, the last tier wins.
+
+    Lookups take no lock: `set_tier` builds the new key map off to the side and installs it with a single
+    assignment (copy-on-write), so a reader sees either the previous or the new stack, never a mix.
+    Writers are serialized by the caller.
+    """
+
+    def __init__(self):
+        self._tiers = OrderedDict()  # name -> values, replaced (not changed) by set_tier
+        self._served = {}  # key -> (name of the tier serving it, its values), replaced (not changed) by set_tier
+        self._order = []
+        self._rank = {}
+        self.version = 0  # Incremented after every change of the key map
+
+    def __contains__(self, key):
+        return key in self._served
+
+    def __getitem__(self, key):
+        return self._served[key][1][key]
+
+    def __len__(self):
+        return len(self._served)
+
+    def __iter__(self):
+        return iter(self._served)
+
+    def get(self, key, default=None):
+        """
+        Value of `key`, or `default` if no tier defines it (a single consistent lookup)
+        """
+        served = self._served.get(key)
+        if served is None:
+            return default
+        return served[1][key]
+
+    def owner(self, key) -> Optional[str]:
+        """
+        Name of the tier currently serving `key`
+        """
+        served = self._served.get(key)
+        return served[0] if served is not None else None
+
+    def tier(self, name) -> Mapping:
+        return self._tiers[name]
+
+    def tiers(self) -> list:
+        """
+        (name, values) of the tiers, lowest precedence first
+        """
+        return list(self._tiers.items())
+
+    def set_tier(self, name: str, values: Mapping) -> Moves:
+        """
+        Add a new tier on top of the stack, or replace an existing tier in place.
+        Only keys defined by the new or the previous version of the tier are recomputed.
+        :return: The keys whose effective value changed
+        """
+        previous = self._tiers.get(name)
+        tiers = self._tiers.copy()
+        tiers[name] = values
+        served = self._served.copy()
+        if previous is None:
+            self._rank[name] = len(self._order)
+            self._order.append(name)
+            moves = self._push(served, name, values)
+        else:
+            moves = self._replace(tiers, served, name, previous, values)
+        self._tiers = tiers
+        self._served = served
+        self.version += 1
+        return moves
+
+    def clear(self):
+        self._tiers = OrderedDict()
+        self._served = {}
+        self._order = []
+        self._rank = {}
+        self.version += 1
+
+    @staticmethod
+    def _push(served, name, values) -> Moves:
+        moves = {}
+        entry = (name, values)
+        for key in values:
+            before = served.get(key)
+            served[key] = entry
+            before = before[1] if before is not None else None
+            if before is None or not same_value(before, values, key):
+                moves[key] = (before, values)
+        return moves
+
+    def _replace(self, tiers, served, name, previous, values) -> Moves:
+        rank = self._rank[name]
+        entry = (name, values)
+        moves = {}
+        for key in previous.keys() | values.keys():
+            owner, before = served.get(key, (None, None))
+            if owner is not None and owner != name and self._rank[owner] > rank:
+                continue  # Shadowed by a higher tier, the effective value is unchanged
+            if owner == name:
+                before = previous
+            if key in values:
+                served[key] = entry
+                after = values
+            else:
+                new_owner = self._find_below(tiers, key, rank)
+                if new_owner is None:
+                    served.pop(key, None)
+                    after = None
+                else:
+                    after = tiers[new_owner]
+                    served[key] = (new_owner, after)
+            if before is None or after is None or not same_value(before, after, key):
+                moves[key] = (before, after)
+        return moves
+
+    def _find_below(self, tiers, key, rank) -> Optional[str]:
+        for i in range(rank - 1, -1, -1):
+            name = self._order[i]
+            if key in tiers[name]:
+                return name
+        return None
@@ -0,0 +1,165 @@
+"""
+Lazy decoding of JSON secret strings.
+
+`LazyJSONObject` scans a top-level JSON object once to find where every value starts and ends,
+without decoding the values. A value is decoded (and cached) the first time it is read.
+Nested objects are scanned the same way to index the `__` paths of their leaves.
+"""
+import json
+import re
+from typing import Mapping
+
+from .util import LazyMapping
+
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+SCALAR = re.compile(r'[^,}\]\s]+')
+# An object member up to its value (keys without escapes) and the separator after a value
+MEMBER = re.compile(r'"([^"\\]*)"[ \t\n\r]*:[ \t\n\r]*')
+SEPARATOR = re.compile(r'[ \t\n\r]*([,}])[ \t\n\r]*')
+# Everything up to the next bracket outside of a string (strings are matched whole)
+NESTED_CONTENT = re.compile(r'(?:[^"{}\[\]]+|"[^"\\]*(?:\\.[^"\\]*)*")*', re.DOTALL)
+
+DECODER = json.JSONDecoder()
+
+
+def _skip_whitespace(document: str, position: int) -> int:
+    return WHITESPACE.match(document, position).end()
+
+
+def _skip_string(document: str, position: int) -> int:
+    """
+    Position right after the string starting at `position` (the closing quote is the first one
+    not preceded by an odd number of backslashes)
+    """
+    end = position
+    while True:
+        end = document.find('"', end + 1)
+        if end == -1:
+            raise ValueError(f'Unterminated string at {position}')
+        escape = end - 1
+        while document[escape] == '\\':
+            escape -= 1
+        if (end - 1 - escape) % 2 == 0:
+            return end + 1
+
+
+def _skip_value(document: str, position: int) -> int:
+    """
+    Position right after the JSON value starting at `position`
+    """
+    char = document[position:position + 1]
+    if char == '"':
+        return _skip_string(document, position)
+    if char in ('{', '['):
+        return _skip_nested(document, position)
+    match = SCALAR.match(document, position)
+    if match is None:
+        raise ValueError(f'Invalid JSON value at {position}')
+    return match.end()
+
+
+def _skip_nested(document: str, position: int) -> int:
+    """
+    Position right after the object or array starting at `position`. Only brackets and strings are
+    scanned, nothing is decoded (the content is validated when the value is decoded).
+    """
+    depth = 0
+    while True:
+        position = NESTED_CONTENT.match(document, position).end()
+        char = document[position:position + 1]
+        if char in ('{', '['):
+            depth += 1
+        elif char in ('}', ']'):
+            depth -= 1
+        else:  # End of the document or unterminated string
+            raise ValueError(f'Unterminated value at {position}')
+        position += 1
+        if depth == 0:
+            return position
+
+
+def index_object(document: str, paths: dict = None) -> dict:
+    """
+    Map every key of a top-level JSON object to the (start, end) span of its value
+    :param paths: Also add the span of every leaf of the nested objects to it, by `__` path
+    """
+    offsets = {}
+    _scan_object(document, 0, offsets, paths)
+    return offsets
+
+
+def _scan_object(document: str, position: int, offsets: dict, paths: dict = None, prefix: str = '') -> int:
+    """
+    Add the span of every member of the object starting at `position` to `offsets` (key prefixed by `prefix`),
+    return the position right after the object. With `paths`, nested objects are scanned member by member
+    in the same pass and only their leaves are added (to `paths`).
+    """
+    position = _skip_whitespace(document, position)
+    if document[position:position + 1] != '{':
+        raise ValueError('Expected a JSON object')
+    position = _skip_whitespace(document, position + 1)
+    if document[position:position + 1] == '}':
+        return position + 1
+    while True:
+        match = MEMBER.match(document, position)
+        if match is not None:
+            key, start = match.group(1), match.end()
+        else:
+            key, start = _escaped_member(document, position)
+        if paths is not None and document[start:start + 1] == '{':
+            end = _scan_object(document, start, paths, paths, f'{prefix}{key}__')
+            if not prefix:  # A top-level object is a value too
+                offsets[key] = (start, end)
+        else:
+            end = _skip_value(document, start)
+            offsets[prefix + key] = (start, end)
+        match = SEPARATOR.match(document, end)
+        if match is None:
+            raise ValueError(f'Expected "," or "}}" at {end}')
+        if match.group(1) == '}':
+            return match.end(1)
+        position = match.end()
+
+
+def _escaped_member(document: str, position: int):
+    """
+    Key (unescaped) and value position of an object member whose key has escapes
+    """
+    if document[position:position + 1] != '"':
+        raise ValueError(f'Expected a key at {position}')
+    key, position = json.decoder.scanstring(document, position + 1)
+    position = _skip_whitespace(document, position)
+    if document[position:position + 1] != ':':
+        raise ValueError(f'Expected ":" at {position}')
+    return key, _skip_whitespace(document, position + 1)
+
+
+class LazyJSONObject(LazyMapping):
+    """
+    A top-level JSON object whose values are decoded on first access.
+    Values that are never read are only validated when they are decoded.
+    """
+
+    def __init__(self, document: str, offsets: dict = None):
+        """
+        :param offsets: Spans of the values (default: index the document and the paths of its nested objects)
+        """
+        self._paths = {}
+        if offsets is None:
+            offsets = index_object(document, self._paths)
+        super().__init__(offsets)
+        self._document = document
+
+    def _decode(self, start, end):
+        return DECODER.raw_decode(self._document, start)[0]
+
+    def raw(self, key) -> str:
+        start, end = self._offsets[key]
+        return self._document[start:end]
+
+    def paths(self) -> Mapping:
+        """
+        The leaves of the nested objects by `__` path, indexed with the document (nothing is decoded)
+        """
+        paths = {path: span for path, span in self._paths.items() if path not in self._offsets}
+        return self.__class__(self._document, paths) if paths else {}
@@ -2,13 +2,19 @@
 AWS Secrets Manager
 """
 import datetime
+import functools
+import time
 import uuid
 from decimal import Decimal
 from pathlib import Path
 import marshmallow as ma
 
-from .util import AttrDict
-from .parser import SecretParser
+from .binary import BinaryValues
+from .index import Moves
+from .manifest import AccessLog, Manifest
+from .providers import KEY_SEPARATOR, PROVIDERS
+from .util import AttrDict, FrozenDict, key_prefixes
+from .parser import CURRENT_STAGE, SecretParser
 from . import fields
 
 
@@ -19,6 +25,77 @@ class NotSet:
     pass
 
 
+# Getters replayed by `warm` (the first item of a conversion signature)
+CONVERTERS = frozenset(('str', 'int', 'float', 'decimal', 'bool', 'list', 'choices', 'datetime', 'date', 'time',
+                        'timedelta', 'timedelta_seconds', 'uuid', 'log_level', 'path'))
+
+
+def field_signature(field):
+    """
+    Cache signature of a field argument. Field instances can't be compared, so they are not cached.
+    """
+    if isinstance(field, type):
+        return field
+    return None
+
+
+# Field instances of the getters, built once (deserializing doesn't change a field)
+FIELDS = {
+    'str': fields.Str(),
+    'int': fields.Int(),
+    'float': fields.Float(),
+    'decimal': fields.Decimal(),
+    'bool': fields.Bool(),
+    'log_level': fields.LogLevel(),
+    'path': fields.Path(),
+}
+
+# Signature of the getter equivalent to a field class given to `many` (they share the conversion cache)
+FIELD_SIGNATURES = {field.__class__: (name,) for name, field in FIELDS.items()}
+
+
+@functools.lru_cache(maxsize=256)
+def list_cast(delimiter, subcast):
+    if isinstance(subcast, type):
+        subcast = subcast()
+
+    def cast(value):
+        return [subcast.deserialize(v) for v in value.split(delimiter)]
+    return cast
+
+
+@functools.lru_cache(maxsize=256)
+def choices_cast(delimiter, subcast):
+    return fields.Choices(delimiter=delimiter, subcast=subcast).deserialize
+
+
+@functools.lru_cache(maxsize=256)
+def format_cast(field_class, format):
+    return field_class(format=format).deserialize
+
+
+@functools.lru_cache(maxsize=16)
+def uuid_cast(version):
+    return fields.UUID(metadata=dict(version=version)).deserialize
+
+
+def many_signature(field) -> tuple:
+    """
+    Cache signature of a field of `many`: the signature of the equivalent getter, if any
+    """
+    if isinstance(field, type):
+        return FIELD_SIGNATURES.get(field, ('field', field))
+    return ('field', None)
+
+
+def timedelta_cast(value):
+    return datetime.timedelta(**{k: int(v) for k, v in zip(['hours', 'minutes', 'seconds'], value.split(':'))})
+
+
+def timedelta_seconds_cast(value):
+    return datetime.timedelta(seconds=FIELDS['int'].deserialize(value))
+
+
 class SecretManager(SecretParser):
     """
     Secret Manager resolves secrets from AWS Secrets Manager
@@ -41,132 +118,346 @@ class SecretManager(SecretParser):
     * `uuid`: uuid.UUID - You can specify a `version` for the UUID. 1=Time-based, 3=Name-based, 4=Random, 5=Name-based
     * `log_level`: int - Parses a log level string to an int
     * `path`: pathlib.Path - Parses a string to a pathlib.Path object
-    * `dict`: AttrDict - You can specify a `prefix` for the dictionary keys, a `subcast_keys` type,
+    * `dict`: FrozenDict - You can specify a `prefix` for the dictionary keys, a `subcast_keys` type,
         and a `subcast_values` type
+    * `binary`: memoryview - The payload of a binary secret tier
+
+    `many` converts several keys at once from a {key: field} spec, and reports every missing and invalid key.
+
+    Nested JSON objects of a secret are reachable by path: `value("database.default.HOST")` reads
+    `{"database": {"default": {"HOST": ...}}}`, and `dict("database")` includes their leaves.
+    A path is the dotted form of the `__` convention, both forms merge across tiers with the same precedence.
+
+    Values converted from a secret tier, and the part of `dict` results built from the tiers, are cached
+    until a load or reload changes one of the keys they depend on.
+
+    With `record_access()`, the manager records the tiers, keys and conversions it used; `manifest()` exports
+    them and `warm(manifest)` prefetches and converts them on the next start.
     """
 
-    def value(self, name, default=NotSet) -> str:
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._converted = {}  # key -> {signature: converted value}
+        self._dicts = {}  # prefix -> {signature: FrozenDict built from the tiers}
+        self._stale_dicts = {}  # prefix -> {signature: invalidated FrozenDict}, its unchanged subtrees are reused
+        self._access = None
+
+    def value(self, name, default=NotSet, stage: str = None) -> str:
         """
         Get the value of a secret.  Returns raw format.
+        With a `stage` (e.g. AWSPREVIOUS, fetched with `load(..., stages=...)`), the value in the version of that
+        stage of the tier serving the key. Stage values are never read from the environment.
         """
         if not self._secrets:
             self.load()
-        # Try to get the value from secrets
-        for secret in reversed(self._secrets.values()):  # We want to get the most recent secret first
-            try:
-                return secret.SecretValues[name]
-            except KeyError:
-                pass
+        if stage is not None and stage != CURRENT_STAGE:
+            return self._staged_value(name, stage, default)
+        path = self._path(name)
+        if self._access is not None:
+            self._access.key(path)
+        # Try to get the value from secrets (the index knows which tier serves the key)
+        value = self._index.get(path, NotSet)
+        if value is not NotSet:
+            if self._metrics is not None:
+                self._metrics.lookup(path, 'tier', self._index.owner(path))
+            return value
         # Try to get value from environment variables
-        if name in self.env:
-            return self.env[name]
-        elif name.upper() in self.env:
-            return self.env[name.upper()]
+        env_value = self._env_value(name, path)
+        if env_value is not None:
+            return env_value
 
         if default is not NotSet:
+            if self._metrics is not None:
+                self._metrics.lookup(name, 'default')
             return default
 
         # No value found
+        if self._metrics is not None:
+            self._metrics.lookup(name, 'missing')
         raise KeyError(f'Key "{name}" is not found.')
 
+    def _env_value(self, name, path):
+        """
+        Environment value of a name as given (e.g. `my.key`), then of its path
+        """
+        env_value = self._env_lookup(name)
+        if env_value is None and path != name:
+            env_value = self._env_lookup(path)
+        if env_value is not None and self._metrics is not None:
+            self._metrics.lookup(name, 'env')
+        return env_value
+
+    def _path(self, name):
+        """
+        Index key of a name: a dotted name that is not a key itself is the path of a nested value
+        """
+        if '.' in name and name not in self._index:
+            return name.replace('.', KEY_SEPARATOR)
+        return name
+
+    def _dict_prefix(self, prefix):
+        """
+        Key prefix of a `dict` prefix: a dotted prefix no key starts with is the path of a nested object
+        """
+        if '.' not in prefix:
+            return prefix
+        starts = (f'{prefix}__', f'{prefix}__'.upper())
+        if any(key.startswith(starts) for key in self._index) or \
+                any(key.startswith(starts) for key in self._env_items(prefix).keys()):
+            return prefix
+        return prefix.replace('.', KEY_SEPARATOR)
+
+    def _staged_value(self, name, stage: str, default):
+        """
+        Value in the stage of the tier serving the key (another tier's credential is never returned)
+        """
+        path = self._path(name)
+        values = self._staged.get(self._index.owner(path), {}).get(stage)
+        if values is not None and path in values:
+            return values[path]
+        if default is not NotSet:
+            return default
+        raise KeyError(f'Key "{name}" is not found in stage {stage}.')
+
+    def _cast(self, name, default, signature: tuple, cast):
+        """
+        Convert a value with `cast`, caching the result when the value is served by a secret tier.
+        Values from the environment or the default are converted on every call.
+        """
+        if not self._secrets:
+            self.load()
+        path = self._path(name)
+        if self._access is not None and None not in signature:
+            self._access.key(path, signature)
+        cached = self._converted.get(path)
+        if cached is not None and signature in cached:
+            if self._metrics is not None:
+                self._metrics.conversion_cache_hit(path, signature[0])
+            return cached[signature]
+        if self._metrics is not None:
+            return self._timed_cast(name, path, default, signature, cast)
+        version = self._index.version
+        value = NotSet if None in signature else self._index.get(path, NotSet)
+        if value is NotSet:
+            return cast(self.value(name, default=default))
+        result = cast(value)
+        self._cache_conversion(path, signature, result, version)
+        return result
+
+    def _timed_cast(self, name, path, default, signature: tuple, cast):
+        """
+        `_cast` of an instrumented manager: the lookup and the conversion time are recorded
+        """
+        version = self._index.version
+        value = self.value(name, default=default)
+        start = time.perf_counter()
+        result = cast(value)
+        self._metrics.conversion(path, signature[0], time.perf_counter() - start)
+        if None not in signature and path in self._index:
+            self._cache_conversion(path, signature, result, version)
+        return result
+
+    def _cache_conversion(self, name, signature: tuple, result, version: int):
+        """
+        Cache the conversion of a tier value read at index `version`. If a reload changed the index since,
+        its invalidation may have run before the entry was stored, so the entry is dropped again.
+        """
+        self._converted.setdefault(name, {})[signature] = result
+        if self._index.version != version:
+            self._converted.pop(name, None)
+
     def str(self, name, default: (str, NotSet) = NotSet) -> str:
         """
         Get the value of a secret as a string
         """
-        return fields.Str().deserialize(self.value(name, default=default))
+        return self._cast(name, default, ('str',), FIELDS['str'].deserialize)
 
     def int(self, name, default: (str, NotSet) = NotSet) -> int:
         """
         Get the value of a secret as an integer
         """
-        return fields.Int().deserialize(self.value(name, default=default))
+        return self._cast(name, default, ('int',), FIELDS['int'].deserialize)
 
     def float(self, name, default: (str, NotSet) = NotSet) -> float:
         """
         Get the value of a secret as a float
         """
-        return fields.Float().deserialize(self.value(name, default=default))
+        return self._cast(name, default, ('float',), FIELDS['float'].deserialize)
 
     def decimal(self, name, default: (str, NotSet) = NotSet) -> Decimal:
         """
         Get the value of a secret as a decimal
         """
-        return fields.Decimal().deserialize(self.value(name, default=default))
+        return self._cast(name, default, ('decimal',), FIELDS['decimal'].deserialize)
 
     def bool(self, name, default: (str, NotSet) = NotSet) -> bool:
         """
         Get the value of a secret as a boolean
         """
-        return fields.Bool().deserialize(self.value(name, default=default))
+        return self._cast(name, default, ('bool',), FIELDS['bool'].deserialize)
 
     def list(self, name, delimiter=',', subcast=fields.Str, default: (str, NotSet) = NotSet) -> list:
         """
         Get the value of a secret as a list
         """
-        if isinstance(subcast, type):
-            subcast = subcast()
-        return [subcast.deserialize(v) for v in self.value(name, default=default).split(delimiter)]
+        signature = ('list', delimiter, field_signature(subcast))
+        return list(self._cast(name, default, signature, list_cast(delimiter, subcast)))
 
     def choices(self, name, delimiter=',', subcast: ma.fields.Field = fields.Str,
                 default: (str, NotSet) = NotSet) -> list:
         """
         Get the value of a secret as a list of tuples
         """
-        return fields.Choices(delimiter=delimiter, subcast=subcast).deserialize(self.value(name, default=default))
+        signature = ('choices', delimiter, field_signature(subcast))
+        return list(self._cast(name, default, signature, choices_cast(delimiter, subcast)))
 
     def datetime(self, name, format='%Y-%m-%d %H:%M:%S', default: (str, NotSet) = NotSet) -> datetime:
         """
         Get the value of a secret as a datetime
         """
-        return fields.Datetime(format=format).deserialize(self.value(name, default=default))
+        return self._cast(name, default, ('datetime', format), format_cast(fields.Datetime, format))
 
     def date(self, name, format='%Y-%m-%d', default: (str, NotSet) = NotSet) -> datetime:
         """
         Get the value of a secret as a date
         """
-        return fields.Date(format=format).deserialize(self.value(name, default=default))
+        return self._cast(name, default, ('date', format), format_cast(fields.Date, format))
 
     def time(self, name, format='%H:%M:%S', default: (str, NotSet) = NotSet) -> datetime:
         """
         Get the value of a secret as a time
         """
-        return fields.Time(format=format).deserialize(self.value(name, default=default))
+        return self._cast(name, default, ('time', format), format_cast(fields.Time, format))
 
     def timedelta(self, name, default: (str, NotSet) = NotSet) -> datetime:
         """
         Get the value of a secret as a timedelta
         Format: HH:MM:SS
         """
-        value = self.value(name, default=default)
-        return datetime.timedelta(**{k: int(v) for k, v in zip(['hours', 'minutes', 'seconds'], value.split(':'))})
+        return self._cast(name, default, ('timedelta',), timedelta_cast)
 
     def timedelta_seconds(self, name, default: (str, NotSet) = NotSet) -> datetime:
         """
         Get the value of a secret as a timedelta
         """
-        return datetime.timedelta(seconds=self.int(name, default=default))
+        return self._cast(name, default, ('timedelta_seconds',), timedelta_seconds_cast)
 
     def uuid(self, name, version=4, default: (str, NotSet) = NotSet) -> uuid:
         """
         Get the value of a secret as a UUID
         """
-        return fields.UUID(metadata=dict(version=version)).deserialize(self.value(name, default=default))
+        return self._cast(name, default, ('uuid', version), uuid_cast(version))
 
     def log_level(self, name, default: (str, NotSet) = NotSet) -> int:
         """
         Get the value of a secret as a log level
         """
-        return fields.LogLevel().deserialize(self.value(name, default=default))
+        return self._cast(name, default, ('log_level',), FIELDS['log_level'].deserialize)
 
     def path(self, name, default: (str, NotSet) = NotSet) -> Path:
         """
         Get the value of a secret as a Path
         """
-        return fields.Path().deserialize(self.value(name, default=default))
+        return self._cast(name, default, ('path',), FIELDS['path'].deserialize)
+
+    def many(self, spec: dict, defaults: dict = None) -> AttrDict:
+        """
+        Get several values at once, e.g. `many({"DEBUG": fields.Bool, "PORT": fields.Int}, defaults={"DEBUG": "false"})`
+        The keys are resolved in one pass over the index and converted grouped by field, the conversions share
+        the cache of the typed getters (`fields.Int` is cached like `int`).
+        Missing and invalid keys are reported together: the ValidationError has the `messages` of every failed key
+        and the `valid_data` of the others.
+        :param spec: Field class or instance by key (or path)
+        :param defaults: Default of the keys that may be missing, converted like a value
+        :return: AttrDict of the converted values, in the order of `spec`
+        """
+        if not self._secrets:
+            self.load()
+        defaults = defaults or {}
+        result = AttrDict.fromkeys(spec)
+        errors = {}
+        if self._metrics is not None:
+            self._timed_many(spec, defaults, result, errors)
+        else:
+            version = self._index.version
+            for field, items in self._resolve_many(spec, defaults, result, errors).items():
+                self._convert_many(field, items, result, errors, version)
+        if errors:
+            raise ma.ValidationError(errors, valid_data={k: v for k, v in result.items() if k not in errors})
+        return result
+
+    def _resolve_many(self, spec: dict, defaults: dict, result: AttrDict, errors: dict) -> dict:
+        """
+        Fill `result` with the cached conversions of `spec`, and group the other values by field
+        :return: {field: [(key, name, signature or None if not cached, raw value)]}
+        """
+        groups = {}
+        index, converted = self._index, self._converted
+        for key, field in spec.items():
+            name = key.replace('.', KEY_SEPARATOR) if '.' in key and key not in index else key
+            signature = many_signature(field)
+            if self._access is not None and None not in signature:
+                self._access.key(name, signature)
+            cached = converted.get(name)
+            if cached is not None and signature in cached:
+                result[key] = cached[signature]
+                continue
+            value = index.get(name, NotSet)
+            if value is NotSet:  # Environment or default, converted on every call
+                signature = None
+                try:
+                    value = self.value(key, default=defaults.get(key, NotSet))
+                except KeyError:
+                    errors[key] = ['Missing data for required field.']
+                    continue
+            groups.setdefault(field, []).append((key, name, signature, value))
+        return groups
+
+    def _convert_many(self, field, items: list, result: AttrDict, errors: dict, version: int):
+        """
+        Convert the values of one field of `many` with a single field instance
+        """
+        if isinstance(field, type):
+            signature = FIELD_SIGNATURES.get(field)
+            field = FIELDS[signature[0]] if signature else field()
+        deserialize = field.deserialize
+        for key, name, signature, value in items:
+            try:
+                result[key] = converted_value = deserialize(value)
+            except ma.ValidationError as error:
+                errors[key] = error.messages
+                continue
+            if signature is not None and None not in signature:
+                self._cache_conversion(name, signature, converted_value, version)
 
-    def _parse_dict(self, prefix, dictionary: dict, response_dict: AttrDict = None,
+    def _timed_many(self, spec: dict, defaults: dict, result: AttrDict, errors: dict):
+        """
+        `many` of an instrumented manager: every key goes through `_cast` so lookups and conversions are recorded
+        """
+        for key, field in spec.items():
+            deserialize = (field() if isinstance(field, type) else field).deserialize
+            try:
+                result[key] = self._cast(key, defaults.get(key, NotSet), many_signature(field), deserialize)
+            except KeyError:
+                errors[key] = ['Missing data for required field.']
+            except ma.ValidationError as error:
+                errors[key] = error.messages
+
+    def binary(self, secret_name: str = None) -> memoryview:
+        """
+        Get the payload of a binary secret as a read-only memoryview (no copy).
+        The memory is zeroed when the secret is reloaded or the manager is closed.
+        """
+        if secret_name is None:
+            secret_name = self.default_secret_name
+        response = self.load(secret_name)
+        if response is None or not isinstance(response.SecretValues.data, BinaryValues):
+            raise KeyError(f'Secret "{secret_name}" is not a binary secret.')
+        return response.SecretValues.data.view()
+
+    def _parse_dict(self, prefix, dictionary: dict, response_dict: dict = None,
                     subcast_keys: ma.fields.Field = fields.Str,
-                    subcast_values: ma.fields.Field = fields.Str) -> AttrDict:
+                    subcast_values: ma.fields.Field = fields.Str) -> dict:
         """
         Parse a dictionary from a dictionary of any type.
 
@@ -175,31 +466,69 @@ class SecretManager(SecretParser):
         :param prefix: Filter prefix
         :param dictionary: Dictionary to parse
         :param subcast_keys: The type to cast the keys to
-        :param subcast_values:  The type to cast the values to
-        :return: AttrDict
+        :param subcast_values:  The type to cast the values to (string fields leave non-string values as they are)
+        :return: The response dict (nested dicts)
         """
-        for _key, _value in dictionary.items():
+        for _key in dictionary.keys():  # Only matching values are read (lazy tiers decode on access)
             if _key.startswith(prefix) or _key.startswith(prefix.upper()):
+                _value = dictionary[_key]
                 # Remove the prefix from the key
-                clean_key = _key.split('__', 1)[1]
+                clean_key = _key[len(prefix):]
                 subkeys = clean_key.split('__')
                 _dict = response_dict
                 for subkey in subkeys[:-1]:
                     subkey = subcast_keys.deserialize(subkey)
                     if subkey not in _dict:
-                        _dict[subkey] = AttrDict()
+                        _dict[subkey] = {}
                     _dict = _dict[subkey]
 
                 final_key = subcast_keys.deserialize(subkeys[-1])
                 if final_key in _dict:
                     continue
-                _dict[final_key] = subcast_values.deserialize(_value)
+                if isinstance(subcast_values, ma.fields.String) and not isinstance(_value, str):
+                    _dict[final_key] = _value  # A typed JSON leaf (e.g. a nested PORT: 5432) keeps its type
+                else:
+                    _dict[final_key] = subcast_values.deserialize(_value)
         return response_dict
 
+    def _tier_dict(self, prefix, subcast_keys, subcast_values) -> FrozenDict:
+        """
+        The part of a `dict` result built from the secret tiers (cached until one of its keys changes).
+        A rebuilt dict shares the subtrees that didn't change with the invalidated one.
+        """
+        signature = (field_signature(subcast_keys), field_signature(subcast_values))
+        cached = self._dicts.get(prefix, {})
+        if signature in cached:
+            return cached[signature]
+
+        if isinstance(subcast_keys, type):
+            subcast_keys = subcast_keys()
+        if isinstance(subcast_values, type):
+            subcast_values = subcast_values()
+        filter_prefix = f'{prefix}__'
+        response = {}
+        version = self._index.version
+        # Load all values that begin with prefix
+        for _, values in reversed(self._index.tiers()):  # We want to get the most recent secret first
+            self._parse_dict(filter_prefix, values, response, subcast_keys, subcast_values)
+
+        if None in signature:
+            return FrozenDict.freeze(response)
+        stale = self._stale_dicts.get(prefix, {})
+        response = FrozenDict.freeze(response, stale.pop(signature, None))
+        if not stale:
+            self._stale_dicts.pop(prefix, None)
+        self._dicts.setdefault(prefix, {})[signature] = response
+        if self._index.version != version:  # Changed during the build (see `_cache_conversion`)
+            self._dicts.get(prefix, {}).pop(signature, None)
+        return response
+
     def dict(self, prefix, subcast_keys: ma.fields.Field = fields.Str,
-             subcast_values: ma.fields.Field = fields.Str) -> AttrDict:
+             subcast_values: ma.fields.Field = fields.Str) -> FrozenDict:
         """
         Get the value of a secret as a dictionary.
+        The result is immutable and shared: calls with unchanged keys return the same FrozenDict,
+        use `thaw()` for a mutable copy (e.g. Django's DATABASES, which Django modifies).
 
         # Key format
         DATABASE__default__HOST=localhost
@@ -223,22 +552,127 @@ class SecretManager(SecretParser):
             }
         }
         """
+        if not self._secrets:
+            self.load()
+        prefix = self._dict_prefix(prefix)
+        if self._access is not None:
+            signature = (field_signature(subcast_keys), field_signature(subcast_values))
+            if None not in signature:
+                self._access.dict(prefix, signature)
+        if self._metrics is not None:
+            start = time.perf_counter()
+            try:
+                return self._dict(prefix, subcast_keys, subcast_values)
+            finally:
+                self._metrics.dict_call(prefix, time.perf_counter() - start)
+        return self._dict(prefix, subcast_keys, subcast_values)
+
+    def _dict(self, prefix, subcast_keys, subcast_values) -> FrozenDict:
+        tiers = self._tier_dict(prefix, subcast_keys, subcast_values)
+        env_items = self._env_items(prefix)
+        filter_prefix = f'{prefix}__'
+        upper_prefix = filter_prefix.upper()
+        if not any(key.startswith(filter_prefix) or key.startswith(upper_prefix) for key in env_items.keys()):
+            return tiers  # Nothing to overlay: the cached dict itself
+
+        # Load all environment variables that begin with prefix (the tier values win)
         if isinstance(subcast_keys, type):
             subcast_keys = subcast_keys()
         if isinstance(subcast_values, type):
             subcast_values = subcast_values()
+        response = self._parse_dict(filter_prefix, env_items, tiers.thaw(), subcast_keys, subcast_values)
+        return FrozenDict.freeze(response, tiers)
 
-        if not self._secrets:
-            self.load()
-        filter_prefix = f'{prefix}__'
+    def record_access(self) -> AccessLog:
+        """
+        Start recording the keys and conversions used (for `manifest()`)
+        """
+        if self._access is None:
+            self._access = AccessLog()
+        return self._access
 
-        response = AttrDict()
-        # Load all values that begin with prefix
-        for secret in reversed(self._secrets.values()):  # We want to get the most recent secret first
-            response.update(self._parse_dict(filter_prefix, secret.SecretValues, response,
-                                             subcast_keys, subcast_values))
+    def manifest(self) -> Manifest:
+        """
+        Prefetch manifest of the loaded tiers and of the recorded keys and conversions (no values)
+        """
+        access = self._access or AccessLog()
+        return Manifest(
+            tiers=[(name, type(self._providers.get(name, self.provider)).__name__) for name in self._secrets],
+            keys={key: list(signatures) for key, signatures in access.keys.items()},
+            dicts={prefix: list(signatures) for prefix, signatures in access.dicts.items()},
+        )
 
-        # Load all environment variables that begin with prefix
-        response.update(self._parse_dict(filter_prefix, self.env, response, subcast_keys, subcast_values))
+    def warm(self, manifest, providers: dict = None, max_workers: int = None) -> list:
+        """
+        Fetch the tiers of a manifest in parallel, then run its conversions so they are cached.
+        Tiers whose provider is not the default one get a new provider of the recorded class,
+        unless one is given in `providers`.
+        :param manifest: The Manifest or the path of a manifest file
+        :param providers: Provider of some tiers by secret name
+        :param max_workers: Number of fetch threads
+        :return: The keys and prefixes that could not be converted (missing or invalid values)
+        """
+        if not isinstance(manifest, Manifest):
+            manifest = Manifest.load(manifest)
+        providers = dict(providers or {})
+        default_provider = self.provider.__class__.__name__
+        for name, provider_name in manifest.tiers:
+            if name in providers or provider_name == default_provider:
+                continue
+            if provider_name not in PROVIDERS:
+                raise ValueError(f'Unknown provider {provider_name} of "{name}", pass it in providers')
+            providers[name] = PROVIDERS[provider_name]()
+        self.load_many([name for name, _ in manifest.tiers], providers=providers, max_workers=max_workers)
+        return self._warm_keys(manifest.keys) + self._warm_dicts(manifest.dicts)
 
-        return response
+    def _warm_keys(self, keys: dict) -> list:
+        """
+        Run the recorded conversions of the keys, return the keys that failed
+        """
+        failed = []
+        for key, signatures in keys.items():
+            try:
+                self.value(key)  # Decodes lazy values
+                for signature in signatures:
+                    if signature[0] in CONVERTERS:
+                        getattr(self, signature[0])(key, *signature[1:])
+                    elif signature[0] == 'field':
+                        self.many({key: signature[1]})
+            except (KeyError, ValueError, TypeError, ma.ValidationError):
+                failed.append(key)
+        return failed
+
+    def _warm_dicts(self, dicts: dict) -> list:
+        """
+        Build the recorded dicts, return the prefixes that failed
+        """
+        failed = []
+        for prefix, signatures in dicts.items():
+            try:
+                for signature in signatures:
+                    self.dict(prefix, *signature)
+            except (ValueError, TypeError, ma.ValidationError):
+                failed.append(prefix)
+        return failed
+
+    def _tier_changed(self, moves: Moves):
+        """
+        Invalidate the cached conversions and dictionaries depending on the moved keys
+        """
+        candidates = set()
+        for key in moves:
+            self._converted.pop(key, None)
+            candidates.update(key_prefixes(key))
+        if self._dicts:
+            for prefix in [p for p in self._dicts if p in candidates or p.upper() in candidates]:
+                self._stale_dicts.setdefault(prefix, {}).update(self._dicts.pop(prefix))
+        super()._tier_changed(moves)
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            self._converted = {}
+            self._dicts = {}
+            self._stale_dicts = {}
+            self._access = None
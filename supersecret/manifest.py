@@ -0,0 +1,107 @@
+"""
+Prefetch manifests.
+
+A manager recording its accesses (`record_access()`) knows which tiers it loaded and which keys and
+conversions (getter and arguments) the process used. `manifest()` turns that into a `Manifest` holding
+names only, never values. On the next start, `warm(manifest)` fetches the tiers in parallel and runs
+the conversions before the first request needs them.
+
+File format (JSON):
+    {"version": 1,
+     "tiers": [["my-secret", "SecretsManagerProvider"]],
+     "keys": {"DATABASE__port": [["int"]], "HOSTS": [["list", ",", {"class": "marshmallow.fields:String"}]]},
+     "dicts": {"DATABASE": [[{"class": "marshmallow.fields:String"}, {"class": "marshmallow.fields:String"}]]}}
+"""
+import importlib
+import json
+from dataclasses import dataclass, field
+from typing import Dict, List, Set, Tuple
+
+import marshmallow as ma
+
+FORMAT_VERSION = 1
+FIELD_MODULES = frozenset(('marshmallow.fields', 'supersecret.fields'))  # The only modules a manifest imports
+
+
+class AccessLog:
+    """
+    Keys, conversion signatures and dict prefixes used by a manager
+    """
+
+    def __init__(self):
+        self.keys: Dict[str, Set[tuple]] = {}  # key -> conversion signatures
+        self.dicts: Dict[str, Set[tuple]] = {}  # prefix -> (subcast_keys, subcast_values) signatures
+
+    def key(self, name: str, signature: tuple = None):
+        signatures = self.keys.get(name)
+        if signatures is None:
+            signatures = self.keys.setdefault(name, set())
+        if signature is not None:
+            signatures.add(signature)
+
+    def dict(self, prefix: str, signature: tuple):
+        self.dicts.setdefault(prefix, set()).add(signature)
+
+
+def _encode(item):
+    if isinstance(item, type):
+        return {'class': f'{item.__module__}:{item.__qualname__}'}
+    return item
+
+
+def _decode(item):
+    if isinstance(item, dict):
+        module, _, qualname = item['class'].partition(':')
+        if module not in FIELD_MODULES:  # Importing runs module code: a manifest file must not pick it
+            raise ValueError(f'{item["class"]} is not a field class')
+        value = importlib.import_module(module)
+        for name in qualname.split('.'):
+            value = getattr(value, name)
+        if not (isinstance(value, type) and issubclass(value, ma.fields.Field)):
+            raise ValueError(f'{item["class"]} is not a field class')
+        return value
+    return item
+
+
+def _encode_signatures(signatures) -> list:
+    # Sorted for stable files, signatures mix strings, numbers and classes so they are sorted by their JSON
+    return sorted(([_encode(item) for item in signature] for signature in signatures), key=json.dumps)
+
+
+@dataclass
+class Manifest:
+    """
+    Tiers (name, provider class name) in precedence order, and the conversions to warm up
+    """
+    tiers: List[Tuple[str, str]] = field(default_factory=list)
+    keys: Dict[str, List[tuple]] = field(default_factory=dict)
+    dicts: Dict[str, List[tuple]] = field(default_factory=dict)
+
+    def to_dict(self) -> dict:
+        return {
+            'version': FORMAT_VERSION,
+            'tiers': [list(tier) for tier in self.tiers],
+            'keys': {key: _encode_signatures(signatures) for key, signatures in sorted(self.keys.items())},
+            'dicts': {prefix: _encode_signatures(signatures) for prefix, signatures in sorted(self.dicts.items())},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'Manifest':
+        if data.get('version') != FORMAT_VERSION:
+            raise ValueError(f'Unsupported manifest version {data.get("version")}')
+        return cls(
+            tiers=[tuple(tier) for tier in data['tiers']],
+            keys={key: [tuple(_decode(item) for item in signature) for signature in signatures]
+                  for key, signatures in data['keys'].items()},
+            dicts={prefix: [tuple(_decode(item) for item in signature) for signature in signatures]
+                   for prefix, signatures in data['dicts'].items()},
+        )
+
+    def save(self, path):
+        with open(path, 'w') as file:
+            json.dump(self.to_dict(), file, indent=2, default=str)
+
+    @classmethod
+    def load(cls, path) -> 'Manifest':
+        with open(path) as file:
+            return cls.from_dict(json.load(file))
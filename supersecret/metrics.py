@@ -0,0 +1,141 @@
+"""
+Instrumentation of the secret manager.
+
+Instrumentation is disabled by default and costs a single `is None` check on the hot paths.
+Enable it with `manager.instrument()`, read the counters with `manager.stats()`, and plug hooks
+(`hook(event, data)`) to forward the events to your own metrics system.
+
+Events:
+* `aws_call`: tier, operation, seconds (every provider fetch)
+* `aws_error`: tier, operation, code
+* `lookup`: key, source (`tier`, `env`, `default` or `missing`), tier
+* `conversion`: key, field, seconds (conversions that were not cached)
+* `dict`: prefix, seconds
+"""
+import bisect
+import threading
+from collections import Counter, defaultdict
+from typing import Callable, List
+
+from botocore.exceptions import ClientError
+
+# Upper bounds (in milliseconds) of the latency histogram buckets, the last bucket is unbounded
+BUCKETS_MS = (0.01, 0.05, 0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000, 5000)
+
+Hook = Callable[[str, dict], None]
+
+
+class Histogram:
+    """
+    Latency histogram with fixed buckets
+    """
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float):
+        milliseconds = seconds * 1000
+        self.counts[bisect.bisect_left(BUCKETS_MS, milliseconds)] += 1
+        self.count += 1
+        self.total += milliseconds
+        self.max = max(self.max, milliseconds)
+
+    def as_dict(self) -> dict:
+        buckets = {f'<={bound}ms': count for bound, count in zip(BUCKETS_MS, self.counts)}
+        buckets[f'>{BUCKETS_MS[-1]}ms'] = self.counts[-1]
+        return {
+            'count': self.count,
+            'total_ms': round(self.total, 4),
+            'mean_ms': round(self.total / self.count, 4) if self.count else 0.0,
+            'max_ms': round(self.max, 4),
+            'buckets': buckets,
+        }
+
+
+def error_code(error: Exception) -> str:
+    if isinstance(error, ClientError):
+        return error.response.get('Error', {}).get('Code', 'Unknown')
+    return type(error).__name__
+
+
+class Metrics:
+    """
+    Counters and histograms of a manager
+    """
+
+    def __init__(self, hooks: List[Hook] = ()):
+        self.hooks = list(hooks)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.aws_calls = defaultdict(Histogram)  # (tier, operation) -> latency
+            self.aws_errors = Counter()  # (tier, operation, code) -> count
+            self.lookups = Counter()  # source -> count
+            self.tier_hits = Counter()  # tier -> count
+            self.conversion_cache_hits = Counter()  # field -> count
+            self.conversions = defaultdict(Histogram)  # field -> conversion time
+            self.dicts = defaultdict(Histogram)  # prefix -> dict() time
+
+    def add_hook(self, hook: Hook):
+        self.hooks.append(hook)
+
+    def _emit(self, event: str, **data):
+        for hook in self.hooks:
+            hook(event, data)
+
+    def aws_call(self, tier: str, operation: str, seconds: float):
+        with self._lock:
+            self.aws_calls[(tier, operation)].add(seconds)
+        self._emit('aws_call', tier=tier, operation=operation, seconds=seconds)
+
+    def aws_error(self, tier: str, operation: str, error: Exception):
+        code = error_code(error)
+        with self._lock:
+            self.aws_errors[(tier, operation, code)] += 1
+        self._emit('aws_error', tier=tier, operation=operation, code=code)
+
+    def lookup(self, key: str, source: str, tier: str = None):
+        with self._lock:
+            self.lookups[source] += 1
+            if tier is not None:
+                self.tier_hits[tier] += 1
+        self._emit('lookup', key=key, source=source, tier=tier)
+
+    def conversion_cache_hit(self, key: str, field: str):
+        with self._lock:
+            self.conversion_cache_hits[field] += 1
+
+    def conversion(self, key: str, field: str, seconds: float):
+        with self._lock:
+            self.conversions[field].add(seconds)
+        self._emit('conversion', key=key, field=field, seconds=seconds)
+
+    def dict_call(self, prefix: str, seconds: float):
+        with self._lock:
+            self.dicts[prefix].add(seconds)
+        self._emit('dict', prefix=prefix, seconds=seconds)
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                'aws': {
+                    'calls': {f'{tier}:{operation}': histogram.as_dict()
+                              for (tier, operation), histogram in self.aws_calls.items()},
+                    'errors': {f'{tier}:{operation}:{code}': count
+                               for (tier, operation, code), count in self.aws_errors.items()},
+                },
+                'lookups': {
+                    'sources': dict(self.lookups),
+                    'tier_hits': dict(self.tier_hits),
+                },
+                'conversions': {
+                    'cache_hits': dict(self.conversion_cache_hits),
+                    'fields': {field: histogram.as_dict() for field, histogram in self.conversions.items()},
+                },
+                'dict': {prefix: histogram.as_dict() for prefix, histogram in self.dicts.items()},
+            }
@@ -1,17 +1,42 @@
 """
 AWS Secrets Parser
 """
-import base64
-import json
+import contextvars
 import os
-from collections import OrderedDict
-from typing import Optional
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from functools import partial
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple, Union
 
 from botocore.client import BaseClient
-from botocore.exceptions import ClientError
 
+from .binary import BinaryValues
+from .credentials import CLIENT_POOL, ClientPool, TierSpec
 from .dto import GetValue
-from .exceptions import define_error
+from .env import EnvSnapshot
+from .exceptions import DeadlineExceededException, InvalidSnapshotException
+from .index import ChangeSet, MergedIndex, Moves
+from .metrics import Hook, Metrics, error_code
+from .providers import BaseProvider, SecretsManagerProvider
+from .snapshot import read_snapshot, write_snapshot
+from .subscriptions import Subscription, SubscriptionRegistry
+from .util import PathMapping
+from . import tracing
+from .tracing import NOOP_SPAN, NOOP_TRACER, Span, Tracer
+
+
+# Version stage of the tiers (the other stages are fetched with `load(..., stages=...)`)
+CURRENT_STAGE = 'AWSCURRENT'
+
+
+def discovery_order(secret_name: str) -> tuple:
+    """
+    Default precedence of discovered secrets: the less specific names first (`org/default`, `org/service`,
+    `org/service/region`), then by name. The last one has the highest precedence.
+    """
+    return secret_name.count('/'), secret_name
 
 
 class SecretParser:
@@ -20,10 +45,22 @@ class SecretParser:
     """
     SERVICE_NAME: str = 'secretsmanager'
 
-    def __init__(self, default_secret_name: str = None, env=None, **aws_kwargs):
+    def __init__(self, default_secret_name: str = None, env=None, env_snapshot: bool = False, lazy: bool = False,
+                 lock_binary: bool = False, provider: BaseProvider = None, tracer: Tracer = None,
+                 fallback_snapshot=None, fallback_snapshot_key: bytes = None,
+                 tier_specs: Mapping[str, TierSpec] = None, client_pool: ClientPool = None, **aws_kwargs):
         """
         :param secret_name: The AWS Secrets Manager secret name
         :param env: The environment (default: os.environ)
+        :param env_snapshot: Freeze the environment now instead of reading it live (see `refresh_env`)
+        :param lazy: Index the keys of secret strings on load and decode each value on first access
+        :param lock_binary: Keep binary secrets in memory locked with mlock (not swapped out)
+        :param provider: The default provider of the tiers (default: AWS Secrets Manager with the options above)
+        :param tracer: Tracer of the connect and load spans (default: no tracing), e.g. OpenTelemetryTracer()
+        :param fallback_snapshot: Snapshot file serving the tiers that miss a load deadline (see `export_snapshot`)
+        :param fallback_snapshot_key: AES key the fallback snapshot was encrypted with
+        :param tier_specs: Role and/or region of some tiers by secret name (see `load(..., spec=...)`)
+        :param client_pool: Cache of the assumed role credentials and clients (default: shared by the process)
         :param aws_kwargs: AWS connection kwargs for boto3.client
         """
         _env = env or os.environ
@@ -33,6 +70,7 @@ class SecretParser:
             _env.update(env.dump())
 
         self._env = _env
+        self._env_snapshot = EnvSnapshot(_env) if env_snapshot else None
         if default_secret_name is None:
             default_secret_name = self.env.get('SECRET_NAME', None)
 
@@ -40,8 +78,30 @@ class SecretParser:
         self.__client_created = False
         self.default_secret_name = default_secret_name
 
+        self.tracer = tracer or NOOP_TRACER
+        self.provider = provider or SecretsManagerProvider(lazy=lazy, lock_binary=lock_binary)
         self.aws_kwargs = aws_kwargs
         self._secrets = OrderedDict()
+        self._index = MergedIndex()
+        self._clients = {}
+        self._providers = {}
+        self._subscriptions = SubscriptionRegistry()
+        self._notifications = deque()  # Index moves waiting to be dispatched to the subscriptions
+        self._dispatch_lock = threading.RLock()
+        self.snapshot_created = None
+        self._metrics: Optional[Metrics] = None
+        self.fallback_snapshot = fallback_snapshot
+        self.fallback_snapshot_key = fallback_snapshot_key
+        self._degraded: Dict[str, str] = {}  # secret name -> last-known-good source
+        self._inflight: Dict[str, Future] = {}  # secret name -> fetch in progress
+        self._lock = threading.RLock()
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._generation = 0  # Incremented by close(), late fetches of a previous generation are dropped
+        self._discovered: Dict[tuple, Tuple[float, List[str]]] = {}  # (prefix, tags) -> (listed at, names)
+        self._specs: Dict[str, TierSpec] = dict(tier_specs or {})
+        self._stages: Dict[str, Tuple[str, ...]] = {}  # secret name -> other version stages to fetch
+        self._staged: Dict[str, Dict[str, Mapping]] = {}  # secret name -> {stage: values of that version}
+        self._client_pool = client_pool or CLIENT_POOL
 
     @property
     def env(self):
@@ -49,8 +109,36 @@ class SecretParser:
         our handling of the env is strange because we don't want to
         alter the os.environ if we get a environs.Env object.
         """
+        if self._env_snapshot is not None:
+            return self._env_snapshot
         return self._env or os.environ
 
+    def refresh_env(self):
+        """
+        Take a new snapshot of the environment.
+        From now on lookups use the snapshot instead of the live environment.
+        """
+        self._env_snapshot = EnvSnapshot(self._env or os.environ)
+
+    def _env_lookup(self, name: str) -> Optional[str]:
+        """
+        Environment value of `name` or `name.upper()`, None if neither is set
+        """
+        env = self.env
+        if self._env_snapshot is not None:
+            return env.lookup(name)
+        if name in env:
+            return env[name]
+        return env.get(name.upper())
+
+    def _env_items(self, prefix: str) -> Mapping:
+        """
+        Environment entries that may start with `{prefix}__` (the whole live environment without a snapshot)
+        """
+        if self._env_snapshot is not None:
+            return self._env_snapshot.with_prefix(prefix)
+        return self.env
+
     def connect(self) -> BaseClient:
         """
         Connect to AWS Secrets Manager to the default aws session
@@ -59,14 +147,30 @@ class SecretParser:
         if self.client:
             return self.client
         import boto3
-        self.aws_kwargs.setdefault('region_name', self.env.get('AWS_REGION', 'us-east-1'))
 
-        self.client = boto3.client(self.SERVICE_NAME, **self.aws_kwargs)
+        with self.tracer.span('supersecret.connect', {tracing.OPERATION: self.SERVICE_NAME}):
+            self.client = boto3.client(self.SERVICE_NAME, **self._client_kwargs())
         self.__client_created = True
         return self.client
 
-    def load(self, secret_name: str = None, client: BaseClient = None,
-             required: bool = False) -> Optional[GetValue]:
+    def _client_kwargs(self) -> dict:
+        self.aws_kwargs.setdefault('region_name', self.env.get('AWS_REGION', 'us-east-1'))
+        return self.aws_kwargs
+
+    def _client_for(self, provider: BaseProvider) -> Optional[BaseClient]:
+        """
+        Client of a provider: the manager's own client for Secrets Manager, the provider's otherwise
+        """
+        if provider.SERVICE_NAME == self.SERVICE_NAME and provider.client is None:
+            return self.client or self.connect()
+        if provider.client is None and provider.SERVICE_NAME:
+            with self.tracer.span('supersecret.connect', {tracing.OPERATION: provider.SERVICE_NAME}):
+                return provider.connect(**self._client_kwargs())
+        return provider.connect(**self._client_kwargs())
+
+    def load(self, secret_name: str = None, client: BaseClient = None, required: bool = False,
+             provider: BaseProvider = None, deadline: float = None, spec: TierSpec = None,
+             stages: Iterable[str] = None) -> Optional[GetValue]:
         """
         Load secret from AWS Secrets Manager.
         If no secret_name is provided, the default_secret_name is used.
@@ -74,55 +178,627 @@ class SecretParser:
         :param secret_name: The AWS Secrets Manager secret name (defaults to default_secret_name)
         :param client: The boto3 client
         :param required: If the secret is required (default: False)
+        :param provider: The provider of the tier (default: AWS Secrets Manager), e.g. SSMParameterProvider
+        :param deadline: Return within this many seconds. If the fetch takes longer, the tier is served by the
+            fallback snapshot (see `degraded`) and replaced when the fetch completes in the background.
+        :param spec: Role and/or region to fetch the tier with, e.g. `TierSpec(role_arn=..., region="eu-west-1")`
+            (kept for the reloads). The credentials and clients are cached by the client pool.
+        :param stages: Other version stages to fetch with the tier and every reload, e.g. `["AWSPREVIOUS"]`
+            (see `value(name, stage=...)`). Stages without a version are skipped.
         """
         if secret_name is None:
             secret_name = self.default_secret_name
+        if spec is not None:
+            self._specs[secret_name] = spec
+        if stages is not None:
+            self._stages[secret_name] = tuple(stages)
+        with self.tracer.span('supersecret.load', {tracing.SECRET_NAME: secret_name}) as span:
+            if secret_name in self._secrets:
+                span.set_attribute(tracing.CACHE, 'hit')
+                return self._secrets[secret_name]
+            if deadline is not None:
+                self._resolve(secret_name, client, provider, pooled=False)
+                self._fetch_many([secret_name], required, deadline=deadline, span=span)
+                return self._secrets.get(secret_name)
+            return self._fetch(secret_name, client, required, provider, span=span)
+
+    def load_many(self, secret_names: Iterable[str], required: bool = False,
+                  providers: Mapping[str, BaseProvider] = None, max_workers: int = None,
+                  deadline: float = None) -> List[Optional[GetValue]]:
+        """
+        Load several secrets, fetching the ones that are not loaded yet in parallel.
+        Tiers are merged in the given order once every fetch is done (the last one has the highest precedence),
+        like successive `load` calls.
+        :param secret_names: The secret names
+        :param required: If the secrets are required (default: False)
+        :param providers: Provider of some tiers by secret name (default: the provider they were loaded with)
+        :param max_workers: Size of the fetch thread pool when it is created (default: 16)
+        :param deadline: Return within this many seconds, tiers that are not fetched by then are served by the
+            fallback snapshot (see `degraded`) and replaced when their fetch completes in the background
+        :return: The tiers in the given order (None for secrets that could not be fetched)
+        """
+        secret_names = list(dict.fromkeys(secret_names))
+        with self.tracer.span('supersecret.load_many') as span:
+            pending = [name for name in secret_names if name not in self._secrets]
+            span.set_attribute(tracing.KEY_COUNT, len(pending))
+            for name in pending:
+                self._resolve(name, None, (providers or {}).get(name), pooled=False)
+            self._fetch_many(pending, required, max_workers, deadline, span)
+        return [self._secrets.get(name) for name in secret_names]
+
+    def discover(self, prefix: str = None, tags: Mapping[str, Optional[str]] = None,
+                 order: Callable[[str], Any] = discovery_order, client: BaseClient = None, required: bool = False,
+                 max_workers: int = None, deadline: float = None, ttl: float = 300.0) -> List[str]:
+        """
+        Load every Secrets Manager secret whose name starts with `prefix` and that has all the `tags`.
+        The secrets are listed with paginated `ListSecrets` calls, then the ones that are not loaded yet are fetched
+        in parallel and merged in precedence order (see `load_many`). Tiers already loaded keep their precedence.
+        The listing is cached for `ttl` seconds, so periodic calls only fetch; if listing fails after that,
+        the previous listing is used.
+        :param prefix: Name prefix, e.g. `org/`
+        :param tags: Tag values by tag key (None matches any value)
+        :param order: Sort key of the names, the last one has the highest precedence (default: `discovery_order`)
+        :param client: The boto3 client (default: the manager's client)
+        :param required: If the discovered secrets are required (default: False)
+        :param max_workers: Size of the fetch thread pool when it is created (default: 16)
+        :param deadline: Return within this many seconds (see `load_many`)
+        :param ttl: Seconds the listing is reused for
+        :return: The discovered secret names in precedence order
+        """
+        provider = self.provider if isinstance(self.provider, SecretsManagerProvider) else SecretsManagerProvider()
+        client = client or self._client_for(provider)
+        with self.tracer.span('supersecret.discover', {tracing.SECRET_NAME: prefix}) as span:
+            names = sorted(self._list_secrets(provider, client, prefix, tags, ttl, span), key=order)
+            span.set_attribute(tracing.KEY_COUNT, len(names))
+            for name in names:
+                if name not in self._secrets:
+                    self._resolve(name, client, None if provider is self.provider else provider, pooled=False)
+            self.load_many(names, required, max_workers=max_workers, deadline=deadline)
+        return names
+
+    def _list_secrets(self, provider: SecretsManagerProvider, client: BaseClient, prefix: Optional[str],
+                      tags: Optional[Mapping[str, Optional[str]]], ttl: float, span: Span) -> List[str]:
+        """
+        Names listed by `discover`, from the cache while the listing is not older than `ttl`
+        """
+        key = (prefix, tuple(sorted((tags or {}).items())))
+        cached = self._discovered.get(key)
+        if cached is not None and time.monotonic() - cached[0] < ttl:
+            span.set_attribute(tracing.CACHE, 'hit')
+            return cached[1]
+        metrics = self._metrics
+        start = time.perf_counter()
+        try:
+            names = provider.list_secrets(client, prefix, tags)
+        except provider.ERRORS as error:
+            if metrics is not None:
+                metrics.aws_error(prefix or '*', 'ListSecrets', error)
+            if cached is None:
+                raise
+            span.set_attribute(tracing.CACHE, 'stale')
+            return cached[1]
+        finally:
+            if metrics is not None:
+                metrics.aws_call(prefix or '*', 'ListSecrets', time.perf_counter() - start)
+        span.set_attribute(tracing.CACHE, 'miss')
+        self._discovered[key] = (time.monotonic(), names)
+        return names
+
+    @property
+    def degraded(self) -> Dict[str, str]:
+        """
+        Tiers that missed a deadline and are waiting for their background fetch, or that failed to fetch with a
+        deadline, with the source serving them until the next successful fetch:
+        `previous` (the version loaded before), `snapshot` (the fallback snapshot) or `missing` (not served)
+        """
+        with self._lock:
+            return dict(self._degraded)
+
+    def owners(self) -> Dict[str, str]:
+        """
+        Name of the tier serving every key of the merged tiers (nested values by `__` path)
+        """
+        with self._lock:
+            return {key: self._index.owner(key) for key in self._index}
+
+    def _fetch_many(self, secret_names: List[str], required: bool, max_workers: int = None,
+                    deadline: float = None, span: Span = NOOP_SPAN):
+        """
+        Fetch tiers in parallel and merge them in order, falling back for the tiers that miss the deadline
+        """
+        # Clients are resolved up front (boto3 clients are thread safe, their creation is not), except the pooled
+        # clients of the spec tiers: assuming their role is a call to STS, it runs in the fetch, within the deadline
+        end = None if deadline is None else time.monotonic() + deadline
+        futures = {name: self._submit(name, *self._resolve(name, None, None, pooled=False), max_workers=max_workers)
+                   for name in secret_names}
+        wait(futures.values(), timeout=None if end is None else max(0.0, end - time.monotonic()))
+
+        late = []
+        try:
+            for name in secret_names:
+                future = futures[name]
+                with self._lock:
+                    generation = self._generation
+                    pending = not future.done()
+                    if pending:
+                        self._fall_back(name)
+                if pending:
+                    # Outside the lock: the callback runs right away if the fetch completed meanwhile
+                    future.add_done_callback(partial(self._complete, name, generation))
+                    late.append(name)
+                    continue
+                response, error = future.result()
+                if error is not None:
+                    if required:
+                        raise error
+                    if deadline is not None:  # Served like a tier missing the deadline
+                        with self._lock:
+                            self._fall_back(name)
+                    continue
+                self._merge(name, response)
+                with self._lock:
+                    self._degraded.pop(name, None)
+        finally:
+            self._notify()
+        if late:
+            span.set_attribute(tracing.DEGRADED, late)
+            missing = [name for name in late if name not in self._secrets]
+            if required and missing:
+                raise DeadlineExceededException(*missing)
+
+    def _submit(self, secret_name: str, client: BaseClient, provider: BaseProvider,
+                max_workers: int = None) -> Future:
+        """
+        Fetch a tier in the background, joining the fetch already in progress if there is one (single flight)
+        """
+        with self._lock:
+            future = self._inflight.get(secret_name)
+            if future is None:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=max_workers or 16, thread_name_prefix='supersecret')
+                future = self._pool.submit(contextvars.copy_context().run, self._try_load_secret,
+                                           secret_name, client, provider)
+                self._inflight[secret_name] = future
+                future.add_done_callback(partial(self._forget, secret_name))
+            return future
+
+    def _forget(self, secret_name: str, future: Future):
+        with self._lock:
+            if self._inflight.get(secret_name) is future:
+                del self._inflight[secret_name]
+
+    def _fall_back(self, secret_name: str):
+        """
+        Serve a tier that missed its deadline with its last-known-good version
+        """
         if secret_name in self._secrets:
-            return self._secrets[secret_name]
-        if client is None:
-            client = self.client
-        if client is None:
-            client = self.connect()
+            self._degraded[secret_name] = 'previous'
+            return
+        response = self._snapshot_tier(secret_name)
+        if response is None:
+            self._degraded[secret_name] = 'missing'
+            return
+        self._merge(secret_name, response)
+        self._degraded[secret_name] = 'snapshot'
+
+    def _snapshot_tier(self, secret_name: str) -> Optional[GetValue]:
+        """
+        The tier of the fallback snapshot (None without a snapshot, or if it can't be read)
+        """
+        if self.fallback_snapshot is None:
+            return None
         try:
-            response = self._load_secret(secret_name, client)
-            self._secrets[secret_name] = response
-            return response
-        except ClientError as error:
-            if required:
-                raise error
+            snapshot = read_snapshot(self.fallback_snapshot, key=self.fallback_snapshot_key)
+        except (OSError, InvalidSnapshotException):
             return None
+        found = None
+        for name, response in snapshot.tiers:
+            if name == secret_name:
+                found = response
+            else:
+                self._release(response)
+        return found
 
-    def _load_secret(self, secret_name: str, client: BaseClient) -> GetValue:
+    def _complete(self, secret_name: str, generation: int, future: Future):
+        """
+        Merge a tier fetched after its deadline
+        """
+        if future.cancelled() or future.exception() is not None:
+            return
+        response, error = future.result()
+        with self._lock:
+            if generation != self._generation:
+                if response is not None:
+                    self._release(response)  # The manager was closed meanwhile
+                return
+            if error is None:
+                self._merge(secret_name, response)
+                self._degraded.pop(secret_name, None)
+        self._notify()
+
+    def _try_load_secret(self, secret_name: str, client: BaseClient, provider: BaseProvider) -> tuple:
+        """
+        (response, None), or (None, error) if the provider failed
+        """
         try:
-            raw_secret = client.get_secret_value(
-                SecretId=secret_name
-            )
-        except ClientError as error:
-            error_code = error.response['Error']['Code']
-            err = define_error(error_code)
-            str(err)
-            raise error
+            if client is None and self._uses_pool(secret_name, provider):  # Left to the fetch by `_fetch_many`
+                client = self._pooled_client(secret_name, provider)
+            return self._load_secret(secret_name, client, provider), None
+        except provider.ERRORS as error:
+            return None, error
 
-        else:
-            if raw_secret.get('SecretBinary'):
-                raw_secret['SecretValues'] = base64.b64decode(raw_secret['SecretBinary'])
-                del raw_secret['SecretBinary']
+    def reload(self, secret_name: str = None, client: BaseClient = None,
+               required: bool = False, deadline: float = None) -> Optional[GetValue]:
+        """
+        Fetch a secret again and replace its tier in place (keeping its precedence).
+        Subscribers of the keys whose effective value changed are notified.
+        If the secret can't be fetched and is not required, the loaded version is kept.
+        :param secret_name: The AWS Secrets Manager secret name (defaults to default_secret_name)
+        :param client: The boto3 client (defaults to the client the secret was loaded with)
+        :param required: If the secret is required (default: False)
+        :param deadline: Return within this many seconds, keeping the loaded version until the fetch completes
+        """
+        if secret_name is None:
+            secret_name = self.default_secret_name
+        if client is None:
+            client = self._clients.get(secret_name)
+        with self.tracer.span('supersecret.reload', {tracing.SECRET_NAME: secret_name}) as span:
+            if deadline is not None:
+                self._resolve(secret_name, client, None, pooled=False)
+                self._fetch_many([secret_name], required, deadline=deadline, span=span)
+                return self._secrets.get(secret_name)
+            response = self._fetch(secret_name, client, required, span=span)
+        if response is None:
+            return self._secrets.get(secret_name)
+        return response
+
+    def refresh(self, required: bool = False, deadline: float = None):
+        """
+        Reload every loaded tier (in precedence order).
+        With a deadline, the tiers are fetched in parallel and the ones that miss it keep their loaded version.
+        """
+        with self.tracer.span('supersecret.refresh') as span:
+            if deadline is not None:
+                self._fetch_many(list(self._secrets), required, deadline=deadline, span=span)
+                return
+            for secret_name in list(self._secrets):
+                self.reload(secret_name, required=required)
+
+    def export_snapshot(self, path, key: bytes = None):
+        """
+        Write every loaded tier (values, VersionIds and precedence) to a snapshot file.
+        :param path: The snapshot file path
+        :param key: AES key (16, 24 or 32 bytes) to encrypt the snapshot with (requires cryptography)
+        """
+        write_snapshot(path, [(name, response, self._tier_values(response))
+                              for name, response in self._secrets.items()], key=key)
+
+    @classmethod
+    def from_snapshot(cls, path, max_age: float = None, key: bytes = None, **kwargs):
+        """
+        Create a manager serving the tiers of a snapshot file.
+        The file is memory-mapped and values are decoded on first access.
+        :param path: The snapshot file path
+        :param max_age: If the snapshot is older (in seconds), reload every tier from AWS.
+            Tiers that can't be fetched (AWS errors, no network or credentials) keep their snapshot values.
+        :param key: AES key the snapshot was encrypted with
+        :param kwargs: Constructor arguments
+        """
+        manager = cls(**kwargs)
+        snapshot = read_snapshot(path, key=key)
+        for secret_name, response in snapshot.tiers:
+            manager._set_tier(secret_name, response)
+        manager.snapshot_created = snapshot.created
+        if max_age is not None and snapshot.age > max_age:
+            manager.refresh()
+        return manager
+
+    def subscribe(self, keys_or_prefixes: Union[str, Iterable[str]],
+                  callback: Callable[[ChangeSet], None]) -> Subscription:
+        """
+        Call `callback(changes)` whenever a load or reload changes the effective value of a key.
+        A key matches a pattern when it is equal to it or starts with `{pattern}__`.
+        The callback only receives the changes of the keys it subscribed to. Callbacks run once the tier is
+        merged, outside the manager's lock; a failing callback is logged and the others are still called.
+        :return: The subscription (pass it to `unsubscribe`)
+        """
+        return self._subscriptions.subscribe(keys_or_prefixes, callback)
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscriptions.unsubscribe(subscription)
+
+    def instrument(self, hooks: Iterable[Hook] = (), metrics: Metrics = None) -> Metrics:
+        """
+        Start recording metrics (AWS calls, lookups, conversions and `dict` calls).
+        :param hooks: Callables called with `(event, data)` for every recorded event
+        :param metrics: The Metrics to record into (default: the current one or a new one)
+        :return: The Metrics
+        """
+        self._metrics = metrics or self._metrics or Metrics()
+        for hook in hooks:
+            self._metrics.add_hook(hook)
+        return self._metrics
+
+    def uninstrument(self):
+        """
+        Stop recording metrics
+        """
+        self._metrics = None
+
+    def stats(self) -> dict:
+        """
+        The recorded metrics (empty when the manager is not instrumented)
+        """
+        return self._metrics.as_dict() if self._metrics is not None else {}
+
+    def _fetch(self, secret_name: str, client: BaseClient, required: bool,
+               provider: BaseProvider = None, span: Span = NOOP_SPAN) -> Optional[GetValue]:
+        """
+        Fetch a tier and merge it, joining the fetch already in progress if there is one (single flight).
+        The cache outcome is set on `span`.
+        """
+        client, provider = self._resolve(secret_name, client, provider)
+        with self._lock:
+            future = self._inflight.get(secret_name)
+            owner = future is None
+            if owner:  # Other callers join this fetch (single flight), it runs in the calling thread
+                future = self._inflight[secret_name] = Future()
+        try:
+            if owner:
+                try:
+                    future.set_result(self._try_load_secret(secret_name, client, provider))
+                except BaseException as error:
+                    future.set_exception(error)
+            response, error = future.result()
+            if error is not None:
+                span.set_attribute(tracing.CACHE, 'error')
+                if required:
+                    raise error
+                return None
+            response = self._merge(secret_name, response, span)
+            with self._lock:
+                self._degraded.pop(secret_name, None)
+            self._notify()
+            return response
+        finally:
+            if owner:  # Once merged: callers arriving until then join the fetch instead of fetching again
+                self._forget(secret_name, future)
+
+    def _resolve(self, secret_name: str, client: Optional[BaseClient], provider: Optional[BaseProvider],
+                 pooled: bool = True) -> tuple:
+        """
+        (client, provider) of a tier, remembering the explicit ones for the reloads
+        :param pooled: Build the pooled client of a spec tier (it may assume the role), otherwise the client is None
+        """
+        if client is not None:
+            self._clients[secret_name] = client
+        if provider is not None:
+            self._providers[secret_name] = provider
+        provider = self._providers.get(secret_name, self.provider)
+        if client is None:
+            client = self._clients.get(secret_name)
+        if client is None:
+            if self._uses_pool(secret_name, provider):
+                # Not remembered: the pool rebuilds the client when the role credentials are refreshed
+                client = self._pooled_client(secret_name, provider) if pooled else None
             else:
-                value = raw_secret['SecretString']
-                if isinstance(value, str):
-                    value = json.loads(value)
-                raw_secret['SecretValues'] = value
-                del raw_secret['SecretString']
+                client = self._client_for(provider)
+        return client, provider
 
-            return GetValue(**raw_secret)
+    def _uses_pool(self, secret_name: str, provider: BaseProvider) -> bool:
+        return secret_name in self._specs and bool(provider.SERVICE_NAME) and provider.client is None
+
+    def _pooled_client(self, secret_name: str, provider: BaseProvider) -> BaseClient:
+        return self._client_pool.client(provider.SERVICE_NAME, self._specs[secret_name], **self._client_kwargs())
+
+    def _merge(self, secret_name: str, response: GetValue, span: Span = NOOP_SPAN) -> GetValue:
+        """
+        Merge a fetched tier, the cache outcome is set on `span`
+        """
+        with self._lock:  # Late fetches are merged from the background threads
+            previous = self._secrets.get(secret_name)
+            unchanged = previous is not None and previous.VersionId == response.VersionId
+            span.set_attribute(tracing.CACHE, 'unchanged' if unchanged else 'miss')
+            span.set_attribute(tracing.VERSION_ID, response.VersionId)
+            self._set_tier(secret_name, response)
+            return self._secrets[secret_name]
+
+    def _set_tier(self, secret_name: str, response: GetValue):
+        """
+        Add or replace a tier and update the merged index
+        """
+        previous = self._secrets.get(secret_name)
+        self._keep_stages(previous, response)
+        if previous is not None and previous.VersionId == response.VersionId:
+            if response is not previous:
+                # Same version, nothing to re-merge; the other stages may have moved (e.g. a rotation started)
+                previous.Stages, response.Stages = response.Stages, previous.Stages
+                self._release(response)
+                self._set_stages(secret_name, previous)
+            return
+        self._secrets[secret_name] = response
+        self._set_stages(secret_name, response)
+        values = PathMapping.build(self._tier_values(response))  # Paths are indexed once per load
+        with self.tracer.span('supersecret.index', {tracing.SECRET_NAME: secret_name,
+                                                    tracing.KEY_COUNT: len(values)}) as span:
+            moves = self._index.set_tier(secret_name, values)
+            span.set_attribute(tracing.MOVED_KEYS, len(moves))
+        self._tier_changed(moves)
+        if previous is not None:
+            self._release(previous)
+
+    @staticmethod
+    def _keep_stages(previous: Optional[GetValue], response: GetValue):
+        """
+        Stages that could not be fetched (None) keep the version fetched before, if there is one
+        """
+        previous_stages = (previous.Stages if previous is not None else None) or {}
+        for stage, staged in list((response.Stages or {}).items()):
+            if staged is not None:
+                continue
+            kept = previous_stages.pop(stage, None)  # Moved: releasing the previous version must not zero it
+            if kept is None or kept is previous:
+                del response.Stages[stage]
+            else:
+                response.Stages[stage] = kept
+
+    def _set_stages(self, secret_name: str, response: GetValue):
+        if response.Stages:
+            self._staged[secret_name] = {stage: PathMapping.build(self._tier_values(staged))
+                                         for stage, staged in response.Stages.items()}
+        else:
+            self._staged.pop(secret_name, None)
+
+    def _tier_changed(self, moves: Moves):
+        """
+        Called with the index moves after a tier was added or replaced (with the lock held).
+        The subscriptions are notified by `_notify`, once the lock is released.
+        """
+        if self._subscriptions:
+            self._notifications.append(moves)
+
+    def _notify(self):
+        """
+        Dispatch the pending change notifications in merge order. Called without the lock held, so slow
+        callbacks don't block the fetches and merges of other threads.
+        """
+        if not self._notifications:
+            return
+        with self._dispatch_lock:
+            while self._notifications:
+                try:
+                    moves = self._notifications.popleft()
+                except IndexError:  # Dispatched by a callback reloading a tier
+                    break
+                self._subscriptions.dispatch(moves)
+
+    @staticmethod
+    def _release(response: GetValue):
+        """
+        Zero the payload of an evicted binary tier (and of its other stages)
+        """
+        if isinstance(response.SecretValues.data, BinaryValues):
+            response.SecretValues.data.close()
+        for staged in (response.Stages or {}).values():
+            if staged is not None and staged is not response:
+                SecretParser._release(staged)
+
+    @staticmethod
+    def _tier_values(response: GetValue) -> Mapping:
+        data = response.SecretValues.data
+        return data if isinstance(data, Mapping) else {}
+
+    def _load_secret(self, secret_name: str, client: BaseClient, provider: BaseProvider = None) -> GetValue:
+        provider = provider or self.provider
+        attributes = {tracing.SECRET_NAME: secret_name, tracing.OPERATION: provider.OPERATION,
+                      tracing.PROVIDER: type(provider).__name__}
+        with self.tracer.span('supersecret.fetch', attributes) as span, tracing.activate(self.tracer):
+            response = self._call_provider(secret_name, client, provider)
+            span.set_attribute(tracing.VERSION_ID, response.VersionId)
+            stages = self._stages.get(secret_name)
+            if stages:
+                response.Stages = self._fetch_stages(secret_name, client, provider, response, stages)
+        return response
+
+    def _fetch_stages(self, secret_name: str, client: BaseClient, provider: BaseProvider, response: GetValue,
+                      stages: Tuple[str, ...]) -> Dict[str, GetValue]:
+        """
+        Versions of the other stages of a tier. Stages without a version (e.g. AWSPENDING outside a rotation)
+        are skipped, the stages that failed otherwise (e.g. throttling) are None: `_set_tier` keeps their
+        previous version.
+        """
+        fetched = {}
+        for stage in stages:
+            if stage in (response.VersionStages or ()):
+                fetched[stage] = response
+                continue
+            try:
+                fetched[stage] = self._call_provider(secret_name, client, provider, stage)
+            except provider.ERRORS as error:
+                if error_code(error) != 'ResourceNotFoundException':
+                    fetched[stage] = None
+        return fetched
+
+    def _call_provider(self, secret_name: str, client: BaseClient, provider: BaseProvider,
+                       stage: str = None) -> GetValue:
+        fetch = provider.fetch if stage is None else partial(provider.fetch_stage, stage=stage)
+        metrics = self._metrics
+        if metrics is None:
+            return fetch(secret_name, client)
+        start = time.perf_counter()
+        try:
+            return fetch(secret_name, client)
+        except provider.ERRORS as error:
+            metrics.aws_error(secret_name, provider.OPERATION, error)
+            raise
+        finally:
+            metrics.aws_call(secret_name, provider.OPERATION, time.perf_counter() - start)
 
     def close(self):
+        with self._lock:
+            self._generation += 1
+            pool, self._pool = self._pool, None
+            self._inflight.clear()
+            self._degraded.clear()
+            self._discovered.clear()
+            self._staged.clear()
+            self._notifications.clear()
+        if pool is not None:
+            pool.shutdown(wait=False)
         try:
             if self.__client_created and self.client:
                 self.client.close()
         finally:
             self.client = None
+            for response in self._secrets.values():
+                self._release(response)
             self._secrets = OrderedDict()
+            self._index.clear()
+            self._clients.clear()
+            for provider in self._providers.values():
+                if provider is not self.provider:
+                    provider.close()
+            self._providers.clear()
+            self.provider.close()
+
+    # Pickling (e.g. to hand a loaded manager to process pool workers)
+    def __getstate__(self):
+        """
+        The loaded tiers, the merged index and the caches are pickled, so workers don't fetch or index again.
+        Clients, subscriptions, metrics, the tracer and fetches in progress are process-local and left out;
+        the unpickled manager connects again if it needs AWS. The live environment stays live (os.environ
+        of the unpickling process).
+        """
+        state = self.__dict__.copy()
+        state.update(
+            client=None,
+            _SecretParser__client_created=False,
+            _env=None if self._env is os.environ else self._env,
+            _clients={},
+            _subscriptions=None,
+            _notifications=None,
+            _dispatch_lock=None,
+            _metrics=None,
+            tracer=None,
+            _degraded={},
+            _inflight={},
+            _lock=None,
+            _pool=None,
+            _discovered={},  # Listing times are monotonic clock values of this process
+            _client_pool=None,
+        )
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self._env is None:
+            self._env = os.environ
+        self._subscriptions = SubscriptionRegistry()
+        self._notifications = deque()
+        self._dispatch_lock = threading.RLock()
+        self.tracer = NOOP_TRACER
+        self._lock = threading.RLock()
+        self._client_pool = CLIENT_POOL
 
     # Context Management
     def __enter__(self):
@@ -0,0 +1,399 @@
+"""
+Secret providers.
+
+A provider fetches one tier of the merged tier stack and returns it as a `GetValue`,
+whatever the backing service is. `SecretParser.load(..., provider=...)` selects the provider of a tier.
+
+Providers:
+* `SecretsManagerProvider`: AWS Secrets Manager `GetSecretValue` (the default)
+* `SSMParameterProvider`: AWS Systems Manager Parameter Store, a whole path hierarchy per tier
+* `JSONFileProvider`: a JSON object file
+* `DotEnvProvider`: a `.env` file
+* `DirectoryProvider`: a directory with one file per key (e.g. Kubernetes secret volumes)
+
+File providers need no AWS client. Files are memory-mapped and parsed once; a reload only stats the
+file(s) and re-reads them if the inode, modification time or size changed.
+"""
+import datetime
+import hashlib
+import json
+import mmap
+import os
+import re
+from contextlib import contextmanager
+from typing import List, Mapping, Optional
+
+from botocore.client import BaseClient
+from botocore.exceptions import BotoCoreError, ClientError
+
+from .binary import BinaryValues
+from .dto import GetValue
+from .exceptions import define_error
+from .lazy import LazyJSONObject
+from . import tracing
+
+KEY_SEPARATOR = '__'
+# GetSecretValue response fields that may be missing (e.g. stubbed responses)
+OPTIONAL_RESPONSE_FIELDS = ('ARN', 'VersionStages', 'CreatedDate', 'ResponseMetadata')
+
+
+class BaseProvider:
+    """
+    Base class of the secret providers
+    """
+    SERVICE_NAME: Optional[str] = None
+    # Operation name reported by the metrics
+    OPERATION = 'Fetch'
+    # Errors that skip a tier that is not required (AWS errors, and connection or credential failures)
+    ERRORS = (ClientError, BotoCoreError)
+
+    def __init__(self, client: BaseClient = None):
+        """
+        :param client: The boto3 client (default: created on first use with the manager's AWS kwargs)
+        """
+        self.client = client
+        self._client_created = False
+
+    def connect(self, **aws_kwargs) -> Optional[BaseClient]:
+        """
+        Client of the provider's service (None for providers that don't need one)
+        """
+        if self.client is None and self.SERVICE_NAME:
+            import boto3
+            self.client = boto3.client(self.SERVICE_NAME, **aws_kwargs)
+            self._client_created = True
+        return self.client
+
+    def fetch(self, name: str, client: BaseClient) -> GetValue:
+        """
+        Fetch a tier
+        :param name: The tier name (secret id, parameter path, ...)
+        :param client: The client to use
+        """
+        raise NotImplementedError
+
+    def fetch_stage(self, name: str, client: BaseClient, stage: str) -> GetValue:
+        """
+        Fetch the version of a tier with a version stage label (e.g. AWSPREVIOUS)
+        """
+        raise NotImplementedError(f'{self.__class__.__name__} has no version stages')
+
+    def __getstate__(self):
+        # Clients are not picklable, the unpickled provider connects again on first use
+        state = self.__dict__.copy()
+        state.update(client=None, _client_created=False)
+        return state
+
+    def close(self):
+        try:
+            if self._client_created and self.client:
+                self.client.close()
+        finally:
+            if self._client_created:
+                self.client = None
+            self._client_created = False
+
+
+class SecretsManagerProvider(BaseProvider):
+    """
+    AWS Secrets Manager secrets.
+    Secret strings are decoded as JSON objects, binary secrets are copied once into a zeroable buffer.
+    """
+    SERVICE_NAME = 'secretsmanager'
+    OPERATION = 'GetSecretValue'
+
+    def __init__(self, client: BaseClient = None, lazy: bool = False, lock_binary: bool = False):
+        """
+        :param lazy: Index the keys of secret strings and decode each value on first access
+        :param lock_binary: Keep binary secrets in memory locked with mlock
+        """
+        super().__init__(client)
+        self.lazy = lazy
+        self.lock_binary = lock_binary
+
+    def fetch(self, name: str, client: BaseClient) -> GetValue:
+        try:
+            raw_secret = client.get_secret_value(
+                SecretId=name
+            )
+        except ClientError as error:
+            error_code = error.response['Error']['Code']
+            err = define_error(error_code)
+            str(err)
+            raise error
+
+        else:
+            return self.parse(raw_secret)
+
+    def fetch_stage(self, name: str, client: BaseClient, stage: str) -> GetValue:
+        return self.parse(client.get_secret_value(SecretId=name, VersionStage=stage))
+
+    def list_secrets(self, client: BaseClient, prefix: str = None,
+                     tags: Mapping[str, Optional[str]] = None) -> List[str]:
+        """
+        Names of the secrets whose name starts with `prefix` and that have all the `tags`,
+        listed with paginated `ListSecrets` calls. A tag value of None matches any value of the tag.
+        ListSecrets filters match any of their values and ignore the case, so the page entries are checked again.
+        """
+        tags = tags or {}
+        filters = []
+        if prefix:
+            filters.append({'Key': 'name', 'Values': [prefix]})
+        if tags:
+            filters.append({'Key': 'tag-key', 'Values': list(tags)})
+            values = [value for value in tags.values() if value is not None]
+            if values:
+                filters.append({'Key': 'tag-value', 'Values': values})
+        kwargs = {'Filters': filters} if filters else {}
+
+        names = []
+        for page in client.get_paginator('list_secrets').paginate(MaxResults=100, **kwargs):
+            for secret in page['SecretList']:
+                secret_tags = {tag['Key']: tag.get('Value') for tag in secret.get('Tags') or ()}
+                if prefix and not secret['Name'].startswith(prefix):
+                    continue
+                if all(key in secret_tags and value in (None, secret_tags[key]) for key, value in tags.items()):
+                    names.append(secret['Name'])
+        return names
+
+    def parse(self, raw_secret: dict) -> GetValue:
+        """
+        Build the tier from a GetSecretValue response
+        """
+        if raw_secret.get('SecretBinary'):
+            # botocore returns the decoded bytes, copy them once into a zeroable buffer
+            payload = raw_secret.pop('SecretBinary')
+            with tracing.span('supersecret.decode', {tracing.FORMAT: 'binary', tracing.PAYLOAD_SIZE: len(payload)}):
+                raw_secret['SecretValues'] = BinaryValues.from_payload(payload, lock=self.lock_binary)
+        else:
+            value = raw_secret['SecretString']
+            if isinstance(value, str):
+                with tracing.span('supersecret.decode', {tracing.FORMAT: 'lazy_json' if self.lazy else 'json',
+                                                         tracing.PAYLOAD_SIZE: len(value)}):
+                    value = LazyJSONObject(value) if self.lazy else json.loads(value)
+            raw_secret['SecretValues'] = value
+            del raw_secret['SecretString']
+
+        for optional in OPTIONAL_RESPONSE_FIELDS:
+            raw_secret.setdefault(optional, None)
+        with tracing.span('supersecret.dto'):
+            return GetValue(**raw_secret)
+
+
+class SSMParameterProvider(BaseProvider):
+    """
+    AWS Systems Manager Parameter Store.
+
+    A tier is a path: every parameter below it is fetched with paginated `GetParametersByPath` calls
+    (recursive and decrypted), and its name relative to the path is mapped onto the `__` convention:
+    `/app/database/host` loaded with the path `/app` becomes `database__host`.
+    """
+    SERVICE_NAME = 'ssm'
+    OPERATION = 'GetParametersByPath'
+
+    def __init__(self, client: BaseClient = None, recursive: bool = True, with_decryption: bool = True):
+        super().__init__(client)
+        self.recursive = recursive
+        self.with_decryption = with_decryption
+
+    @staticmethod
+    def key(path: str, parameter_name: str) -> str:
+        """
+        `__` key of a parameter relative to the path
+        """
+        relative = parameter_name[len(path):] if parameter_name.startswith(path) else parameter_name
+        return KEY_SEPARATOR.join(part for part in relative.split('/') if part)
+
+    def fetch(self, name: str, client: BaseClient) -> GetValue:
+        path = name if name.endswith('/') else f'{name}/'
+        paginator = client.get_paginator('get_parameters_by_path')
+        values, versions = {}, []
+        created = None
+        for page in paginator.paginate(Path=name, Recursive=self.recursive, WithDecryption=self.with_decryption):
+            for parameter in page['Parameters']:
+                values[self.key(path, parameter['Name'])] = parameter['Value']
+                versions.append(f'{parameter["Name"]}:{parameter.get("Version")}')
+                modified = parameter.get('LastModifiedDate')
+                if modified is not None and (created is None or modified > created):
+                    created = modified
+
+        # The tier version changes whenever a parameter is added, removed or gets a new version
+        version_id = hashlib.sha256('\n'.join(sorted(versions)).encode()).hexdigest()
+        with tracing.span('supersecret.dto'):
+            return GetValue(
+                ARN=None,
+                Name=name,
+                VersionId=version_id,
+                SecretValues=values,
+                VersionStages=[],
+                CreatedDate=created,
+                ResponseMetadata=None,  # A tier aggregates several responses
+            )
+
+
+@contextmanager
+def mapped_file(path):
+    """
+    Memory-map a file for reading (empty files can't be mapped and yield b'')
+    """
+    with open(path, 'rb') as file:
+        if not os.fstat(file.fileno()).st_size:
+            yield b''
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield mapped
+
+
+def file_signature(stat: os.stat_result) -> tuple:
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+class FileProvider(BaseProvider):
+    """
+    Base class of the file providers: the tier name is the path.
+    The parsed tier is cached until the inode, modification time or size of the path changes.
+    """
+    OPERATION = 'ReadFile'
+    ERRORS = (OSError, ValueError)
+    # Format reported by the decode spans
+    FORMAT: Optional[str] = None
+
+    def __init__(self):
+        super().__init__()
+        self._cache = {}  # path -> (signature, GetValue)
+
+    def signature(self, path: str) -> tuple:
+        """
+        Cheap change detection signature of the path
+        """
+        return file_signature(os.stat(path))
+
+    def parse(self, path: str):
+        """
+        Read and parse the path into the tier values
+        """
+        raise NotImplementedError
+
+    def fetch(self, name: str, client: BaseClient = None) -> GetValue:
+        signature = self.signature(name)
+        cached = self._cache.get(name)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+
+        with tracing.span('supersecret.decode', {tracing.FORMAT: self.FORMAT}):
+            values = self.parse(name)
+        with tracing.span('supersecret.dto'):
+            response = GetValue(
+                ARN=None,
+                Name=name,
+                VersionId=hashlib.sha256(repr(signature).encode()).hexdigest(),
+                SecretValues=values,
+                VersionStages=[],
+                CreatedDate=datetime.datetime.fromtimestamp(os.stat(name).st_mtime),
+                ResponseMetadata=None,
+            )
+        self._cache[name] = (signature, response)
+        return response
+
+    def close(self):
+        super().close()
+        self._cache.clear()
+
+
+class JSONFileProvider(FileProvider):
+    """
+    A file holding a JSON object, like a `SecretString`
+    """
+    FORMAT = 'json'
+
+    def __init__(self, lazy: bool = False):
+        """
+        :param lazy: Index the keys and decode each value on first access
+        """
+        super().__init__()
+        self.lazy = lazy
+
+    def parse(self, path: str):
+        with mapped_file(path) as mapped:
+            document = mapped[:].decode()
+        if self.lazy:
+            return LazyJSONObject(document)
+        values = json.loads(document)
+        if not isinstance(values, dict):
+            raise ValueError(f'{path} does not hold a JSON object')
+        return values
+
+
+DOTENV_LINE = re.compile(
+    r"""^\s*(?:export\s+)?(?P<key>[A-Za-z_][A-Za-z0-9_.]*)\s*=\s*"""
+    r"""(?:"(?P<double>(?:[^"\\]|\\.)*)"\s*(?:#.*)?|'(?P<single>[^']*)'\s*(?:#.*)?|(?P<plain>.*?)(?:\s+#.*)?)\s*$"""
+)
+DOTENV_ESCAPES = {'n': '\n', 'r': '\r', 't': '\t', '"': '"', '\\': '\\'}
+
+
+class DotEnvProvider(FileProvider):
+    """
+    A `.env` file: `KEY=value` lines, optionally prefixed with `export`.
+    Values can be single quoted (literal) or double quoted (with \\n, \\t, \\" escapes).
+    Blank lines and `#` comments (at the start of a line or after whitespace) are ignored.
+    """
+    FORMAT = 'dotenv'
+
+    @staticmethod
+    def parse_line(line: str):
+        """
+        (key, value) of a line, None for blank, comment or malformed lines
+        """
+        match = DOTENV_LINE.match(line)
+        if match is None:
+            return None
+        if match.group('double') is not None:
+            value = re.sub(r'\\(.)', lambda m: DOTENV_ESCAPES.get(m.group(1), m.group(0)), match.group('double'))
+        elif match.group('single') is not None:
+            value = match.group('single')
+        else:
+            value = match.group('plain')
+        return match.group('key'), value
+
+    def parse(self, path: str) -> dict:
+        values = {}
+        with mapped_file(path) as mapped:
+            for line in (mapped.split(b'\n') if isinstance(mapped, bytes) else iter(mapped.readline, b'')):
+                parsed = self.parse_line(line.decode().rstrip('\r\n'))
+                if parsed is not None:
+                    values[parsed[0]] = parsed[1]
+        return values
+
+
+class DirectoryProvider(FileProvider):
+    """
+    A directory with one file per key, the file content is the value (e.g. Kubernetes secret volumes).
+    Hidden entries (like the `..data` links of Kubernetes) are skipped and a single trailing
+    newline is removed from the values.
+    """
+    FORMAT = 'directory'
+
+    @staticmethod
+    def _entries(path: str):
+        with os.scandir(path) as entries:
+            return sorted((entry for entry in entries if not entry.name.startswith('.') and entry.is_file()),
+                          key=lambda entry: entry.name)
+
+    def signature(self, path: str) -> tuple:
+        # Files can change without changing the directory, so every file is part of the signature
+        return tuple((entry.name, *file_signature(entry.stat())) for entry in self._entries(path))
+
+    def parse(self, path: str) -> dict:
+        values = {}
+        for entry in self._entries(path):
+            with mapped_file(entry.path) as mapped:
+                value = mapped[:].decode()
+            if value.endswith('\n'):
+                value = value[:-2] if value.endswith('\r\n') else value[:-1]
+            values[entry.name] = value
+        return values
+
+
+# Providers by class name (e.g. to rebuild the tiers of a prefetch manifest)
+PROVIDERS = {provider.__name__: provider for provider in (
+    SecretsManagerProvider, SSMParameterProvider, JSONFileProvider, DotEnvProvider, DirectoryProvider)}
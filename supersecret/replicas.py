@@ -0,0 +1,255 @@
+"""
+Multi-region replicas.
+
+`ReplicaProvider` fetches secrets replicated to several regions (AWS Secrets Manager replica secrets):
+
+    SecretManager("my-secret", provider=ReplicaProvider(["us-east-1", "us-west-2", "eu-west-1"]))
+
+Every region keeps an exponentially weighted moving average (EWMA) of its latency and error rate. A load is
+sent to the fastest healthy region (the configured order breaks ties and ranks the regions not measured yet),
+and a second request is hedged to the next region if the first one takes longer than the 95th percentile of
+its recent latencies. The first successful response wins; a failed request fails over to the next region.
+A region is unhealthy while its error rate is above `max_error_rate`, and is probed again after `cooldown`.
+"""
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Dict, Iterable, List, Mapping, Optional
+
+from botocore.client import BaseClient
+from botocore.exceptions import BotoCoreError, ClientError
+
+from .credentials import CLIENT_POOL, ClientPool, TierSpec
+from .dto import GetValue
+from .providers import SecretsManagerProvider
+
+
+class RegionStats:
+    """
+    Latency and error rate of a region (EWMA), and its recent latencies for the percentiles
+    """
+
+    def __init__(self, alpha: float = 0.2, window: int = 100):
+        self.alpha = alpha
+        self.latency: Optional[float] = None  # Seconds, None until a request succeeded
+        self.error_rate = 0.0
+        self.last_error: Optional[float] = None  # time.monotonic() of the last error
+        self._recent = deque(maxlen=window)
+
+    def success(self, seconds: float):
+        self.latency = seconds if self.latency is None else self.alpha * seconds + (1 - self.alpha) * self.latency
+        self.error_rate = (1 - self.alpha) * self.error_rate
+        self._recent.append(seconds)
+
+    def error(self):
+        self.error_rate = self.alpha + (1 - self.alpha) * self.error_rate
+        self.last_error = time.monotonic()
+
+    def percentile(self, percent: float) -> Optional[float]:
+        """
+        Percentile of the recent latencies (None without any)
+        """
+        if not self._recent:
+            return None
+        ordered = sorted(self._recent)
+        return ordered[max(0, math.ceil(len(ordered) * percent / 100) - 1)]  # Nearest rank
+
+    def as_dict(self) -> dict:
+        p95 = self.percentile(95)
+        return {
+            'latency_ms': None if self.latency is None else round(self.latency * 1000, 3),
+            'p95_ms': None if p95 is None else round(p95 * 1000, 3),
+            'error_rate': round(self.error_rate, 4),
+        }
+
+
+class ReplicaRouter:
+    """
+    Ranks the regions of a replicated secret by health and latency
+    """
+
+    def __init__(self, regions: Iterable[str], alpha: float = 0.2, max_error_rate: float = 0.5,
+                 cooldown: float = 30.0, min_samples: int = 5):
+        """
+        :param regions: The regions in order of preference
+        :param alpha: Weight of a new sample in the moving averages
+        :param max_error_rate: A region with a higher error rate (EWMA) is unhealthy
+        :param cooldown: Seconds after its last error an unhealthy region is probed again
+        :param min_samples: Latencies needed before the p95 is used as the hedging delay
+        """
+        self.regions: List[str] = list(regions)
+        if not self.regions:
+            raise ValueError('At least one region is required')
+        self.max_error_rate = max_error_rate
+        self.cooldown = cooldown
+        self.min_samples = min_samples
+        self.alpha = alpha
+        self.stats: Dict[str, RegionStats] = {region: RegionStats(alpha) for region in self.regions}
+        self._lock = threading.Lock()
+
+    def healthy(self, region: str) -> bool:
+        stats = self.stats[region]
+        return stats.error_rate <= self.max_error_rate or time.monotonic() - stats.last_error >= self.cooldown
+
+    def ranked(self) -> List[str]:
+        """
+        Healthy regions from the fastest, then the unhealthy ones in order of preference
+        """
+        with self._lock:
+            def key(item):
+                index, region = item
+                if not self.healthy(region):
+                    return True, False, 0.0, index
+                latency = self.stats[region].latency
+                return False, latency is None, latency or 0.0, index
+            return [region for _, region in sorted(enumerate(self.regions), key=key)]
+
+    def hedge_delay(self, region: str, default: float) -> float:
+        """
+        Seconds to wait for a region before hedging: the p95 of its recent latencies
+        """
+        with self._lock:
+            stats = self.stats[region]
+            if len(stats._recent) < self.min_samples:
+                return default
+            return stats.percentile(95)
+
+    def success(self, region: str, seconds: float):
+        with self._lock:
+            self.stats[region].success(seconds)
+
+    def error(self, region: str):
+        with self._lock:
+            self.stats[region].error()
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {region: dict(stats.as_dict(), healthy=self.healthy(region))
+                    for region, stats in self.stats.items()}
+
+    def __getstate__(self):
+        # The statistics are process-local (monotonic clock values, latencies from this host)
+        state = self.__dict__.copy()
+        state.update(stats=None, _lock=None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.stats = {region: RegionStats(self.alpha) for region in self.regions}
+        self._lock = threading.Lock()
+
+
+class ReplicaProvider(SecretsManagerProvider):
+    """
+    AWS Secrets Manager secrets replicated to several regions, fetched from the fastest healthy one
+    """
+    SERVICE_NAME = None  # The provider connects to every region itself
+    ERRORS = (ClientError, BotoCoreError)
+
+    def __init__(self, regions: Iterable[str], clients: Mapping[str, BaseClient] = None, hedge: bool = True,
+                 hedge_delay: float = 0.2, client_pool: ClientPool = None, lazy: bool = False,
+                 lock_binary: bool = False, **router_kwargs):
+        """
+        :param regions: The regions in order of preference
+        :param clients: Client of some regions (default: pooled clients with the manager's credentials)
+        :param hedge: Send a second request to the next region when the first one is slow
+        :param hedge_delay: Hedging delay until a region has enough latency samples for its p95
+        :param client_pool: Pool of the region clients (default: shared by the process)
+        :param router_kwargs: ReplicaRouter options (alpha, max_error_rate, cooldown, min_samples)
+        """
+        super().__init__(lazy=lazy, lock_binary=lock_binary)
+        self.router = ReplicaRouter(regions, **router_kwargs)
+        self.clients: Dict[str, BaseClient] = dict(clients or {})
+        self.hedge = hedge
+        self.hedge_delay = hedge_delay
+        self.client_pool = client_pool or CLIENT_POOL
+        self._aws_kwargs = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def connect(self, **aws_kwargs) -> Optional[BaseClient]:
+        """
+        Client of the preferred region (e.g. for `discover`), region clients are created on first use
+        """
+        self._aws_kwargs = aws_kwargs
+        return self.region_client(self.router.ranked()[0])
+
+    def region_client(self, region: str) -> BaseClient:
+        client = self.clients.get(region)
+        if client is None:
+            client = self.client_pool.client('secretsmanager', TierSpec(region=region), **self._aws_kwargs)
+        return client
+
+    def stats(self) -> dict:
+        """
+        Latency (EWMA and p95), error rate and health of every region
+        """
+        return self.router.as_dict()
+
+    def fetch(self, name: str, client: BaseClient = None) -> GetValue:
+        """
+        Fetch from the fastest healthy region, hedging to the next one after its p95 latency
+        and failing over on errors
+        """
+        remaining = self.router.ranked()
+        primary = remaining.pop(0)
+        futures = {self._submit(primary, name)}
+        hedged = not self.hedge
+        error = None
+        while futures:
+            timeout = None if hedged or not remaining else self.router.hedge_delay(primary, self.hedge_delay)
+            done, futures = wait(futures, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                hedged = True
+                futures.add(self._submit(remaining.pop(0), name))
+                continue
+            for future in done:
+                try:
+                    return self.parse(future.result())
+                except self.ERRORS as exception:
+                    error = exception
+            if not futures and remaining:  # Fail over, the next region is hedged after its own p95
+                primary = remaining.pop(0)
+                futures.add(self._submit(primary, name))
+                hedged = not self.hedge
+        raise error
+
+    def _submit(self, region: str, name: str) -> Future:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(thread_name_prefix='supersecret-replica')
+            return self._executor.submit(self._timed_fetch, region, name)
+
+    def _timed_fetch(self, region: str, name: str) -> dict:
+        """
+        GetSecretValue in one region, recording its latency or error (also for a hedged request that lost)
+        """
+        start = time.perf_counter()
+        try:
+            raw_secret = self.region_client(region).get_secret_value(SecretId=name)
+        except self.ERRORS:
+            self.router.error(region)
+            raise
+        self.router.success(region, time.perf_counter() - start)
+        return dict(raw_secret)
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        state.update(clients={}, client_pool=None, _executor=None, _lock=None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.client_pool = CLIENT_POOL
+        self._lock = threading.Lock()
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            with self._lock:
+                executor, self._executor = self._executor, None
+            if executor is not None:
+                executor.shutdown(wait=False)
@@ -0,0 +1,249 @@
+"""
+Lazy settings for Django, Flask or any settings module.
+
+Settings are declared on a `SecretSettings` class. Nothing is fetched when the settings are built:
+a setting is resolved and converted on first access, then stored on the instance, so later reads are
+plain attribute reads. `warm()` resolves every setting in one `many()` pass, e.g. in a web worker before
+it serves requests. Settings resolve once: a reload of the manager doesn't change them (see `reset`).
+
+    class Settings(SecretSettings):
+        DEBUG = Setting(fields.Bool, default="false")
+        DATABASE_PORT = Setting(fields.Int, key="database.default.PORT")
+        SECRET_KEY = Setting()
+
+    settings = Settings(SecretManager("my-secret"))
+
+Django copies every upper case name of the settings module when it starts, so a settings module exports
+`LazyValue` proxies instead: `globals().update(settings.lazy())`. A proxy resolves its setting on first use
+and forwards to the value. Django type-checks a few settings when it starts (`DJANGO_EAGER_SETTINGS`, e.g.
+`ALLOWED_HOSTS` must be a list or tuple), `lazy()` exports them resolved. Flask reads `app.config` like
+a dict: `install_flask(app, settings)` resolves a missing key on first read and stores the value in the config.
+"""
+import operator
+from typing import Any, Dict, Iterable
+
+import marshmallow as ma
+
+from . import fields
+from .manager import NotSet, SecretManager
+
+# Settings Django checks the type of when it starts (a proxy is rejected), exported resolved by `lazy()`
+DJANGO_EAGER_SETTINGS = frozenset(('ALLOWED_HOSTS', 'INSTALLED_APPS', 'LOCALE_PATHS', 'SECRET_KEY_FALLBACKS',
+                                   'TEMPLATE_DIRS', 'TIME_ZONE'))
+
+
+class Setting:
+    """
+    A setting read from the manager on first access (a non-data descriptor: the value then shadows it)
+    """
+
+    def __init__(self, field=fields.Str, default: Any = NotSet, key: str = None):
+        """
+        :param field: Field class or instance converting the value (default: Str)
+        :param default: Default (converted like a value) when the key is missing
+        :param key: Key or path of the value (default: the attribute name)
+        """
+        self.field = field
+        self.default = default
+        self.key = key
+        self.name = None
+
+    def __set_name__(self, owner, name):
+        self.name = name
+        if self.key is None:
+            self.key = name
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        value = instance.resolve(self.name)
+        instance.__dict__[self.name] = value
+        return value
+
+
+class SecretSettings:
+    """
+    Base class of the lazy settings
+    """
+    _settings: Dict[str, Setting] = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._settings = {}
+        for klass in reversed(cls.__mro__):
+            cls._settings.update({name: value for name, value in vars(klass).items() if isinstance(value, Setting)})
+
+    def __init__(self, manager: SecretManager):
+        self.manager = manager
+
+    def resolve(self, name: str) -> Any:
+        """
+        Read and convert a setting (not memoized, see the attribute access)
+        """
+        setting = self._settings[name]
+        defaults = None if setting.default is NotSet else {setting.key: setting.default}
+        return self.manager.many({setting.key: setting.field}, defaults=defaults)[setting.key]
+
+    def warm(self, names: Iterable[str] = None) -> 'SecretSettings':
+        """
+        Resolve every setting not resolved yet in one pass (missing and invalid keys are reported together).
+        Settings reading a key already read by another setting (with another field) go in another `many()` pass.
+        :param names: Only resolve these settings
+        """
+        names = self._settings if names is None else names
+        batches = []  # [{key: setting name}]
+        for name in names:
+            if name in self.__dict__:
+                continue
+            key = self._settings[name].key
+            batch = next((batch for batch in batches if key not in batch), None)
+            if batch is None:
+                batch = {}
+                batches.append(batch)
+            batch[key] = name
+        values, errors, valid_data = {}, {}, {}
+        for batch in batches:
+            settings = {key: self._settings[name] for key, name in batch.items()}
+            spec = {key: setting.field for key, setting in settings.items()}
+            defaults = {key: setting.default for key, setting in settings.items() if setting.default is not NotSet}
+            try:
+                result = self.manager.many(spec, defaults=defaults)
+            except ma.ValidationError as error:
+                errors.update(error.messages)
+                valid_data.update(error.valid_data)
+                continue
+            valid_data.update(result)
+            values.update({name: result[key] for key, name in batch.items()})
+        if errors:
+            raise ma.ValidationError(errors, valid_data=valid_data)
+        self.__dict__.update(values)
+        return self
+
+    def reset(self):
+        """
+        Forget the resolved settings, they are read again on next access (e.g. after a reload)
+        """
+        for name in self._settings:
+            self.__dict__.pop(name, None)
+
+    def as_dict(self) -> Dict[str, Any]:
+        """
+        Every setting by name (resolves them)
+        """
+        self.warm()
+        return {name: self.__dict__[name] for name in self._settings}
+
+    def lazy(self, eager: Iterable[str] = DJANGO_EAGER_SETTINGS) -> Dict[str, Any]:
+        """
+        A LazyValue proxy of every setting, for settings modules that are copied when the framework starts.
+        The `eager` settings that are declared are resolved now instead (one `warm` pass).
+        """
+        eager = set(eager).intersection(self._settings)
+        if eager:
+            self.warm(eager)
+        return {name: self.__dict__[name] if name in eager else LazyValue(self, name) for name in self._settings}
+
+
+def _forward(method):
+    def forward(self, *args):
+        return method(self._resolve(), *args)
+    forward.__name__ = getattr(method, '__name__', 'forward')
+    return forward
+
+
+class LazyValue:
+    """
+    Proxy of a setting, resolved on first use and forwarding to the value.
+    The value itself is cached: only the first use reads the manager.
+    """
+    __slots__ = ('_settings', '_name', '_value')
+
+    def __init__(self, settings: SecretSettings, name: str):
+        object.__setattr__(self, '_settings', settings)
+        object.__setattr__(self, '_name', name)
+        object.__setattr__(self, '_value', NotSet)
+
+    def _resolve(self):
+        value = self._value
+        if value is NotSet:
+            value = getattr(self._settings, self._name)
+            object.__setattr__(self, '_value', value)
+        return value
+
+    def __getattr__(self, item):
+        return getattr(self._resolve(), item)
+
+    def __repr__(self):
+        if self._value is NotSet:
+            return f'<LazyValue {self._name} (not resolved)>'
+        return repr(self._value)
+
+    __str__ = _forward(str)
+    __bytes__ = _forward(bytes)
+    __bool__ = _forward(bool)
+    __int__ = _forward(int)
+    __float__ = _forward(float)
+    __index__ = _forward(operator.index)
+    __hash__ = _forward(hash)
+    __len__ = _forward(len)
+    __iter__ = _forward(iter)
+    __fspath__ = _forward(lambda value: value.__fspath__())
+    __format__ = _forward(format)
+    __eq__ = _forward(operator.eq)
+    __ne__ = _forward(operator.ne)
+    __lt__ = _forward(operator.lt)
+    __le__ = _forward(operator.le)
+    __gt__ = _forward(operator.gt)
+    __ge__ = _forward(operator.ge)
+    __getitem__ = _forward(operator.getitem)
+    __contains__ = _forward(operator.contains)
+    __add__ = _forward(operator.add)
+    __sub__ = _forward(operator.sub)
+    __mul__ = _forward(operator.mul)
+    __truediv__ = _forward(operator.truediv)
+    __floordiv__ = _forward(operator.floordiv)
+    __mod__ = _forward(operator.mod)
+    __radd__ = _forward(lambda value, other: other + value)
+    __rsub__ = _forward(lambda value, other: other - value)
+    __rmul__ = _forward(lambda value, other: other * value)
+
+
+class LazyConfig:
+    """
+    Mixin of a dict config (e.g. flask.Config) resolving the missing keys that are declared settings
+    """
+    _lazy_settings: SecretSettings = None
+
+    def __missing__(self, key):
+        settings = self._lazy_settings
+        if settings is None or key not in settings._settings:
+            raise KeyError(key)
+        value = self[key] = getattr(settings, key)
+        return value
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key):
+        return super().__contains__(key) or (self._lazy_settings is not None and key in self._lazy_settings._settings)
+
+
+_LAZY_CONFIG_CLASSES = {}
+
+
+def install_flask(app, settings: SecretSettings):
+    """
+    Serve the settings through `app.config`: each is resolved on its first read and stored in the config
+    (keys already set in the config win)
+    """
+    config = app.config
+    config_class = config.__class__
+    if not isinstance(config, LazyConfig):
+        if config_class not in _LAZY_CONFIG_CLASSES:
+            _LAZY_CONFIG_CLASSES[config_class] = type(f'Lazy{config_class.__name__}', (LazyConfig, config_class), {})
+        config.__class__ = _LAZY_CONFIG_CLASSES[config_class]
+    config._lazy_settings = settings
+    return config
@@ -0,0 +1,224 @@
+"""
+Snapshot files of the loaded secret tiers.
+
+A snapshot stores every loaded tier (in precedence order) with its VersionId so a process can
+start from a file baked into an image instead of calling AWS.
+
+Format (little endian):
+* Header: magic `SSNP`, format version (u16), flags (u16), created timestamp (f64), tier count (u32)
+* Body (AES-GCM encrypted with a 12 byte nonce when the `ENCRYPTED` flag is set), for every tier:
+    * metadata length (u32) + JSON metadata (tier name, Name, ARN, VersionId, VersionStages, CreatedDate)
+    * key count (u32), data length (u32)
+    * key table: key offset, key length, value offset, value length (4 x u32) relative to the data
+    * data: UTF-8 keys and JSON encoded values (the raw payload for binary tiers, without keys)
+
+Unencrypted snapshots are memory-mapped, only the key tables are read up front and values are
+decoded on first access. Encryption requires the `cryptography` package.
+"""
+import datetime
+import json
+import mmap
+import os
+import struct
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import Iterable, List, Tuple
+
+from .binary import BinaryValues
+from .dto import GetValue
+from .exceptions import InvalidSnapshotException
+from .util import LazyMapping
+
+MAGIC = b'SSNP'
+FORMAT_VERSION = 1
+ENCRYPTED = 0x1
+
+HEADER = struct.Struct('<4sHHdI')
+LENGTH = struct.Struct('<I')
+TIER_SIZES = struct.Struct('<II')
+KEY_ENTRY = struct.Struct('<IIII')
+NONCE_SIZE = 12
+
+
+class SnapshotValues(LazyMapping):
+    """
+    Values of a snapshot tier, decoded from the snapshot buffer on first access
+    """
+
+    def __init__(self, buffer, offsets: dict):
+        super().__init__(offsets)
+        self._buffer = buffer
+
+    def _decode(self, start, end):
+        return json.loads(self._buffer[start:end])
+
+    def raw(self, key) -> bytes:
+        start, end = self._offsets[key]
+        return self._buffer[start:end]
+
+    def __reduce__(self):
+        # A memory map can't be pickled: copy the encoded values into a compact buffer (still decoded lazily)
+        buffer, offsets = bytearray(), {}
+        for key, (start, end) in self._offsets.items():
+            offsets[key] = (len(buffer), len(buffer) + end - start)
+            buffer += self._buffer[start:end]
+        return self.__class__, (bytes(buffer), offsets), {'_decoded': self._decoded}
+
+
+@dataclass
+class Snapshot:
+    created: float
+    tiers: List[Tuple[str, GetValue]]  # (tier name, GetValue) lowest precedence first
+
+    @property
+    def age(self) -> float:
+        """
+        Seconds since the snapshot was created
+        """
+        return time.time() - self.created
+
+
+def _aesgcm(key: bytes):
+    try:
+        from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+    except ImportError as error:  # pragma: no cover
+        raise ImportError('Encrypted snapshots require the cryptography package') from error
+    return AESGCM(key)
+
+
+def _encode_value(values, key) -> bytes:
+    if isinstance(values, LazyMapping):  # Copy the encoded value without decoding it
+        raw = values.raw(key)
+        return raw.encode() if isinstance(raw, str) else raw
+    return json.dumps(values[key], separators=(',', ':')).encode()
+
+
+def _encode_tier(name: str, response: GetValue, values) -> bytes:
+    created = response.CreatedDate
+    binary = isinstance(response.SecretValues.data, BinaryValues)
+    meta = json.dumps({
+        'Tier': name,
+        'Name': response.Name,
+        'ARN': response.ARN,
+        'VersionId': response.VersionId,
+        'VersionStages': response.VersionStages,
+        'CreatedDate': created.isoformat() if isinstance(created, datetime.datetime) else created,
+        'Binary': binary,
+    }, separators=(',', ':')).encode()
+    if binary:
+        data = response.SecretValues.data.view()
+        return b''.join([LENGTH.pack(len(meta)), meta, TIER_SIZES.pack(0, len(data)), data])
+    table, data = [], bytearray()
+    for key in values.keys():
+        encoded_key = key.encode()
+        encoded_value = _encode_value(values, key)
+        table.append(KEY_ENTRY.pack(len(data), len(encoded_key), len(data) + len(encoded_key), len(encoded_value)))
+        data += encoded_key
+        data += encoded_value
+    return b''.join([LENGTH.pack(len(meta)), meta, TIER_SIZES.pack(len(table), len(data)), *table, data])
+
+
+def write_snapshot(path, tiers: Iterable, key: bytes = None):
+    """
+    Write (tier name, GetValue, values mapping) tuples to a snapshot file.
+    The file is replaced atomically.
+    :param key: AES key (16, 24 or 32 bytes) to encrypt the snapshot with
+    """
+    tiers = list(tiers)
+    body = b''.join(_encode_tier(name, response, values) for name, response, values in tiers)
+    flags = ENCRYPTED if key else 0
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, flags, time.time(), len(tiers))
+    if key:
+        nonce = os.urandom(NONCE_SIZE)
+        body = nonce + _aesgcm(key).encrypt(nonce, body, header)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.snapshot-')
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            tmp.write(header)
+            tmp.write(body)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _decode_tier(buffer, position: int):
+    (meta_length,) = LENGTH.unpack_from(buffer, position)
+    position += LENGTH.size
+    meta = json.loads(buffer[position:position + meta_length])
+    position += meta_length
+    key_count, data_length = TIER_SIZES.unpack_from(buffer, position)
+    position += TIER_SIZES.size
+    data_start = position + key_count * KEY_ENTRY.size
+
+    offsets = {}
+    for key_offset, key_length, value_offset, value_length in KEY_ENTRY.iter_unpack(buffer[position:data_start]):
+        key_start = data_start + key_offset
+        value_start = data_start + value_offset
+        offsets[buffer[key_start:key_start + key_length].decode()] = (value_start, value_start + value_length)
+
+    if meta.get('Binary'):
+        with memoryview(buffer) as view:
+            values = BinaryValues.from_payload(view[data_start:data_start + data_length])
+    else:
+        values = SnapshotValues(buffer, offsets)
+    response = GetValue(
+        ARN=meta['ARN'],
+        Name=meta['Name'],
+        VersionId=meta['VersionId'],
+        SecretValues=values,
+        VersionStages=meta['VersionStages'],
+        CreatedDate=meta['CreatedDate'] and datetime.datetime.fromisoformat(meta['CreatedDate']),
+        ResponseMetadata=None,
+    )
+    return meta['Tier'], response, data_start + data_length
+
+
+def _body(buffer: mmap.mmap, flags: int, key: bytes = None) -> tuple:
+    """
+    (buffer, position) of the tiers: the mapped file after the header, or the decrypted body
+    """
+    if not flags & ENCRYPTED:
+        if key:
+            buffer.close()
+            raise InvalidSnapshotException()
+        return buffer, HEADER.size
+    if not key:
+        raise InvalidSnapshotException()
+    header = buffer[:HEADER.size]
+    nonce = buffer[HEADER.size:HEADER.size + NONCE_SIZE]
+    try:
+        body = _aesgcm(key).decrypt(nonce, buffer[HEADER.size + NONCE_SIZE:], header)
+    except Exception as error:
+        raise InvalidSnapshotException() from error
+    finally:
+        buffer.close()
+    return body, 0
+
+
+def read_snapshot(path, key: bytes = None) -> Snapshot:
+    """
+    Memory-map a snapshot file and index its tiers.
+    :param key: AES key the snapshot was encrypted with (an unencrypted snapshot is then rejected: anyone able
+        to replace the file could otherwise bypass the authentication)
+    """
+    with open(path, 'rb') as file:
+        if os.fstat(file.fileno()).st_size < HEADER.size:
+            raise InvalidSnapshotException()
+        buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, version, flags, created, tier_count = HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise InvalidSnapshotException()
+
+    buffer, position = _body(buffer, flags, key)
+    tiers = []
+    try:
+        for _ in range(tier_count):
+            name, response, position = _decode_tier(buffer, position)
+            tiers.append((name, response))
+    except (struct.error, ValueError, KeyError) as error:
+        raise InvalidSnapshotException() from error
+    return Snapshot(created=created, tiers=tiers)
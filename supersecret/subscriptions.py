@@ -0,0 +1,93 @@
+"""
+Change notifications for the merged tier stack
+"""
+import logging
+from collections import defaultdict
+from typing import Callable, Iterable, List, Union
+
+from .index import ChangeSet, Moves
+from .util import key_prefixes
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """
+    A callback interested in a set of keys or `__` prefixes.
+
+    A pattern matches a key equal to it, or a key starting with `{pattern}__`
+    (the same convention used by `SecretManager.dict`).
+    """
+
+    def __init__(self, patterns: Iterable[str], callback: Callable[[ChangeSet], None]):
+        self.patterns = tuple(patterns)
+        self.callback = callback
+
+    def __repr__(self):
+        return f'<Subscription {self.patterns}>'
+
+
+class SubscriptionRegistry:
+    """
+    Dispatches change sets to the subscriptions whose keys actually changed
+    """
+
+    def __init__(self):
+        self._by_pattern = defaultdict(list)
+
+    def __bool__(self):
+        return bool(self._by_pattern)
+
+    def subscribe(self, keys_or_prefixes: Union[str, Iterable[str]],
+                  callback: Callable[[ChangeSet], None]) -> Subscription:
+        if isinstance(keys_or_prefixes, str):
+            keys_or_prefixes = [keys_or_prefixes]
+        subscription = Subscription(keys_or_prefixes, callback)
+        for pattern in self._variants(subscription):
+            self._by_pattern[pattern].append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        for pattern in self._variants(subscription):
+            subscribers = self._by_pattern.get(pattern, [])
+            if subscription in subscribers:
+                subscribers.remove(subscription)
+            if not subscribers:
+                self._by_pattern.pop(pattern, None)
+
+    def clear(self):
+        self._by_pattern.clear()
+
+    def dispatch(self, moves: Moves) -> List[Exception]:
+        """
+        Invoke every subscription matching a moved key whose effective value changed.
+        A failing callback is logged and doesn't prevent the others from being called.
+        :return: The errors raised by the callbacks
+        """
+        matched = defaultdict(list)
+        for key in moves:
+            for subscription in self._match(key):
+                matched[subscription].append(key)
+        errors = []
+        for subscription, keys in matched.items():
+            changes = ChangeSet.from_moves(moves, keys)
+            if changes:
+                try:
+                    subscription.callback(changes)
+                except Exception as error:
+                    logger.exception('Subscription %r failed', subscription)
+                    errors.append(error)
+        return errors
+
+    @staticmethod
+    def _variants(subscription: Subscription) -> set:
+        return {variant for pattern in subscription.patterns for variant in (pattern, pattern.upper())}
+
+    def _match(self, key: str) -> dict:
+        """
+        Subscriptions for the key itself and for every `__` prefix of it (in subscription order)
+        """
+        found = {}
+        for prefix in key_prefixes(key):
+            found.update(dict.fromkeys(self._by_pattern.get(prefix, ())))
+        return found
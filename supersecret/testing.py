@@ -0,0 +1,473 @@
+"""
+Load testing against a local fake of AWS Secrets Manager.
+
+`FakeSecretsManager` serves the Secrets Manager JSON API (`GetSecretValue` and `ListSecrets`) over HTTP on
+localhost, with configurable latency, throttling, error injection and version rotation. Real boto3 clients
+talk to it, so a test exercises the whole stack (connection pool, retries, parsing) of `SecretManager`:
+
+    with FakeSecretsManager({"app": {"DEBUG": "false"}}, latency=0.02, rate_limit=50) as server:
+        secret_manager = SecretManager("app", **server.aws_kwargs())
+        report = load_test(partial(secret_manager.str, "DEBUG"), workers=32, duration=5.0,
+                           server=server, background=secret_manager.reload, interval=0.5)
+
+`load_test` runs an operation from many threads, asyncio tasks or processes and reports the throughput,
+the latency percentiles, the errors and the AWS calls the server received.
+"""
+import asyncio
+import base64
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Mapping, Optional, Tuple
+
+from .parser import CURRENT_STAGE
+
+PREVIOUS_STAGE = 'AWSPREVIOUS'
+# HTTP status of the error codes (the others are client errors)
+ERROR_STATUS = {'InternalServiceError': 500}
+
+
+class FakeSecret:
+    """
+    A secret of the fake server: its versions (oldest first) and tags
+    """
+
+    def __init__(self, name: str, region: str, tags: Mapping[str, str] = None):
+        self.name = name
+        self.arn = f'arn:aws:secretsmanager:{region}:123456789012:secret:{name}-{uuid.uuid4().hex[:6]}'
+        self.tags = dict(tags or {})
+        self.versions: Dict[str, dict] = OrderedDict()  # version id -> response fields and VersionStages
+
+    def version(self, version_id: str = None, stage: str = None) -> Optional[dict]:
+        if version_id is not None:
+            return self.versions.get(version_id)
+        stage = stage or CURRENT_STAGE
+        for version in self.versions.values():
+            if stage in version['VersionStages']:
+                return version
+        return None
+
+    def add(self, payload: dict, stages) -> str:
+        """
+        Add a version and move the stage labels to it. The version losing AWSCURRENT gets AWSPREVIOUS,
+        versions left without a label are removed.
+        """
+        version_id = uuid.uuid4().hex
+        current = self.version()
+        for stage in stages:
+            for version in self.versions.values():
+                if stage in version['VersionStages']:
+                    version['VersionStages'].remove(stage)
+        if CURRENT_STAGE in stages and current is not None:
+            for version in self.versions.values():
+                if PREVIOUS_STAGE in version['VersionStages']:
+                    version['VersionStages'].remove(PREVIOUS_STAGE)
+            current['VersionStages'].append(PREVIOUS_STAGE)
+        self.versions[version_id] = dict(payload, VersionId=version_id, VersionStages=list(stages),
+                                         CreatedDate=time.time())
+        for stale in [key for key, version in self.versions.items() if not version['VersionStages']]:
+            del self.versions[stale]
+        return version_id
+
+
+class FakeSecretsManager:
+    """
+    Local HTTP stand-in for AWS Secrets Manager
+    """
+
+    def __init__(self, secrets: Mapping[str, dict] = None, latency: float = 0.0, jitter: float = 0.0,
+                 rate_limit: float = None, burst: int = None, error_rate: float = 0.0, region: str = 'us-east-1',
+                 seed: int = None):
+        """
+        :param secrets: Values of the secrets to create, by name
+        :param latency: Seconds added to every response
+        :param jitter: Up to this many seconds (uniformly distributed) added to the latency
+        :param rate_limit: Requests per second above which calls are throttled (ThrottlingException)
+        :param burst: Requests allowed at once by the rate limit (default: one second of requests)
+        :param error_rate: Probability of an InternalServiceError
+        :param region: Region of the ARNs
+        :param seed: Seed of the jitter and the random errors
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.region = region
+        self.calls = Counter()  # operation -> count (including the failed calls)
+        self.errors = Counter()  # error code -> count
+        self._secrets: Dict[str, FakeSecret] = {}
+        self._injected: List[str] = []  # Error codes of the next calls
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.throttle(rate_limit, burst)
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+        for name, values in (secrets or {}).items():
+            self.put(name, values)
+
+    # Secrets
+    def put(self, name: str, values: dict = None, binary: bytes = None, stages=(CURRENT_STAGE,),
+            tags: Mapping[str, str] = None) -> str:
+        """
+        Add a version of a secret (created if needed) with JSON `values` or a `binary` payload
+        :param stages: Stage labels moved to the new version, e.g. `["AWSPENDING"]` during a rotation
+        :param tags: Tags of the secret (replaced)
+        :return: The version id
+        """
+        payload = {'SecretBinary': base64.b64encode(binary).decode()} if binary is not None \
+            else {'SecretString': json.dumps(values or {})}
+        with self._lock:
+            secret = self._secrets.get(name)
+            if secret is None:
+                secret = self._secrets[name] = FakeSecret(name, self.region)
+            if tags is not None:
+                secret.tags = dict(tags)
+            return secret.add(payload, stages)
+
+    def rotate(self, name: str, **changes) -> str:
+        """
+        Make a new current version with the current values updated by `changes` (None removes a key)
+        """
+        with self._lock:
+            values = json.loads(self._secrets[name].version()['SecretString'])
+        for key, value in changes.items():
+            if value is None:
+                values.pop(key, None)
+            else:
+                values[key] = value
+        return self.put(name, values)
+
+    def delete(self, name: str):
+        with self._lock:
+            del self._secrets[name]
+
+    # Failures
+    def inject(self, code: str = 'InternalServiceError', count: int = 1):
+        """
+        Fail the next `count` calls with an error code
+        """
+        with self._lock:
+            self._injected.extend([code] * count)
+
+    def throttle(self, rate_limit: Optional[float], burst: int = None):
+        """
+        Change the rate limit (None disables it), the burst is available at once
+        """
+        with self._lock:
+            self.rate_limit = rate_limit
+            self.burst = burst or rate_limit
+            self._tokens = float(self.burst or 0)
+            self._refilled = time.monotonic()
+
+    def _failure(self) -> Optional[str]:
+        """
+        Error code of the current call, if it fails (called with the lock held)
+        """
+        if self.rate_limit:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._refilled) * self.rate_limit)
+            self._refilled = now
+            if self._tokens < 1:
+                return 'ThrottlingException'
+            self._tokens -= 1
+        if self._injected:
+            return self._injected.pop(0)
+        if self.error_rate and self._random.random() < self.error_rate:
+            return 'InternalServiceError'
+        return None
+
+    # API
+    def handle(self, operation: str, request: dict) -> Tuple[int, dict]:
+        """
+        (HTTP status, JSON response) of an API call
+        """
+        delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay:
+            time.sleep(delay)
+        with self._lock:
+            self.calls[operation] += 1
+            code = self._failure()
+            handler = {'GetSecretValue': self._get_secret_value, 'ListSecrets': self._list_secrets}.get(operation)
+            if code is None and handler is None:
+                code = 'InvalidRequestException'
+            if code is None:
+                try:
+                    return 200, handler(request)
+                except LookupError as error:
+                    code, message = 'ResourceNotFoundException', error.args[0]
+            else:
+                message = f'Injected {code}' if code != 'ThrottlingException' else 'Rate exceeded'
+            self.errors[code] += 1
+            return ERROR_STATUS.get(code, 400), {'__type': code, 'Message': message}
+
+    def _get_secret_value(self, request: dict) -> dict:
+        secret_id = request['SecretId']
+        secret = self._secrets.get(secret_id) or next(
+            (secret for secret in self._secrets.values() if secret.arn == secret_id), None)
+        if secret is None:
+            raise LookupError("Secrets Manager can't find the specified secret.")
+        version = secret.version(request.get('VersionId'), request.get('VersionStage'))
+        if version is None:
+            raise LookupError("Secrets Manager can't find the specified secret value for the version or stage.")
+        return dict(version, ARN=secret.arn, Name=secret.name, VersionStages=list(version['VersionStages']))
+
+    def _list_secrets(self, request: dict) -> dict:
+        filters = {item['Key']: item['Values'] for item in request.get('Filters', ())}
+        secrets = [secret for _, secret in sorted(self._secrets.items()) if self._matches(secret, filters)]
+        start = int(request.get('NextToken') or 0)
+        end = start + request.get('MaxResults', 100)
+        response = {'SecretList': [{'ARN': secret.arn, 'Name': secret.name,
+                                    'Tags': [{'Key': key, 'Value': value} for key, value in secret.tags.items()]}
+                                   for secret in secrets[start:end]]}
+        if end < len(secrets):
+            response['NextToken'] = str(end)
+        return response
+
+    @staticmethod
+    def _matches(secret: FakeSecret, filters: Mapping[str, List[str]]) -> bool:
+        """
+        ListSecrets filters: a prefix of the name (ignoring the case), any of the tag keys and any of the tag values
+        """
+        if 'name' in filters and not any(secret.name.lower().startswith(value.lower()) for value in filters['name']):
+            return False
+        if 'tag-key' in filters and not set(filters['tag-key']) & set(secret.tags):
+            return False
+        if 'tag-value' in filters and not set(filters['tag-value']) & set(secret.tags.values()):
+            return False
+        return True
+
+    def stats(self) -> dict:
+        """
+        Calls by operation and errors by code (throttled calls are `ThrottlingException` errors)
+        """
+        with self._lock:
+            return {'calls': dict(self.calls), 'errors': dict(self.errors)}
+
+    def reset_stats(self):
+        with self._lock:
+            self.calls.clear()
+            self.errors.clear()
+
+    # Server
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def aws_kwargs(self, max_attempts: int = 1, max_pool_connections: int = 64) -> dict:
+        """
+        boto3.client (and SecretManager) arguments connecting to the server
+        :param max_attempts: Attempts of a call, including the retries of throttled and failed calls
+        :param max_pool_connections: Connections kept open by a client
+        """
+        from botocore.config import Config
+
+        return {
+            'endpoint_url': self.url,
+            'region_name': self.region,
+            'aws_access_key_id': 'testing',
+            'aws_secret_access_key': 'testing',
+            'config': Config(retries={'total_max_attempts': max_attempts, 'mode': 'standard'},
+                             max_pool_connections=max_pool_connections),
+        }
+
+    def client(self, **kwargs):
+        """
+        A boto3 Secrets Manager client of the server (kwargs: see `aws_kwargs`)
+        """
+        import boto3
+
+        return boto3.client('secretsmanager', **self.aws_kwargs(**kwargs))
+
+    def start(self) -> 'FakeSecretsManager':
+        if self._server is None:
+            self._server = _HTTPServer(self)
+            self._thread = threading.Thread(target=self._server.serve_forever, kwargs={'poll_interval': 0.05},
+                                            name='supersecret-fake-server', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        server, self._server = self._server, None
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive: clients reuse their pooled connections
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)) or b'{}')
+        operation = self.headers.get('X-Amz-Target', '').rpartition('.')[2]
+        status, response = self.server.fake.handle(operation, request)
+        body = json.dumps(response).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/x-amz-json-1.1')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('x-amzn-RequestId', str(uuid.uuid4()))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256  # Many clients connect at once under load
+
+    def __init__(self, fake: FakeSecretsManager):
+        self.fake = fake
+        super().__init__(('127.0.0.1', 0), _Handler)
+
+
+# Load generator
+def percentile(ordered: List[float], percent: float) -> Optional[float]:
+    """
+    Percentile of sorted values (nearest rank, None without any)
+    """
+    if not ordered:
+        return None
+    return ordered[max(0, math.ceil(len(ordered) * percent / 100) - 1)]
+
+
+def _run_worker(operation: Callable, iterations: Optional[int], duration: Optional[float]) -> tuple:
+    """
+    Call `operation` until the iterations are done or the duration elapsed: (latencies, errors by type)
+    """
+    latencies, errors = [], Counter()
+    end = None if duration is None else time.monotonic() + duration
+    while (iterations is None or len(latencies) < iterations) and (end is None or time.monotonic() < end):
+        start = time.perf_counter()
+        try:
+            operation()
+        except Exception as error:
+            errors[type(error).__name__] += 1
+        latencies.append(time.perf_counter() - start)
+    return latencies, errors
+
+
+async def _run_task(operation: Callable, iterations: Optional[int], duration: Optional[float]) -> tuple:
+    """
+    `_run_worker` as an asyncio task: coroutine functions are awaited, plain functions are called in the loop
+    """
+    is_coroutine = asyncio.iscoroutinefunction(operation)
+    latencies, errors = [], Counter()
+    end = None if duration is None else time.monotonic() + duration
+    while (iterations is None or len(latencies) < iterations) and (end is None or time.monotonic() < end):
+        start = time.perf_counter()
+        try:
+            if is_coroutine:
+                await operation()
+            else:
+                operation()
+        except Exception as error:
+            errors[type(error).__name__] += 1
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(0)  # Let the other tasks run
+    return latencies, errors
+
+
+async def _run_tasks(operation: Callable, workers: int, iterations: Optional[int], duration: Optional[float]):
+    return await asyncio.gather(*(_run_task(operation, iterations, duration) for _ in range(workers)))
+
+
+def _run_background(background: Callable, interval: float, stop: threading.Event, counts: Counter):
+    while not stop.wait(interval):
+        try:
+            background()
+            counts['calls'] += 1
+        except Exception as error:
+            counts[type(error).__name__] += 1
+
+
+def load_test(operation: Callable, workers: int = 8, duration: float = None, iterations: int = None,
+              mode: str = 'threads', server: FakeSecretsManager = None, background: Callable = None,
+              interval: float = 0.1) -> dict:
+    """
+    Run `operation` from several workers and report the throughput and latencies.
+    :param operation: Callable to measure, e.g. `partial(secret_manager.str, "DEBUG")`. With processes it must be
+        picklable (a loaded SecretManager is), with asyncio it may be a coroutine function.
+    :param workers: Threads, asyncio tasks or processes
+    :param duration: Seconds every worker runs for
+    :param iterations: Calls of every worker (when both are given, the first limit reached stops the worker)
+    :param mode: `threads`, `asyncio` or `processes`
+    :param server: Fake server whose calls during the run are reported
+    :param background: Callable called every `interval` seconds in a thread during the run, e.g. a reload
+    """
+    if duration is None and iterations is None:
+        raise ValueError('A duration or a number of iterations is required')
+    if mode not in ('threads', 'asyncio', 'processes'):
+        raise ValueError(f'Unknown mode: {mode}')
+    if server is not None:
+        before = server.stats()
+    stop, background_counts = threading.Event(), Counter()
+    if background is not None:
+        thread = threading.Thread(target=_run_background, args=(background, interval, stop, background_counts),
+                                  name='supersecret-load-background', daemon=True)
+        thread.start()
+    start = time.perf_counter()
+    try:
+        if mode == 'asyncio':
+            results = asyncio.run(_run_tasks(operation, workers, iterations, duration))
+        else:
+            executor_class = ThreadPoolExecutor if mode == 'threads' else ProcessPoolExecutor
+            with executor_class(max_workers=workers) as executor:
+                futures = [executor.submit(_run_worker, operation, iterations, duration) for _ in range(workers)]
+                results = [future.result() for future in futures]
+    finally:
+        seconds = time.perf_counter() - start
+        stop.set()
+        if background is not None:
+            thread.join()
+    return _report(mode, workers, seconds, results, background_counts if background is not None else None,
+                   None if server is None else _difference(before, server.stats()))
+
+
+def _difference(before: dict, after: dict) -> dict:
+    return {group: {key: count - before[group].get(key, 0) for key, count in counts.items()
+                    if count != before[group].get(key, 0)}
+            for group, counts in after.items()}
+
+
+def _report(mode: str, workers: int, seconds: float, results: list, background: Optional[Counter],
+            aws: Optional[dict]) -> dict:
+    latencies = sorted(latency for worker_latencies, _ in results for latency in worker_latencies)
+    errors = sum((worker_errors for _, worker_errors in results), Counter())
+
+    def milliseconds(value):
+        return None if value is None else round(value * 1000, 3)
+    report = {
+        'mode': mode,
+        'workers': workers,
+        'seconds': round(seconds, 3),
+        'operations': len(latencies),
+        'errors': dict(errors),
+        'throughput_per_s': round(len(latencies) / seconds, 1) if seconds else None,
+        'latency_ms': {
+            'mean': milliseconds(sum(latencies) / len(latencies) if latencies else None),
+            'p50': milliseconds(percentile(latencies, 50)),
+            'p90': milliseconds(percentile(latencies, 90)),
+            'p99': milliseconds(percentile(latencies, 99)),
+            'p99.9': milliseconds(percentile(latencies, 99.9)),
+            'max': milliseconds(latencies[-1] if latencies else None),
+        },
+    }
+    if background is not None:
+        report['background'] = dict(background)
+    if aws is not None:
+        report['aws'] = aws
+    return report
@@ -0,0 +1,183 @@
+"""
+Tracing of the secret loading.
+
+A tracer only has to implement `span(name, attributes)`, a context manager yielding an object with
+`set_attribute(key, value)`. The default tracer does nothing; pass `tracer=OpenTelemetryTracer()` to the
+manager to export the spans with OpenTelemetry (requires the `opentelemetry-api` package), or
+`tracer=RecordingTracer()` to keep the span tree in memory.
+
+Spans (attributes never contain secret values):
+* `supersecret.connect`: a boto3 client is created
+* `supersecret.load` / `supersecret.reload` / `supersecret.refresh`: the public calls, with the cache outcome
+  (`hit`: already loaded, `miss`: new version, `unchanged`: same VersionId, `error`: not fetched)
+* `supersecret.load_many`: a parallel load, with the tiers that missed the deadline (`supersecret.degraded`)
+* `supersecret.fetch`: the provider call (AWS API call or file read)
+* `supersecret.decode`: decoding of the payload, with its size
+* `supersecret.dto`: construction of the `GetValue`
+* `supersecret.index`: merge of the tier into the index
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import ContextManager, List, Optional
+
+SECRET_NAME = 'supersecret.secret_name'
+VERSION_ID = 'supersecret.version_id'
+CACHE = 'supersecret.cache'
+OPERATION = 'supersecret.operation'
+PROVIDER = 'supersecret.provider'
+PAYLOAD_SIZE = 'supersecret.payload_size'
+FORMAT = 'supersecret.format'
+KEY_COUNT = 'supersecret.key_count'
+MOVED_KEYS = 'supersecret.moved_keys'
+DEGRADED = 'supersecret.degraded'
+
+
+class Span:
+    """
+    Minimal span interface
+    """
+
+    def set_attribute(self, key: str, value):
+        pass
+
+
+class Tracer:
+    """
+    Minimal tracer interface
+    """
+
+    def span(self, name: str, attributes: dict = None) -> ContextManager[Span]:
+        raise NotImplementedError
+
+
+class NoopSpan(Span):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+
+class NoopTracer(Tracer):
+    """
+    The default tracer, records nothing
+    """
+
+    def span(self, name: str, attributes: dict = None) -> NoopSpan:
+        return NOOP_SPAN
+
+
+NOOP_SPAN = NoopSpan()
+NOOP_TRACER = NoopTracer()
+
+# Tracer of the load in progress, for the spans emitted by the providers
+_active: ContextVar[Tracer] = ContextVar('supersecret_tracer', default=NOOP_TRACER)
+
+
+@contextmanager
+def activate(tracer: Tracer):
+    """
+    Make `tracer` the tracer of `span()` in the current context
+    """
+    token = _active.set(tracer)
+    try:
+        yield tracer
+    finally:
+        _active.reset(token)
+
+
+def span(name: str, attributes: dict = None) -> ContextManager[Span]:
+    """
+    Span of the active tracer (used by the providers)
+    """
+    return _active.get().span(name, attributes)
+
+
+class RecordedSpan(Span):
+    """
+    A span kept in memory by the RecordingTracer
+    """
+
+    def __init__(self, name: str, attributes: dict = None, parent: 'RecordedSpan' = None):
+        self.name = name
+        self.attributes = dict(attributes or {})
+        self.parent = parent
+        self.children: List[RecordedSpan] = []
+        self.error: Optional[BaseException] = None
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    @property
+    def duration(self) -> Optional[float]:
+        return None if self.end is None else self.end - self.start
+
+    def tree(self) -> tuple:
+        """
+        (name, [child trees]) of the span, handy to compare span trees
+        """
+        return self.name, [child.tree() for child in self.children]
+
+    def __repr__(self):
+        return f'<RecordedSpan {self.name} {self.attributes}>'
+
+
+class RecordingTracer(Tracer):
+    """
+    Keeps the span tree in memory (`roots`), e.g. for tests or to inspect a cold start
+    """
+
+    def __init__(self):
+        self.roots: List[RecordedSpan] = []
+        self._current: ContextVar[Optional[RecordedSpan]] = ContextVar(f'recording_span_{id(self)}', default=None)
+
+    @contextmanager
+    def span(self, name: str, attributes: dict = None):
+        parent = self._current.get()
+        recorded = RecordedSpan(name, attributes, parent)
+        (parent.children if parent is not None else self.roots).append(recorded)
+        token = self._current.set(recorded)
+        try:
+            yield recorded
+        except BaseException as error:
+            recorded.error = error
+            raise
+        finally:
+            recorded.end = time.perf_counter()
+            self._current.reset(token)
+
+    def spans(self) -> List[RecordedSpan]:
+        """
+        Every recorded span, depth first
+        """
+        result, stack = [], list(reversed(self.roots))
+        while stack:
+            recorded = stack.pop()
+            result.append(recorded)
+            stack.extend(reversed(recorded.children))
+        return result
+
+
+class OpenTelemetryTracer(Tracer):
+    """
+    Exports the spans with OpenTelemetry
+    """
+
+    def __init__(self, tracer_provider=None):
+        """
+        :param tracer_provider: The OpenTelemetry TracerProvider (default: the global one)
+        """
+        try:
+            from opentelemetry import trace
+        except ImportError as error:
+            raise ImportError('OpenTelemetryTracer requires the opentelemetry-api package') from error
+        from . import __version__
+        self._tracer = trace.get_tracer('supersecret', __version__, tracer_provider=tracer_provider)
+
+    def span(self, name: str, attributes: dict = None):
+        # OpenTelemetry rejects None attribute values
+        attributes = {key: value for key, value in (attributes or {}).items() if value is not None}
+        return self._tracer.start_as_current_span(name, attributes=attributes)
@@ -1,16 +1,239 @@
+from collections.abc import Mapping
+
 
 class AttrDict(dict):
     """
     A dictionary that allows you to access keys as attributes.
     """
     def __getattr__(self, attr):
-        return self[attr]
+        try:
+            return self[attr]
+        except KeyError:
+            raise AttributeError(attr) from None
 
     def __setattr__(self, attr, value):
         self[attr] = value
 
     def __delattr__(self, attr):
-        del self[attr]
+        try:
+            del self[attr]
+        except KeyError:
+            raise AttributeError(attr) from None
 
     def __repr__(self):
         return f'<AttrDict {super().__repr__()}>'
+
+    @classmethod
+    def deepcopy(cls, value):
+        """
+        Copy nested AttrDicts (leaf values are shared)
+        """
+        if isinstance(value, AttrDict):
+            return cls({k: cls.deepcopy(v) for k, v in value.items()})
+        return value
+
+
+def _frozen(self, *args, **kwargs):
+    raise TypeError(f'{type(self).__name__} is immutable')
+
+
+class FrozenDict(dict):
+    """
+    An immutable dictionary that allows you to access keys as attributes.
+    It is hashable (when its values are), so it can be shared between callers and cached.
+    `thaw()` returns a mutable AttrDict copy.
+    """
+    __slots__ = ('_hash',)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        object.__setattr__(self, '_hash', None)
+
+    @classmethod
+    def freeze(cls, value, previous=None):
+        """
+        Nested dicts as FrozenDicts. The subtrees equal to the same subtree of `previous` are `previous`'s,
+        so a rebuilt tree shares the parts that didn't change.
+        """
+        if not isinstance(value, dict) or (isinstance(value, FrozenDict) and (previous is None or previous is value)):
+            return value
+        if not isinstance(previous, FrozenDict):
+            previous = None
+        frozen = cls({key: cls.freeze(item, None if previous is None else previous.get(key))
+                      for key, item in value.items()})
+        if previous is not None and previous == frozen:  # Shared subtrees compare by identity
+            return previous
+        return frozen
+
+    def thaw(self) -> AttrDict:
+        """
+        A mutable copy (nested AttrDicts, leaf values are shared)
+        """
+        return AttrDict({key: value.thaw() if isinstance(value, FrozenDict) else value for key, value in self.items()})
+
+    def __getattr__(self, attr):
+        try:
+            return self[attr]
+        except KeyError:
+            raise AttributeError(attr) from None
+
+    def __hash__(self):
+        if self._hash is None:
+            object.__setattr__(self, '_hash', hash(frozenset(self.items())))
+        return self._hash
+
+    def __repr__(self):
+        return f'<FrozenDict {super().__repr__()}>'
+
+    def __reduce__(self):
+        return type(self), (dict(self),)
+
+    def __copy__(self):
+        return self
+
+    __setattr__ = __delattr__ = _frozen
+    __setitem__ = __delitem__ = __ior__ = _frozen
+    clear = pop = popitem = setdefault = update = _frozen
+
+
+def key_prefixes(key: str):
+    """
+    Yield every `__` prefix of a key, then the key itself.
+    `database__options__ssl` -> `database`, `database__options`, `database__options__ssl`
+    """
+    end = key.find('__')
+    while end != -1:
+        yield key[:end]
+        end = key.find('__', end + 2)
+    yield key
+
+
+class LazyMapping(Mapping):
+    """
+    A read-only mapping that knows where every value is stored and decodes it on first access.
+    Decoded values are cached; values that are never read are never decoded (see `paths`).
+    """
+
+    def __init__(self, offsets: dict):
+        self._offsets = offsets  # key -> (start, end)
+        self._decoded = {}
+
+    def _decode(self, start: int, end: int):
+        raise NotImplementedError
+
+    def raw(self, key):
+        """
+        The encoded (JSON) form of a value, without decoding it
+        """
+        raise NotImplementedError
+
+    def __getitem__(self, key):
+        try:
+            return self._decoded[key]
+        except KeyError:
+            start, end = self._offsets[key]
+            value = self._decoded[key] = self._decode(start, end)
+            return value
+
+    def __contains__(self, key):
+        return key in self._offsets
+
+    def __iter__(self):
+        return iter(self._offsets)
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def keys(self):
+        return self._offsets.keys()
+
+    def paths(self) -> Mapping:
+        """
+        The leaves of the nested objects by `__` path (see `PathMapping`).
+        Only the nested objects are decoded, subclasses may index them without decoding.
+        """
+        return _object_paths(self, lambda key: self.raw(key)[:1] in ('{', b'{'))
+
+    def __repr__(self):
+        return f'<{type(self).__name__} {len(self)} keys, {len(self._decoded)} decoded>'
+
+
+class PathMapping(Mapping):
+    """
+    A tier with the leaves of its nested JSON objects added under their `__` path:
+    `{"database": {"default": {"HOST": "db"}}}` also defines `database__default__HOST`.
+    Keys the tier defines explicitly win over the paths of nested objects.
+    """
+
+    def __init__(self, values: Mapping, paths: dict):
+        self._values = values
+        self._paths = paths  # `__` path -> leaf value
+
+    @classmethod
+    def build(cls, values: Mapping) -> Mapping:
+        """
+        The tier with its paths, or the tier itself if it has no nested object
+        """
+        paths = values.paths() if isinstance(values, LazyMapping) else _object_paths(values)
+        return cls(values, paths) if paths else values
+
+    def mapping_of(self, key) -> Mapping:
+        """
+        The mapping holding `key` (the tier or the paths)
+        """
+        return self._paths if key in self._paths else self._values
+
+    def __getitem__(self, key):
+        if key in self._paths:
+            return self._paths[key]
+        return self._values[key]
+
+    def __contains__(self, key):
+        return key in self._paths or key in self._values
+
+    def __iter__(self):
+        yield from self._values
+        yield from self._paths
+
+    def __len__(self):
+        return len(self._values) + len(self._paths)
+
+    def __repr__(self):
+        return f'<PathMapping {len(self._values)} keys, {len(self._paths)} paths>'
+
+
+def _object_paths(values: Mapping, is_object=None) -> dict:
+    """
+    The leaves of the nested objects of a tier by `__` path, without the keys the tier defines
+    """
+    is_object = is_object or (lambda key: isinstance(values[key], Mapping))
+    paths = {}
+    for key in values.keys():
+        if is_object(key):
+            _add_paths(key, values[key], paths)
+    for key in [path for path in paths if path in values]:
+        del paths[key]
+    return paths
+
+
+def _add_paths(prefix: str, value: Mapping, paths: dict):
+    for key, item in value.items():
+        path = f'{prefix}__{key}'
+        if isinstance(item, Mapping):
+            _add_paths(path, item, paths)
+        else:
+            paths[path] = item
+
+
+def same_value(before: Mapping, after: Mapping, key) -> bool:
+    """
+    Compare the values of `key` in two mappings, without decoding lazy values when possible.
+    Equal encodings mean equal values, different encodings are compared decoded.
+    """
+    if isinstance(before, PathMapping):
+        before = before.mapping_of(key)
+    if isinstance(after, PathMapping):
+        after = after.mapping_of(key)
+    if isinstance(before, LazyMapping) and type(before) is type(after) and before.raw(key) == after.raw(key):
+        return True
+    return before[key] == after[key]
@@ -0,0 +1,120 @@
+"""
+Tests for binary secrets.
+"""
+import copy
+import os
+import pickle
+import tempfile
+import unittest
+
+from supersecret.binary import BinaryValues
+from supersecret.manager import SecretManager
+from .test_manager import ReloadingSecretsClient
+
+PAYLOAD = os.urandom(4096)
+
+
+class BinarySecretsClient(ReloadingSecretsClient):
+    """
+    Mock client returning a binary secret (botocore returns the decoded bytes).
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.put_binary('BinarySecret', '1', PAYLOAD)
+
+    def put_binary(self, name, version_id, payload):
+        self.secrets[name] = {
+            'ARN': f'arn:aws:secretsmanager:us-east-1:123456789:secret:{name}',
+            'Name': name,
+            'VersionId': version_id,
+            'SecretBinary': payload,
+            'VersionStages': ['AWSCURRENT'],
+            'CreatedDate': None,
+            'ResponseMetadata': None,
+        }
+
+
+class TestBinaryValues(unittest.TestCase):
+    def test_view(self):
+        """
+        Views are read-only and share the buffer.
+        """
+        values = BinaryValues.from_payload(PAYLOAD)
+        view = values.view()
+        self.assertEqual(view.tobytes(), PAYLOAD)
+        self.assertTrue(view.readonly)
+        self.assertEqual(len(values), len(PAYLOAD))
+        self.assertNotIn('key', values)
+        with self.assertRaises(TypeError):
+            view[0] = 0
+
+    def test_base64_payload(self):
+        """
+        Base64 text payloads are decoded.
+        """
+        self.assertEqual(bytes(BinaryValues.from_payload('aGVsbG8=')), b'hello')
+
+    def test_close_zeroes(self):
+        """
+        Closing zeroes the memory seen by existing views.
+        """
+        for lock in (False, True):
+            values = BinaryValues.from_payload(PAYLOAD, lock=lock)
+            view = values.view()
+            values.close()
+            self.assertEqual(view.tobytes(), bytes(len(PAYLOAD)))
+            self.assertRaises(ValueError, values.view)
+
+    def test_pickle(self):
+        """
+        Binary values are pickled as their payload.
+        """
+        values = BinaryValues.from_payload(PAYLOAD)
+        self.assertEqual(bytes(pickle.loads(pickle.dumps(values))), PAYLOAD)
+        self.assertEqual(bytes(copy.deepcopy(values)), PAYLOAD)
+
+
+class TestBinarySecrets(unittest.TestCase):
+    def setUp(self) -> None:
+        self.client = BinarySecretsClient()
+        self.secret_manager = SecretManager('TestingSecret')
+        self.secret_manager.load(client=self.client)
+        self.secret_manager.load('BinarySecret', client=self.client)
+
+    def test_binary(self):
+        """
+        Binary tiers are served as memoryviews and don't hide the other tiers.
+        """
+        self.assertEqual(self.secret_manager.binary('BinarySecret').tobytes(), PAYLOAD)
+        self.assertEqual(self.secret_manager.str('username'), 'test_username')
+        self.assertRaises(KeyError, self.secret_manager.binary, 'TestingSecret')
+
+    def test_reload_zeroes_previous(self):
+        """
+        Reloading a binary tier zeroes the previous payload.
+        """
+        view = self.secret_manager.binary('BinarySecret')
+        self.client.put_binary('BinarySecret', '2', b'rotated')
+        self.secret_manager.reload('BinarySecret')
+        self.assertEqual(view.tobytes(), bytes(len(PAYLOAD)))
+        self.assertEqual(self.secret_manager.binary('BinarySecret').tobytes(), b'rotated')
+
+    def test_close_zeroes(self):
+        """
+        Closing the manager zeroes the payloads.
+        """
+        view = self.secret_manager.binary('BinarySecret')
+        self.secret_manager.close()
+        self.assertEqual(view.tobytes(), bytes(len(PAYLOAD)))
+
+    def test_snapshot(self):
+        """
+        Binary tiers are kept in snapshots.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'secrets.snapshot')
+            self.secret_manager.export_snapshot(path)
+            secret_manager = SecretManager.from_snapshot(path)
+            self.assertEqual(secret_manager.binary('BinarySecret').tobytes(), PAYLOAD)
+            self.assertEqual(secret_manager.str('username'), 'test_username')
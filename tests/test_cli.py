@@ -0,0 +1,116 @@
+"""
+Tests for the `python -m supersecret` command line interface.
+"""
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from botocore.exceptions import ClientError, NoCredentialsError
+
+from supersecret.cli import main
+from supersecret.manager import SecretManager
+from .test_manager import ReloadingSecretsClient
+
+
+class PartialSecretsClient(ReloadingSecretsClient):
+    """
+    Mock client raising ResourceNotFoundException for unknown secrets.
+    """
+
+    def get_secret_value(self, SecretId):
+        if SecretId not in self.secrets:
+            raise ClientError({'Error': {'Code': 'ResourceNotFoundException', 'Message': f'{SecretId} not found'}},
+                              'GetSecretValue')
+        return super().get_secret_value(SecretId)
+
+
+class TestCli(unittest.TestCase):
+    """
+    Tests for the dump, snapshot and bench commands
+    """
+
+    def setUp(self) -> None:
+        self.client = PartialSecretsClient()
+        self.client.update('TestingSecret', '654321', shared_only='default')
+        patcher = patch.object(SecretManager, 'connect', return_value=self.client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def run_cli(self, *argv) -> tuple:
+        stdout, stderr = io.StringIO(), io.StringIO()
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            code = main(list(argv))
+        return code, stdout.getvalue(), stderr.getvalue()
+
+    def test_dump(self):
+        """
+        Merged keys with their serving tier, redacted unless --reveal.
+        """
+        code, output, _ = self.run_cli('dump', 'TestingSecret', 'TestingSecret2', '--prefix', 'database__')
+        self.assertEqual(code, 0)
+        lines = output.splitlines()
+        self.assertEqual(len(lines), 6)
+        self.assertEqual(lines[0].split(), ['database__host', 'TestingSecret2', '********'])
+        self.assertNotIn('remote_host', output)
+
+        _, output, _ = self.run_cli('dump', 'TestingSecret', 'TestingSecret2', '--json', '--reveal')
+        config = json.loads(output)
+        self.assertEqual(config['shared_only'], {'tier': 'TestingSecret', 'value': 'default'})
+        self.assertEqual(config['username'], {'tier': 'TestingSecret2', 'value': 'new_username'})
+
+    def test_missing_tier(self):
+        """
+        Tiers that can't be fetched are reported, and fail the command with --required.
+        """
+        code, output, errors = self.run_cli('dump', 'TestingSecret', 'Unknown', '--json')
+        self.assertEqual(code, 0)
+        self.assertEqual(json.loads(output)['username']['tier'], 'TestingSecret')
+        self.assertEqual(errors, 'Unknown: could not be fetched\n')
+
+        code, _, errors = self.run_cli('dump', 'TestingSecret', 'Unknown', '--required')
+        self.assertEqual(code, 1)
+        self.assertIn('Unknown not found', errors)
+
+        with self.assertRaises(SystemExit), patch.dict(os.environ, clear=True), \
+                contextlib.redirect_stderr(io.StringIO()):
+            main(['dump'])
+
+    def test_connection_error(self):
+        """
+        botocore errors (no credentials, no network) are reported without a traceback.
+        """
+        with patch.object(SecretManager, 'connect', side_effect=NoCredentialsError()):
+            code, _, errors = self.run_cli('dump', 'TestingSecret', '--required')
+        self.assertEqual(code, 1)
+        self.assertEqual(errors, 'supersecret: Unable to locate credentials\n')
+
+    def test_snapshot(self):
+        """
+        The snapshot keeps the tiers in precedence order.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'secrets.snapshot')
+            code, _, errors = self.run_cli('snapshot', 'TestingSecret', 'TestingSecret2', '-o', path)
+            self.assertEqual(code, 0)
+            self.assertIn('Wrote 2 tiers', errors)
+            secret_manager = SecretManager.from_snapshot(path)
+            self.assertEqual(list(secret_manager._secrets), ['TestingSecret', 'TestingSecret2'])
+            self.assertEqual(secret_manager.str('username'), 'new_username')
+            secret_manager.close()
+
+    def test_bench(self):
+        """
+        Every benchmark is timed, the AWS calls come from an instrumented load.
+        """
+        code, output, _ = self.run_cli('bench', 'TestingSecret', 'TestingSecret2', '--repeat', '1', '--number', '1')
+        self.assertEqual(code, 0)
+        report = json.loads(output)
+        self.assertEqual(report['meta']['tiers'], ['TestingSecret', 'TestingSecret2'])
+        self.assertEqual(set(report['results']), {'connect', 'load_many', 'lookup', 'str', 'many', 'export_snapshot',
+                                                  'from_snapshot', 'aws'})
+        self.assertIn('best_ms', report['results']['many'])
+        self.assertEqual(report['results']['aws']['calls']['TestingSecret:GetSecretValue']['count'], 1)
@@ -0,0 +1,210 @@
+"""
+Tests for the assumed role credentials and the client pool.
+"""
+import datetime
+import pickle
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+import boto3
+from botocore.stub import Stubber
+
+from supersecret.credentials import CLIENT_POOL, ClientPool, TierSpec
+from supersecret.manager import SecretManager
+from .test_deadline import wait_until
+from .test_manager import ReloadingSecretsClient
+from .test_providers import AWS_KWARGS
+
+ROLE_ARN = 'arn:aws:iam::123456789012:role/secrets-reader'
+NOW = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def assume_role_response(key_id: str, expiration: datetime.datetime) -> dict:
+    return {
+        'Credentials': {'AccessKeyId': key_id, 'SecretAccessKey': 'secret', 'SessionToken': f'token-{key_id}',
+                        'Expiration': expiration},
+        'AssumedRoleUser': {'AssumedRoleId': 'AROAEXAMPLE:supersecret', 'Arn': f'{ROLE_ARN}/supersecret'},
+    }
+
+
+class RecordingFactory:
+    """
+    Client factory returning mock Secrets Manager clients and recording their connection kwargs.
+    """
+
+    def __init__(self):
+        self.created = []
+
+    def __call__(self, service, **kwargs):
+        self.created.append((service, kwargs))
+        return ReloadingSecretsClient()
+
+
+class TestClientPool(unittest.TestCase):
+    """
+    Tests for the credential cache and the pooled clients.
+    """
+
+    def setUp(self) -> None:
+        self.sts = boto3.client('sts', **AWS_KWARGS)
+        self.stubber = Stubber(self.sts)
+        self.stubber.activate()
+        self.factory = RecordingFactory()
+        self.pool = ClientPool(sts_client=self.sts, client_factory=self.factory)
+        self.spec = TierSpec(role_arn=ROLE_ARN, region='eu-west-1', external_id='external')
+
+    def tearDown(self) -> None:
+        self.stubber.deactivate()
+
+    def expect_assume_role(self, key_id, expiration):
+        self.stubber.add_response('assume_role', assume_role_response(key_id, expiration), {
+            'RoleArn': ROLE_ARN, 'RoleSessionName': 'supersecret', 'DurationSeconds': 3600,
+            'ExternalId': 'external'})
+
+    def test_spec(self):
+        """
+        The account is read from the role ARN.
+        """
+        self.assertEqual(self.spec.account, '123456789012')
+        self.assertIsNone(TierSpec(region='eu-west-1').account)
+
+    def test_cached_until_refresh(self):
+        """
+        Credentials and clients are reused until the credentials are about to expire.
+        """
+        self.expect_assume_role('ASIAFIRST0000000', NOW + datetime.timedelta(hours=1))
+        self.expect_assume_role('ASIASECOND000000', NOW + datetime.timedelta(hours=2))
+        with patch('supersecret.credentials.time.time', return_value=NOW.timestamp()):
+            client = self.pool.client('secretsmanager', self.spec, region_name='us-east-1', aws_access_key_id='base')
+            self.assertIs(self.pool.client('secretsmanager', self.spec, region_name='us-east-1',
+                                           aws_access_key_id='base'), client)
+        self.assertEqual(self.factory.created, [('secretsmanager', {
+            'region_name': 'eu-west-1', 'aws_access_key_id': 'ASIAFIRST0000000', 'aws_secret_access_key': 'secret',
+            'aws_session_token': 'token-ASIAFIRST0000000'})])
+
+        # Within the refresh margin (5 minutes) of the expiration
+        with patch('supersecret.credentials.time.time', return_value=NOW.timestamp() + 3400):
+            refreshed = self.pool.client('secretsmanager', self.spec, region_name='us-east-1',
+                                         aws_access_key_id='base')
+        self.assertIsNot(refreshed, client)
+        self.assertEqual(self.factory.created[-1][1]['aws_access_key_id'], 'ASIASECOND000000')
+        self.stubber.assert_no_pending_responses()
+
+    def test_region_only(self):
+        """
+        A region-only spec uses the manager's credentials, one client per region.
+        """
+        spec = TierSpec(region='eu-west-1')
+        client = self.pool.client('secretsmanager', spec, region_name='us-east-1')
+        self.assertIs(self.pool.client('secretsmanager', spec), client)
+        self.assertIsNot(self.pool.client('secretsmanager', TierSpec(region='us-west-2')), client)
+        self.assertEqual([kwargs for _, kwargs in self.factory.created],
+                         [{'region_name': 'eu-west-1'}, {'region_name': 'us-west-2'}])
+
+    def test_connection_kwargs(self):
+        """
+        Callers with other credentials or another endpoint get their own STS client, credentials and clients.
+        """
+        pool = ClientPool(client_factory=self.factory)
+        spec = TierSpec(region='eu-west-1')
+        first = pool.client('secretsmanager', spec, aws_access_key_id='AAA', endpoint_url='http://localhost:1')
+        second = pool.client('secretsmanager', spec, aws_access_key_id='BBB', endpoint_url='http://localhost:2')
+        self.assertIsNot(first, second)
+        self.assertIs(pool.client('secretsmanager', spec, aws_access_key_id='AAA', endpoint_url='http://localhost:1'),
+                      first)
+        self.assertEqual(self.factory.created[-1][1]['endpoint_url'], 'http://localhost:2')
+
+        sts_clients = {}
+
+        def assume_role(key_id):
+            sts = boto3.client('sts', **AWS_KWARGS)
+            stubber = Stubber(sts)
+            stubber.add_response('assume_role', assume_role_response(f'ASIA{key_id}'.ljust(16, '0'),
+                                                                     NOW + datetime.timedelta(hours=1)))
+            stubber.activate()
+            self.addCleanup(stubber.deactivate)
+            return sts
+
+        def factory(service, **kwargs):
+            if service == 'sts':
+                return sts_clients.setdefault(kwargs['aws_access_key_id'], assume_role(kwargs['aws_access_key_id']))
+            return self.factory(service, **kwargs)
+        pool = ClientPool(client_factory=factory)
+        spec = TierSpec(role_arn=ROLE_ARN)
+        with patch('supersecret.credentials.time.time', return_value=NOW.timestamp()):
+            pool.client('secretsmanager', spec, aws_access_key_id='AAA')
+            pool.client('secretsmanager', spec, aws_access_key_id='BBB')
+        self.assertEqual(set(sts_clients), {'AAA', 'BBB'})
+        self.assertEqual([kwargs['aws_access_key_id'] for _, kwargs in self.factory.created[-2:]],
+                         ['ASIAAAA000000000', 'ASIABBB000000000'])
+
+
+class TestCrossAccountTiers(unittest.TestCase):
+    """
+    Tests for tiers loaded with a TierSpec.
+    """
+
+    def setUp(self) -> None:
+        self.sts = boto3.client('sts', **AWS_KWARGS)
+        self.stubber = Stubber(self.sts)
+        self.stubber.activate()
+        self.stubber.add_response('assume_role', assume_role_response('ASIAFIRST0000000', NOW), {
+            'RoleArn': ROLE_ARN, 'RoleSessionName': 'supersecret', 'DurationSeconds': 3600})
+        self.factory = RecordingFactory()
+        self.pool = ClientPool(sts_client=self.sts, client_factory=self.factory)
+
+    def tearDown(self) -> None:
+        self.stubber.deactivate()
+
+    def test_managers_share_the_pool(self):
+        """
+        Managers built later reuse the credentials and the client of the first one.
+        """
+        spec = TierSpec(role_arn=ROLE_ARN)
+        with patch('supersecret.credentials.time.time', return_value=NOW.timestamp() - 3600):
+            first = SecretManager('TestingSecret', client_pool=self.pool, tier_specs={'TestingSecret2': spec})
+            first.load(client=ReloadingSecretsClient())
+            first.load('TestingSecret2')
+            self.assertEqual(first.str('username'), 'new_username')
+            first.reload('TestingSecret2')
+
+            second = SecretManager('TestingSecret2', client_pool=self.pool)
+            second.load(spec=spec)
+        self.assertEqual(second.str('username'), 'new_username')
+        self.assertEqual(len(self.factory.created), 1)
+        self.stubber.assert_no_pending_responses()
+        self.assertIsNone(second.client)  # The manager's own client is never created
+
+    def test_assume_role_within_deadline(self):
+        """
+        The role is assumed in the fetch: a slow STS call doesn't hold a load with a deadline.
+        """
+        gate = threading.Event()
+        assume_role = self.sts.assume_role
+        self.sts.assume_role = lambda **kwargs: gate.wait(5) and assume_role(**kwargs)
+        secret_manager = SecretManager('TestingSecret2', client_pool=self.pool,
+                                       tier_specs={'TestingSecret2': TierSpec(role_arn=ROLE_ARN)})
+        try:
+            with patch('supersecret.credentials.time.time', return_value=NOW.timestamp() - 3600):
+                start = time.monotonic()
+                self.assertIsNone(secret_manager.load(deadline=0.05))
+                self.assertLess(time.monotonic() - start, 1)
+                self.assertEqual(secret_manager.degraded, {'TestingSecret2': 'missing'})
+                gate.set()
+                wait_until(lambda: not secret_manager.degraded)
+            self.assertEqual(secret_manager.str('username'), 'new_username')
+        finally:
+            gate.set()
+            secret_manager.close()
+
+    def test_pickled_manager_uses_default_pool(self):
+        """
+        The pool is process-local, an unpickled manager keeps its specs and uses the process pool.
+        """
+        secret_manager = SecretManager('TestingSecret', client_pool=self.pool,
+                                       tier_specs={'TestingSecret': TierSpec(region='eu-west-1')})
+        restored = pickle.loads(pickle.dumps(secret_manager))
+        self.assertIs(restored._client_pool, CLIENT_POOL)
+        self.assertEqual(restored._specs, {'TestingSecret': TierSpec(region='eu-west-1')})
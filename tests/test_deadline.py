@@ -0,0 +1,168 @@
+"""
+Tests for load deadlines and the last-known-good fallback.
+"""
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from botocore.exceptions import EndpointConnectionError
+
+from supersecret.exceptions import DeadlineExceededException
+from supersecret.manager import SecretManager
+from .test_manager import ReloadingSecretsClient
+
+
+class GatedSecretsClient(ReloadingSecretsClient):
+    """
+    Mock client whose calls block until the gate is opened.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.gate = threading.Event()
+        self.calls = 0
+
+    def get_secret_value(self, SecretId):
+        self.calls += 1
+        self.gate.wait(5)
+        return super().get_secret_value(SecretId)
+
+
+class UnreachableSecretsClient:
+    """
+    Mock client failing like a client without network.
+    """
+
+    def get_secret_value(self, SecretId):
+        raise EndpointConnectionError(endpoint_url='https://secretsmanager.us-east-1.amazonaws.com')
+
+
+def wait_until(condition, timeout=5.0):
+    end = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > end:
+            raise AssertionError('Condition not met in time')
+        time.sleep(0.005)
+
+
+class TestDeadline(unittest.TestCase):
+    """
+    Tests for load, reload and load_many deadlines.
+    """
+
+    def setUp(self) -> None:
+        self.client = GatedSecretsClient()
+        self.secret_manager = SecretManager('TestingSecret')
+        self.secret_manager.client = self.client
+
+    def tearDown(self) -> None:
+        self.client.gate.set()
+        self.secret_manager.close()
+
+    def test_snapshot_fallback(self):
+        """
+        A tier missing the deadline is served by the snapshot until the background fetch completes.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'secrets.snapshot')
+            with SecretManager('TestingSecret') as source:
+                source.load(client=ReloadingSecretsClient())
+                source.export_snapshot(path)
+
+            self.secret_manager.fallback_snapshot = path
+            self.client.update('TestingSecret', '654321', username='fresh_username')
+            start = time.monotonic()
+            response = self.secret_manager.load(deadline=0.05)
+            self.assertLess(time.monotonic() - start, 1)
+            self.assertEqual(response.VersionId, '123456')
+            self.assertEqual(self.secret_manager.degraded, {'TestingSecret': 'snapshot'})
+            self.assertEqual(self.secret_manager.str('username'), 'test_username')
+
+            self.client.gate.set()
+            wait_until(lambda: not self.secret_manager.degraded)
+            self.assertEqual(self.secret_manager.str('username'), 'fresh_username')
+
+    def test_connection_error_falls_back(self):
+        """
+        Connection failures are fetch failures: the tier is served by the snapshot or its previous version.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'secrets.snapshot')
+            with SecretManager('TestingSecret') as source:
+                source.load(client=ReloadingSecretsClient())
+                source.export_snapshot(path)
+
+            with SecretManager('TestingSecret', fallback_snapshot=path) as secret_manager:
+                secret_manager.load(client=UnreachableSecretsClient(), deadline=1.0)
+                self.assertEqual(secret_manager.str('username'), 'test_username')
+                secret_manager.refresh(deadline=1.0)
+                self.assertEqual(secret_manager.load_many(['TestingSecret'], deadline=1.0)[0].VersionId, '123456')
+                self.assertIsNone(secret_manager.load('other', client=UnreachableSecretsClient()))
+                with self.assertRaises(EndpointConnectionError):
+                    secret_manager.reload(required=True)
+
+    def test_reload_keeps_previous(self):
+        """
+        A reload missing the deadline keeps the loaded version.
+        """
+        self.client.gate.set()
+        self.secret_manager.load()
+        self.client.gate.clear()
+        self.client.update('TestingSecret', '654321', username='fresh_username')
+        self.assertEqual(self.secret_manager.reload(deadline=0.01).VersionId, '123456')
+        self.assertEqual(self.secret_manager.degraded, {'TestingSecret': 'previous'})
+
+        self.client.gate.set()
+        wait_until(lambda: self.secret_manager.str('username') == 'fresh_username')
+        self.assertEqual(self.secret_manager.degraded, {})
+
+    def test_required_without_fallback(self):
+        """
+        A required tier without a last-known-good version raises, the fetch still completes in the background.
+        """
+        with self.assertRaises(DeadlineExceededException):
+            self.secret_manager.load(required=True, deadline=0.01)
+        self.assertEqual(self.secret_manager.degraded, {'TestingSecret': 'missing'})
+        self.assertIsNone(self.secret_manager.load_many(['TestingSecret'], deadline=0.01)[0])
+
+        self.client.gate.set()
+        wait_until(lambda: 'TestingSecret' in self.secret_manager._secrets)
+        self.assertEqual(self.client.calls, 1)
+
+    def test_single_flight(self):
+        """
+        A load joins the fetch already in progress for the tier.
+        """
+        self.secret_manager.load(deadline=0.01)
+        threading.Timer(0.05, self.client.gate.set).start()
+        self.assertEqual(self.secret_manager.load().VersionId, '123456')
+        self.assertEqual(self.client.calls, 1)
+
+    def test_single_flight_cold_reads(self):
+        """
+        Concurrent first reads share one fetch, the threads joining it wait for the tier to be merged.
+        """
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.secret_manager.str('username')))
+                   for _ in range(16)]
+        for thread in threads:
+            thread.start()
+        wait_until(lambda: self.client.calls)
+        time.sleep(0.05)
+        self.client.gate.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ['test_username'] * 16)
+        self.assertEqual(self.client.calls, 1)
+
+    def test_close_drops_late_fetch(self):
+        """
+        Fetches completing after close are not merged.
+        """
+        self.secret_manager.load(deadline=0.01)
+        self.secret_manager.close()
+        self.client.gate.set()
+        time.sleep(0.05)
+        self.assertEqual(self.secret_manager._secrets, {})
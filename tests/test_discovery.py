@@ -0,0 +1,149 @@
+"""
+Tests for discovering tiers with ListSecrets.
+"""
+import json
+import unittest
+from unittest.mock import patch
+
+import boto3
+from botocore.exceptions import ClientError
+from botocore.stub import Stubber
+
+from supersecret.manager import SecretManager
+from supersecret.parser import discovery_order
+from supersecret.providers import SecretsManagerProvider
+from .test_manager import ReloadingSecretsClient
+from .test_providers import AWS_KWARGS
+
+
+class ListingSecretsClient(ReloadingSecretsClient):
+    """
+    Mock client listing its secrets one per page.
+    """
+
+    def __init__(self, tiers: dict):
+        super().__init__()
+        self.list_calls = []
+        self.fail = False
+        self.tags = {}
+        for name, values in tiers.items():
+            self.secrets[name] = {'Name': name, 'VersionId': '1', 'SecretString': json.dumps(values)}
+
+    def get_paginator(self, operation):
+        assert operation == 'list_secrets'
+        return self
+
+    def paginate(self, **kwargs):
+        self.list_calls.append(kwargs)
+        if self.fail:
+            raise ClientError({'Error': {'Code': 'ThrottlingException'}}, 'ListSecrets')
+        for name in self.secrets:
+            tags = [{'Key': key, 'Value': value} for key, value in self.tags.get(name, {}).items()]
+            yield {'SecretList': [{'Name': name, 'Tags': tags}]}
+
+
+class TestListSecrets(unittest.TestCase):
+    """
+    Tests for SecretsManagerProvider.list_secrets
+    """
+
+    def setUp(self) -> None:
+        self.client = boto3.client('secretsmanager', **AWS_KWARGS)
+        self.stubber = Stubber(self.client)
+        self.stubber.activate()
+
+    def tearDown(self) -> None:
+        self.stubber.deactivate()
+
+    def test_filters_and_pages(self):
+        """
+        Every page is listed, entries not matching the prefix (case) or every tag are dropped.
+        """
+        expected = {'MaxResults': 100, 'Filters': [{'Key': 'name', 'Values': ['org/']},
+                                                   {'Key': 'tag-key', 'Values': ['team', 'env']},
+                                                   {'Key': 'tag-value', 'Values': ['prod']}]}
+        self.stubber.add_response('list_secrets', {'SecretList': [
+            {'Name': 'org/default', 'Tags': [{'Key': 'team', 'Value': 'core'}, {'Key': 'env', 'Value': 'prod'}]},
+            {'Name': 'ORG/other', 'Tags': [{'Key': 'team', 'Value': 'core'}, {'Key': 'env', 'Value': 'prod'}]},
+        ], 'NextToken': 'page-2'}, expected)
+        self.stubber.add_response('list_secrets', {'SecretList': [
+            {'Name': 'org/service', 'Tags': [{'Key': 'team', 'Value': 'web'}, {'Key': 'env', 'Value': 'prod'}]},
+            {'Name': 'org/staging', 'Tags': [{'Key': 'team', 'Value': 'web'}, {'Key': 'env', 'Value': 'staging'}]},
+            {'Name': 'org/untagged'},
+        ]}, dict(expected, NextToken='page-2'))
+        names = SecretsManagerProvider().list_secrets(self.client, 'org/', {'team': None, 'env': 'prod'})
+        self.stubber.assert_no_pending_responses()
+        self.assertEqual(names, ['org/default', 'org/service'])
+
+
+class TestDiscover(unittest.TestCase):
+    """
+    Tests for SecretParser.discover
+    """
+
+    def setUp(self) -> None:
+        self.client = ListingSecretsClient({
+            'org/service/eu-west-1': {'database__host': 'regional_host'},
+            'org/default': {'database__host': 'default_host', 'database__port': '5432', 'debug': 'false'},
+            'org/service': {'database__host': 'service_host', 'debug': 'true'},
+        })
+        self.secret_manager = SecretManager()
+        self.secret_manager.client = self.client
+
+    def tearDown(self) -> None:
+        self.secret_manager.close()
+
+    def test_precedence(self):
+        """
+        Discovered tiers are merged from the least to the most specific name.
+        """
+        names = self.secret_manager.discover('org/')
+        self.assertEqual(names, ['org/default', 'org/service', 'org/service/eu-west-1'])
+        self.assertEqual(list(self.secret_manager._secrets), names)
+        self.assertEqual(self.secret_manager.str('database__host'), 'regional_host')
+        self.assertTrue(self.secret_manager.bool('debug'))
+        self.assertEqual(self.secret_manager.int('database__port'), 5432)
+        self.assertEqual(self.client.list_calls,
+                         [{'MaxResults': 100, 'Filters': [{'Key': 'name', 'Values': ['org/']}]}])
+        self.assertEqual(discovery_order('a/b/c'), (2, 'a/b/c'))
+
+    def test_order_and_tags(self):
+        """
+        A custom order sets the precedence, tags select the secrets.
+        """
+        self.client.tags = {'org/default': {'team': 'core'}, 'org/service': {'team': 'core'}}
+        names = self.secret_manager.discover('org/', tags={'team': 'core'}, order=lambda name: -len(name))
+        self.assertEqual(names, ['org/default', 'org/service'])
+        self.assertEqual(self.secret_manager.str('database__host'), 'service_host')
+
+    def test_ttl(self):
+        """
+        The listing is reused until it expires, then new secrets are loaded on top.
+        """
+        self.secret_manager.discover('org/')
+        self.client.secrets['org/new'] = {'Name': 'org/new', 'VersionId': '1',
+                                          'SecretString': json.dumps({'debug': 'false'})}
+        self.secret_manager.discover('org/')
+        self.assertEqual(len(self.client.list_calls), 1)
+        self.assertNotIn('org/new', self.secret_manager._secrets)
+
+        with patch('supersecret.parser.time.monotonic', return_value=1e12):
+            names = self.secret_manager.discover('org/')
+        self.assertEqual(len(self.client.list_calls), 2)
+        self.assertEqual(names[1], 'org/new')
+        self.assertEqual(list(self.secret_manager._secrets)[-1], 'org/new')
+        self.assertFalse(self.secret_manager.bool('debug'))
+
+    def test_listing_errors(self):
+        """
+        A failed listing uses the previous one, and raises without one.
+        """
+        self.client.fail = True
+        with self.assertRaises(ClientError):
+            self.secret_manager.discover('org/')
+        self.client.fail = False
+        self.secret_manager.discover('org/', ttl=0)
+        self.client.fail = True
+        self.secret_manager.instrument()
+        self.assertEqual(len(self.secret_manager.discover('org/', ttl=0)), 3)
+        self.assertEqual(self.secret_manager.stats()['aws']['errors'], {'org/:ListSecrets:ThrottlingException': 1})
@@ -0,0 +1,74 @@
+"""
+Tests for the environment snapshot.
+"""
+import os
+import unittest
+from unittest.mock import patch
+
+from supersecret.env import EnvSnapshot
+from supersecret.manager import SecretManager
+from .test_manager import MockSecretsClient
+
+
+class TestEnvSnapshot(unittest.TestCase):
+    def test_lookup(self):
+        """
+        Lookups resolve the name, then the upper case name, like the live environment.
+        """
+        snapshot = EnvSnapshot({'lower': '1', 'UPPER': '2', 'mixed': '3', 'MIXED': '4', 'Other': '5'})
+        self.assertEqual(snapshot.lookup('lower'), '1')
+        self.assertEqual(snapshot.lookup('upper'), '2')
+        self.assertEqual(snapshot.lookup('UPPER'), '2')
+        self.assertEqual(snapshot.lookup('mixed'), '3')
+        self.assertEqual(snapshot.lookup('Mixed'), '4')
+        self.assertIsNone(snapshot.lookup('LOWER'))
+        self.assertIsNone(snapshot.lookup('other'))
+        self.assertIsNone(snapshot.lookup('missing'))
+        self.assertEqual(snapshot['Other'], '5')
+        self.assertEqual(len(snapshot), 5)
+
+    def test_with_prefix(self):
+        """
+        Only the keys starting with the prefix are returned.
+        """
+        snapshot = EnvSnapshot({'db__host': 'a', 'DB__PORT': '1', 'dbx__host': 'b', 'db': 'c',
+                                'db__options__ssl': 'on'})
+        self.assertEqual(snapshot.with_prefix('db'), {'db__host': 'a', 'DB__PORT': '1', 'db__options__ssl': 'on'})
+        self.assertEqual(snapshot.with_prefix('db__options'), {'db__options__ssl': 'on'})
+        self.assertEqual(snapshot.with_prefix('missing'), {})
+
+    def test_manager_snapshot(self):
+        """
+        A manager in snapshot mode ignores environment changes until refresh_env is called.
+        """
+        os.environ['SNAPSHOT_TEST'] = 'before'
+        os.environ['SNAPSHOT__host'] = 'before'
+        try:
+            with patch.object(SecretManager, 'connect') as mock_connect_to_session:
+                mock_connect_to_session.return_value = MockSecretsClient()
+                secret_manager = SecretManager('TestingSecret', env_snapshot=True)
+                os.environ['SNAPSHOT_TEST'] = 'after'
+                os.environ['SNAPSHOT__host'] = 'after'
+                self.assertEqual(secret_manager.str('snapshot_test'), 'before')
+                self.assertEqual(secret_manager.dict('snapshot'), {'host': 'before'})
+                self.assertEqual(secret_manager.str('username'), 'test_username')
+
+                secret_manager.refresh_env()
+                self.assertEqual(secret_manager.str('snapshot_test'), 'after')
+                self.assertEqual(secret_manager.dict('snapshot'), {'host': 'after'})
+        finally:
+            del os.environ['SNAPSHOT_TEST']
+            del os.environ['SNAPSHOT__host']
+
+    def test_live_env(self):
+        """
+        Without a snapshot the live environment is used.
+        """
+        with patch.object(SecretManager, 'connect') as mock_connect_to_session:
+            mock_connect_to_session.return_value = MockSecretsClient()
+            secret_manager = SecretManager('TestingSecret')
+            os.environ['LIVE_TEST'] = 'live'
+            try:
+                self.assertEqual(secret_manager.str('live_test'), 'live')
+            finally:
+                del os.environ['LIVE_TEST']
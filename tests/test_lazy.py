@@ -0,0 +1,94 @@
+"""
+Tests for lazy decoding of JSON secret strings.
+"""
+import json
+import unittest
+
+from supersecret.lazy import LazyJSONObject, index_object
+from supersecret.manager import SecretManager
+from .test_manager import MockSecretsClient, ReloadingSecretsClient
+
+DOCUMENT = json.dumps({
+    'plain': 'value',
+    'escaped': 'say "hi" \\ {not nested} [nor this]',
+    'unicode': 'café ☃',
+    'trailing_backslash': 'ends with \\',
+    'number': 12.5,
+    'negative': -3,
+    'flags': [True, False, None],
+    'nested': {'a': {'b': ['c', {'d': '}]'}]}},
+    'empty': {},
+    'certificate': '-----BEGIN CERTIFICATE-----\nMIIB\n-----END CERTIFICATE-----\n',
+}, indent=2)
+
+
+class TestLazyJSONObject(unittest.TestCase):
+    def test_decodes_like_json(self):
+        """
+        Every value decodes to the same value as json.loads.
+        """
+        lazy = LazyJSONObject(DOCUMENT)
+        self.assertEqual(list(lazy), list(json.loads(DOCUMENT)))
+        self.assertEqual(dict(lazy.items()), json.loads(DOCUMENT))
+        self.assertEqual(len(index_object('{}')), 0)
+        self.assertEqual(dict(LazyJSONObject(' { "a" : "1" , "b":2 } ').items()), {'a': '1', 'b': 2})
+
+    def test_decodes_on_access(self):
+        """
+        Values are decoded and cached on first access only.
+        """
+        lazy = LazyJSONObject(DOCUMENT)
+        self.assertIn('nested', lazy)
+        self.assertEqual(lazy._decoded, {})
+        self.assertEqual(lazy['nested'], {'a': {'b': ['c', {'d': '}]'}]}})
+        self.assertIs(lazy['nested'], lazy['nested'])
+        self.assertEqual(list(lazy._decoded), ['nested'])
+        self.assertEqual(lazy.raw('number'), '12.5')
+        self.assertRaises(KeyError, lazy.__getitem__, 'missing')
+
+    def test_paths(self):
+        """
+        The leaves of nested objects are indexed with the document, without decoding anything.
+        """
+        document = json.dumps({'nested': {'a': {'b': ['c', {'d': '}]'}], 'k\\"ey': 1}}, 'empty': {},
+                               'nested__a__b': 'explicit'})
+        lazy = LazyJSONObject(document)
+        paths = lazy.paths()
+        self.assertEqual(dict(paths.items()), {'nested__a__k\\"ey': 1})
+        self.assertEqual(lazy._decoded, {})
+        self.assertEqual(paths.raw('nested__a__k\\"ey'), '1')
+        self.assertEqual(LazyJSONObject('{"a": 1}').paths(), {})
+
+    def test_invalid(self):
+        """
+        Malformed documents raise ValueError.
+        """
+        for document in ('[]', '{"a" "b"}', '{"a": "b"', '{"a": {"b": 1}', '{"a": 1 "b": 2}'):
+            self.assertRaises(ValueError, LazyJSONObject, document)
+
+    def test_manager(self):
+        """
+        A lazy manager serves the same values.
+        """
+        secret_manager = SecretManager('TestingSecret', lazy=True)
+        secret_manager.load(client=MockSecretsClient())
+        values = secret_manager._secrets['TestingSecret'].SecretValues.data
+        self.assertIsInstance(values, LazyJSONObject)
+        self.assertEqual(secret_manager.int('test_int'), 1234)
+        self.assertEqual(secret_manager.dict('database').options.ssl, 'True')
+        self.assertNotIn('username', values._decoded)
+
+    def test_reload_compares_encoded_values(self):
+        """
+        Reloading a lazy tier only reports the values that changed.
+        """
+        client = ReloadingSecretsClient()
+        secret_manager = SecretManager('TestingSecret', lazy=True)
+        secret_manager.load(client=client)
+        changes = []
+        secret_manager.subscribe(['username', 'password'], changes.append)
+        client.update('TestingSecret', '654321', password='changed')
+        secret_manager.reload()
+        self.assertEqual(changes[0].changed, {'password': ('test_password', 'changed')})
+        values = secret_manager._secrets['TestingSecret'].SecretValues.data
+        self.assertEqual(list(values._decoded), ['password'])
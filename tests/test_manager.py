@@ -5,6 +5,7 @@ import datetime
 import decimal
 import unittest
 import json
+import threading
 import uuid
 from collections import OrderedDict
 from unittest.mock import patch
@@ -12,6 +13,7 @@ import os
 
 from botocore.client import BaseClient
 
+from supersecret import fields
 from supersecret.manager import SecretManager
 from supersecret.util import AttrDict
 
@@ -304,3 +306,237 @@ class TestSecretManager(unittest.TestCase):
             with SecretManager('TestingSecret') as secret_manager:
                 self.assertEqual(secret_manager.str('username'), 'test_username')
                 self.assertEqual(secret_manager.str('password'), 'test_password')
+
+
+class ReloadingSecretsClient(MockSecretsClient):
+    """
+    Mock client whose secrets can be changed between calls.
+    """
+
+    def __init__(self):
+        self.secrets = {name: dict(secret) for name, secret in SECRETS_MOCK.items()}
+
+    def update(self, name, version_id, **values):
+        secret = dict(self.secrets[name])
+        secret_values = json.loads(secret['SecretString'])
+        for key, value in values.items():
+            if value is None:
+                secret_values.pop(key, None)
+            else:
+                secret_values[key] = value
+        secret['SecretString'] = json.dumps(secret_values)
+        secret['VersionId'] = version_id
+        self.secrets[name] = secret
+
+    def get_secret_value(self, SecretId):
+        return AttrDict(self.secrets[SecretId])
+
+
+class TestSubscriptions(unittest.TestCase):
+    """
+    Tests for reloading tiers and the change notifications.
+    """
+
+    def setUp(self) -> None:
+        self.client = ReloadingSecretsClient()
+        self.secret_manager = SecretManager('TestingSecret')
+        self.secret_manager.load(client=self.client)
+
+    def test_reload_notifies_subscribers(self):
+        """
+        Only subscribers of changed keys are called, with the diff of their keys.
+        """
+        database_changes, username_changes, other_changes = [], [], []
+        self.secret_manager.subscribe('database', database_changes.append)
+        self.secret_manager.subscribe(['username', 'password'], username_changes.append)
+        self.secret_manager.subscribe('unrelated', other_changes.append)
+
+        self.client.update('TestingSecret', '654321', database__host='db.example.com',
+                           database__options__ssl=None, database__options__timeout='10', unrelated_key='x')
+        self.secret_manager.reload()
+
+        self.assertEqual(len(database_changes), 1)
+        changes = database_changes[0]
+        self.assertEqual(changes.changed, {'database__host': ('localhost', 'db.example.com')})
+        self.assertEqual(changes.removed, {'database__options__ssl': 'True'})
+        self.assertEqual(changes.added, {'database__options__timeout': '10'})
+        self.assertEqual(username_changes, [])
+        self.assertEqual(other_changes, [])
+        self.assertEqual(self.secret_manager.str('database__host'), 'db.example.com')
+        self.assertEqual(self.secret_manager.dict('database').options, AttrDict({'timeout': '10'}))
+
+    def test_reload_same_version(self):
+        """
+        Reloading an unchanged version does not notify anyone.
+        """
+        changes = []
+        self.secret_manager.subscribe('database', changes.append)
+        self.assertIs(self.secret_manager.reload(), self.secret_manager._secrets['TestingSecret'])
+        self.assertEqual(changes, [])
+
+    def test_reload_shadowed_tier(self):
+        """
+        Changes in a lower tier that are shadowed by a higher tier are not reported.
+        """
+        self.secret_manager.load('TestingSecret2', client=self.client)
+        changes = []
+        subscription = self.secret_manager.subscribe(['username', 'test_only_default'], changes.append)
+
+        self.client.update('TestingSecret', '654321', username='shadowed', test_only_default='1')
+        self.secret_manager.reload('TestingSecret')
+        self.assertEqual(self.secret_manager.str('username'), 'new_username')
+        self.assertEqual(len(changes), 1)
+        self.assertEqual(changes[0].added, {'test_only_default': '1'})
+        self.assertEqual(changes[0].keys(), {'test_only_default'})
+
+        # Removing the key from the top tier falls back to the lower tier
+        self.client.update('TestingSecret2', '765432', username=None)
+        self.secret_manager.reload('TestingSecret2')
+        self.assertEqual(changes[-1].changed, {'username': ('new_username', 'shadowed')})
+        self.assertEqual(self.secret_manager.str('username'), 'shadowed')
+
+        self.secret_manager.unsubscribe(subscription)
+        self.client.update('TestingSecret', '876543', username='unsubscribed')
+        self.secret_manager.reload('TestingSecret')
+        self.assertEqual(len(changes), 2)
+
+    def test_callbacks_outside_lock(self):
+        """
+        Callbacks run once the lock is released, a failing callback doesn't stop the reload or the others.
+        """
+        owners, changes = [], []
+
+        def failing(_):
+            raise ValueError('callback failed')
+
+        def read_from_other_thread(_):
+            reader = threading.Thread(target=lambda: owners.append(self.secret_manager.owners()['username']))
+            reader.start()
+            reader.join(1)
+            self.assertFalse(reader.is_alive())
+        self.secret_manager.subscribe('username', failing)
+        self.secret_manager.subscribe('username', read_from_other_thread)
+        self.secret_manager.subscribe('username', changes.append)
+
+        self.client.update('TestingSecret', '654321', username='changed')
+        with self.assertLogs('supersecret.subscriptions', 'ERROR') as logs:
+            self.assertEqual(self.secret_manager.reload().VersionId, '654321')
+        self.assertIn('callback failed', logs.output[0])
+        self.assertEqual(owners, ['TestingSecret'])
+        self.assertEqual(changes[0].changed, {'username': ('test_username', 'changed')})
+        self.assertEqual(self.secret_manager.str('username'), 'changed')
+
+    def test_reads_during_reloads(self):
+        """
+        Readers never see a half-updated index: a key the top tier drops keeps being served by the lower tier.
+        """
+        self.client.update('TestingSecret', '654321', gone='lower')
+        self.secret_manager.reload('TestingSecret')
+        self.secret_manager.load('TestingSecret2', client=self.client)
+        filler = {f'key_{i}': str(i) for i in range(2000)}
+        errors, done = [], threading.Event()
+
+        def read():
+            while not done.is_set():
+                try:
+                    self.assertIn(self.secret_manager.value('gone'), ('lower', 'top'))
+                    self.secret_manager.int('test_int')
+                except (KeyError, AssertionError) as error:
+                    errors.append(error)
+        reader = threading.Thread(target=read)
+        reader.start()
+        try:
+            for i in range(100):
+                self.client.update('TestingSecret2', str(i), gone='top' if i % 2 else None, test_int=str(i), **filler)
+                self.secret_manager.reload('TestingSecret2')
+        finally:
+            done.set()
+            reader.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(self.secret_manager.int('test_int'), 99)
+
+
+class TestCaches(unittest.TestCase):
+    """
+    Tests for the conversion and dict caches and their invalidation on reload.
+    """
+
+    def setUp(self) -> None:
+        self.client = ReloadingSecretsClient()
+        self.secret_manager = SecretManager('TestingSecret')
+        self.secret_manager.load(client=self.client)
+        self.secret_manager.load('TestingSecret2', client=self.client)
+
+    def test_conversion_cache(self):
+        """
+        Converted values are cached until their key changes.
+        """
+        self.assertEqual(self.secret_manager.int('test_int'), 5678)
+        self.assertEqual(self.secret_manager.float('test_float'), 5.678)
+        self.assertIn(('int',), self.secret_manager._converted['test_int'])
+
+        self.client.update('TestingSecret2', '765432', test_int='42')
+        self.secret_manager.reload('TestingSecret2')
+        self.assertNotIn('test_int', self.secret_manager._converted)
+        self.assertIn('test_float', self.secret_manager._converted)
+        self.assertEqual(self.secret_manager.int('test_int'), 42)
+
+    def test_conversion_not_cached_from_env(self):
+        """
+        Values from the environment are not cached.
+        """
+        os.environ['TEST_CACHE_ENV'] = '1'
+        try:
+            self.assertEqual(self.secret_manager.int('TEST_CACHE_ENV'), 1)
+            os.environ['TEST_CACHE_ENV'] = '2'
+            self.assertEqual(self.secret_manager.int('TEST_CACHE_ENV'), 2)
+            self.assertNotIn('TEST_CACHE_ENV', self.secret_manager._converted)
+        finally:
+            del os.environ['TEST_CACHE_ENV']
+
+    def test_mutable_results_are_copies(self):
+        """
+        Mutating a returned list doesn't change the cache, dicts are immutable (thawed copies are mutable).
+        """
+        self.secret_manager.list('test_list').append('mutated')
+        self.assertEqual(self.secret_manager.list('test_list'), ['test4', 'test5', 'test6'])
+        with self.assertRaises(TypeError):
+            self.secret_manager.dict('database').options.ssl = 'mutated'
+        self.secret_manager.dict('database').thaw().options.ssl = 'mutated'
+        self.assertEqual(self.secret_manager.dict('database').options.ssl, 'False')
+
+    def test_dict_cache(self):
+        """
+        Cached dicts are only invalidated by keys with their prefix.
+        """
+        self.assertEqual(self.secret_manager.dict('database').host, 'remote_host')
+        self.client.update('TestingSecret', '654321', username='changed')
+        self.secret_manager.reload('TestingSecret')
+        self.assertIn('database', self.secret_manager._dicts)
+
+        self.client.update('TestingSecret2', '765432', database__host=None)
+        self.secret_manager.reload('TestingSecret2')
+        self.assertNotIn('database', self.secret_manager._dicts)
+        self.assertEqual(self.secret_manager.dict('database').host, 'localhost')
+
+    def test_dict_sharing(self):
+        """
+        Dicts are shared between calls, and a reload only rebuilds the subtrees that changed.
+        """
+        database = self.secret_manager.dict('database')
+        self.assertIs(self.secret_manager.dict('database'), database)
+        self.assertEqual(hash(database), hash(self.secret_manager.dict('database', subcast_values=fields.Str())))
+
+        self.client.update('TestingSecret2', '765432', database__host='new_host')
+        self.secret_manager.reload('TestingSecret2')
+        reloaded = self.secret_manager.dict('database')
+        self.assertIsNot(reloaded, database)
+        self.assertEqual(reloaded.host, 'new_host')
+        self.assertIs(reloaded.options, database.options)
+        self.assertEqual(self.secret_manager._stale_dicts, {})
+
+        with patch.dict(os.environ, {'DATABASE__options__timeout': '10'}):
+            overlaid = self.secret_manager.dict('database')
+        self.assertEqual(overlaid.options, {'ssl': 'False', 'timeout': '10'})
+        self.assertEqual(overlaid.host, 'new_host')
+        self.assertIs(self.secret_manager.dict('database'), reloaded)
@@ -0,0 +1,161 @@
+"""
+Tests for the prefetch manifest, warm and load_many.
+"""
+import json
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+from botocore.exceptions import ClientError
+
+from supersecret import fields
+from supersecret.manager import SecretManager
+from supersecret.manifest import Manifest
+from supersecret.providers import JSONFileProvider
+from .test_manager import ReloadingSecretsClient, SECRETS_MOCK
+
+
+class BarrierSecretsClient(ReloadingSecretsClient):
+    """
+    Mock client whose calls only return once `parties` calls are in flight.
+    """
+
+    def __init__(self, parties):
+        super().__init__()
+        self.barrier = threading.Barrier(parties, timeout=5)
+        self.calls = []
+
+    def get_secret_value(self, SecretId):
+        self.calls.append(SecretId)
+        if SecretId not in self.secrets:
+            raise ClientError({'Error': {'Code': 'ResourceNotFoundException', 'Message': ''}}, 'GetSecretValue')
+        self.barrier.wait()
+        return super().get_secret_value(SecretId)
+
+
+class TestLoadMany(unittest.TestCase):
+    """
+    Tests for the parallel loading of tiers.
+    """
+
+    def test_parallel_fetch(self):
+        """
+        Secrets are fetched concurrently and merged in the given order.
+        """
+        client = BarrierSecretsClient(2)
+        secret_manager = SecretManager('TestingSecret')
+        secret_manager.client = client
+        responses = secret_manager.load_many(['TestingSecret', 'TestingSecret2'])
+        self.assertEqual([response.Name for response in responses], ['TestingSecret', 'TestingSecret2'])
+        self.assertEqual(list(secret_manager._secrets), ['TestingSecret', 'TestingSecret2'])
+        self.assertEqual(secret_manager.str('username'), 'new_username')
+
+        # Loaded secrets are not fetched again
+        secret_manager.load_many(['TestingSecret2', 'TestingSecret'])
+        self.assertEqual(len(client.calls), 2)
+
+    def test_missing_secret(self):
+        """
+        Missing secrets are None unless they are required.
+        """
+        secret_manager = SecretManager('TestingSecret')
+        secret_manager.client = BarrierSecretsClient(1)
+        self.assertEqual(secret_manager.load_many(['Missing', 'TestingSecret'])[0], None)
+        self.assertEqual(list(secret_manager._secrets), ['TestingSecret'])
+        with self.assertRaises(ClientError):
+            secret_manager.load_many(['Missing'], required=True)
+
+
+class TestManifest(unittest.TestCase):
+    """
+    Tests for recording, saving and warming a prefetch manifest.
+    """
+
+    def setUp(self) -> None:
+        self.client = ReloadingSecretsClient()
+        self.secret_manager = SecretManager('TestingSecret')
+        self.secret_manager.record_access()
+        self.secret_manager.load(client=self.client)
+        self.secret_manager.load('TestingSecret2', client=self.client)
+        self.secret_manager.int('test_int')
+        self.secret_manager.list('test_list', subcast=fields.Str)
+        self.secret_manager.value('username')
+        self.secret_manager.dict('database')
+
+    def test_manifest_has_no_values(self):
+        """
+        The manifest holds tier names, keys and conversions, but no values.
+        """
+        manifest = self.secret_manager.manifest()
+        self.assertEqual(manifest.tiers, [('TestingSecret', 'SecretsManagerProvider'),
+                                          ('TestingSecret2', 'SecretsManagerProvider')])
+        self.assertEqual(manifest.keys['test_int'], [('int',)])
+        self.assertEqual(manifest.keys['username'], [])
+        self.assertEqual(manifest.dicts['database'], [(fields.Str, fields.Str)])
+
+        document = json.dumps(manifest.to_dict())
+        for secret in SECRETS_MOCK.values():
+            for value in json.loads(secret['SecretString']).values():
+                self.assertNotIn(json.dumps(value), document)
+
+    def test_save_and_warm(self):
+        """
+        Warming from a saved manifest loads the tiers in order and caches the conversions.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'manifest.json')
+            self.secret_manager.manifest().save(path)
+            self.assertEqual(Manifest.load(path), self.secret_manager.manifest())
+
+            secret_manager = SecretManager('TestingSecret')
+            secret_manager.client = self.client
+            self.assertEqual(secret_manager.warm(path), [])
+        self.assertEqual(list(secret_manager._secrets), ['TestingSecret', 'TestingSecret2'])
+        self.assertEqual(secret_manager._converted['test_int'], {('int',): 5678})
+        self.assertIn(('list', ',', fields.Str), secret_manager._converted['test_list'])
+        self.assertIn('database', secret_manager._dicts)
+
+    def test_warm_failures(self):
+        """
+        Keys that can't be converted are reported, unknown providers raise.
+        """
+        manifest = Manifest(tiers=[('TestingSecret', 'SecretsManagerProvider')],
+                            keys={'username': [('int',)], 'missing': [('str',)]})
+        secret_manager = SecretManager('TestingSecret')
+        secret_manager.client = self.client
+        self.assertEqual(sorted(secret_manager.warm(manifest)), ['missing', 'username'])
+        with self.assertRaises(ValueError):
+            secret_manager.warm(Manifest(tiers=[('other', 'CustomProvider')]))
+
+    def test_load_only_imports_field_modules(self):
+        """
+        A manifest file can only name field classes of marshmallow and supersecret, other modules are not imported.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'manifest.json')
+            with open(path, 'w') as file:
+                json.dump({'version': 1, 'tiers': [], 'dicts': {},
+                           'keys': {'key': [['list', ',', {'class': 'tests.unimportable:Field'}]]}}, file)
+            with patch('importlib.import_module') as import_module:
+                self.assertRaisesRegex(ValueError, 'not a field class', Manifest.load, path)
+            import_module.assert_not_called()
+
+    def test_warm_file_provider(self):
+        """
+        Tiers of other providers are rebuilt from the recorded provider class.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'secrets.json')
+            with open(path, 'w') as file:
+                json.dump({'username': 'file_username'}, file)
+            self.secret_manager.load(path, provider=JSONFileProvider())
+            manifest = self.secret_manager.manifest()
+            self.assertEqual(manifest.tiers[-1], (path, 'JSONFileProvider'))
+
+            secret_manager = SecretManager('TestingSecret')
+            secret_manager.client = self.client
+            secret_manager.warm(manifest)
+            self.assertIsInstance(secret_manager._providers[path], JSONFileProvider)
+            self.assertEqual(secret_manager.str('username'), 'file_username')
@@ -0,0 +1,111 @@
+"""
+Tests for reading several keys at once.
+"""
+import datetime
+import os
+import unittest
+from unittest.mock import patch
+
+import marshmallow as ma
+
+from supersecret import fields
+from supersecret.manager import SecretManager
+from supersecret.manifest import Manifest
+from .test_manager import ReloadingSecretsClient
+
+
+class TestMany(unittest.TestCase):
+    """
+    Tests for SecretManager.many
+    """
+
+    def setUp(self) -> None:
+        self.client = ReloadingSecretsClient()
+        self.client.update('TestingSecret', '1', DEBUG='true', RATIO='1.5', START='2023-01-01T12:00:00',
+                           database={'default': {'PORT': '5432'}})
+        self.secret_manager = SecretManager('TestingSecret')
+        self.secret_manager.load(client=self.client)
+
+    def test_values(self):
+        """
+        Values are converted by field class or instance, in the order of the spec.
+        """
+        settings = self.secret_manager.many({
+            'test_int': fields.Int,
+            'DEBUG': fields.Bool,
+            'RATIO': fields.Float(),
+            'START': fields.Datetime,
+            'database.default.PORT': fields.Int,
+            'username': fields.Str,
+        })
+        self.assertEqual(list(settings), ['test_int', 'DEBUG', 'RATIO', 'START', 'database.default.PORT', 'username'])
+        self.assertEqual(settings.test_int, 1234)
+        self.assertIs(settings.DEBUG, True)
+        self.assertEqual(settings['RATIO'], 1.5)
+        self.assertEqual(settings.START, datetime.datetime(2023, 1, 1, 12))
+        self.assertEqual(settings['database.default.PORT'], 5432)
+        self.assertEqual(settings.username, 'test_username')
+
+    def test_env_and_defaults(self):
+        """
+        Keys not served by a tier come from the environment or the defaults, and are not cached.
+        """
+        with patch.dict(os.environ, {'WORKERS': '4'}):
+            settings = self.secret_manager.many({'WORKERS': fields.Int, 'TIMEOUT': fields.Int},
+                                                defaults={'TIMEOUT': '30'})
+        self.assertEqual(settings, {'WORKERS': 4, 'TIMEOUT': 30})
+        self.assertNotIn('WORKERS', self.secret_manager._converted)
+
+    def test_errors_reported_together(self):
+        """
+        Every missing and invalid key is reported in one ValidationError.
+        """
+        with self.assertRaises(ma.ValidationError) as context:
+            self.secret_manager.many({'username': fields.Int, 'MISSING': fields.Str, 'OTHER': fields.Bool,
+                                      'test_int': fields.Int, 'DEBUG': fields.Int})
+        self.assertEqual(set(context.exception.messages), {'username', 'MISSING', 'OTHER', 'DEBUG'})
+        self.assertEqual(context.exception.messages['MISSING'], ['Missing data for required field.'])
+        self.assertEqual(context.exception.valid_data, {'test_int': 1234})
+
+    def test_shares_getter_cache(self):
+        """
+        Conversions are cached like the equivalent getter, and invalidated by a reload.
+        """
+        self.assertEqual(self.secret_manager.int('test_int'), 1234)
+        with patch.object(fields.Int, 'deserialize') as mock_deserialize:
+            self.assertEqual(self.secret_manager.many({'test_int': fields.Int}).test_int, 1234)
+            mock_deserialize.assert_not_called()
+        self.secret_manager.many({'START': fields.Datetime})
+        self.assertIn(('field', fields.Datetime), self.secret_manager._converted['START'])
+
+        self.client.update('TestingSecret', '2', test_int='4321')
+        self.secret_manager.reload()
+        self.assertEqual(self.secret_manager.many({'test_int': fields.Int}).test_int, 4321)
+
+    def test_instrumented(self):
+        """
+        An instrumented manager records the lookups and conversions of every key.
+        """
+        self.secret_manager.instrument()
+        self.assertEqual(self.secret_manager.many({'test_int': fields.Int, 'TIMEOUT': fields.Int},
+                                                  defaults={'TIMEOUT': '30'}),
+                         {'test_int': 1234, 'TIMEOUT': 30})
+        stats = self.secret_manager.stats()
+        self.assertEqual(stats['lookups']['sources'], {'tier': 1, 'default': 1})
+        with self.assertRaises(ma.ValidationError):
+            self.secret_manager.many({'MISSING': fields.Int})
+
+    def test_manifest_replays_fields(self):
+        """
+        Fields of `many` without an equivalent getter are recorded and replayed by `warm`.
+        """
+        self.secret_manager.record_access()
+        self.secret_manager.many({'START': fields.Datetime, 'test_int': fields.Int})
+        manifest = Manifest.from_dict(self.secret_manager.manifest().to_dict())
+        self.assertEqual(manifest.keys['START'], [('field', fields.Datetime)])
+
+        warmed = SecretManager('TestingSecret')
+        warmed.client = self.client
+        self.assertEqual(warmed.warm(manifest), [])
+        self.assertEqual(warmed._converted['START'], {('field', fields.Datetime): datetime.datetime(2023, 1, 1, 12)})
+        self.assertEqual(warmed._converted['test_int'], {('int',): 1234})
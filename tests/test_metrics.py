@@ -0,0 +1,127 @@
+"""
+Tests for the supersecret.metrics module.
+"""
+import unittest
+
+from botocore.exceptions import ClientError
+
+from supersecret.manager import SecretManager
+from supersecret.metrics import BUCKETS_MS, Histogram, Metrics
+
+from .test_manager import ReloadingSecretsClient
+
+
+class FailingSecretsClient:
+    """
+    Mock client raising a ClientError.
+    """
+
+    def get_secret_value(self, SecretId):
+        raise ClientError({'Error': {'Code': 'ResourceNotFoundException', 'Message': 'Not found'}},
+                          'GetSecretValue')
+
+
+class TestHistogram(unittest.TestCase):
+    """
+    Tests for the latency histogram.
+    """
+
+    def test_buckets(self):
+        """
+        Latencies fall in the first bucket whose bound is not lower, the last bucket is unbounded.
+        """
+        histogram = Histogram()
+        histogram.add(0.0005)
+        histogram.add(0.002)
+        histogram.add(60)
+        result = histogram.as_dict()
+        self.assertEqual(result['count'], 3)
+        self.assertEqual(result['max_ms'], 60000)
+        self.assertEqual(result['buckets']['<=0.5ms'], 1)
+        self.assertEqual(result['buckets']['<=5ms'], 1)
+        self.assertEqual(result['buckets'][f'>{BUCKETS_MS[-1]}ms'], 1)
+
+
+class TestMetrics(unittest.TestCase):
+    """
+    Tests for the instrumentation of the SecretManager.
+    """
+
+    def setUp(self) -> None:
+        self.client = ReloadingSecretsClient()
+        self.secret_manager = SecretManager('TestingSecret', env={'ENV_ONLY': 'env'})
+        self.events = []
+        self.secret_manager.instrument(hooks=[lambda event, data: self.events.append((event, data))])
+
+    def test_disabled_by_default(self):
+        """
+        A manager records nothing until it is instrumented.
+        """
+        secret_manager = SecretManager('TestingSecret')
+        secret_manager.load(client=self.client)
+        self.assertEqual(secret_manager.str('username'), 'test_username')
+        self.assertEqual(secret_manager.stats(), {})
+
+    def test_aws_calls(self):
+        """
+        Provider fetches are counted and timed per tier and operation, errors are counted by code.
+        """
+        self.secret_manager.load(client=self.client)
+        self.secret_manager.reload(client=self.client)
+        self.assertIsNone(self.secret_manager.load('Missing', client=FailingSecretsClient()))
+
+        stats = self.secret_manager.stats()['aws']
+        self.assertEqual(stats['calls']['TestingSecret:GetSecretValue']['count'], 2)
+        self.assertEqual(stats['calls']['Missing:GetSecretValue']['count'], 1)
+        self.assertEqual(stats['errors'], {'Missing:GetSecretValue:ResourceNotFoundException': 1})
+        self.assertIn(('aws_error', {'tier': 'Missing', 'operation': 'GetSecretValue',
+                                     'code': 'ResourceNotFoundException'}), self.events)
+
+    def test_lookups(self):
+        """
+        Lookups are counted by source, tier hits by tier.
+        """
+        self.secret_manager.load(client=self.client)
+        self.secret_manager.load('TestingSecret2', client=self.client)
+        self.secret_manager.value('username')
+        self.secret_manager.value('test_int')
+        self.secret_manager.value('ENV_ONLY')
+        self.secret_manager.value('nothing', default='default')
+        with self.assertRaises(KeyError):
+            self.secret_manager.value('nothing')
+
+        stats = self.secret_manager.stats()['lookups']
+        self.assertEqual(stats['sources'], {'tier': 2, 'env': 1, 'default': 1, 'missing': 1})
+        self.assertEqual(stats['tier_hits'], {'TestingSecret2': 2})
+        self.assertIn(('lookup', {'key': 'ENV_ONLY', 'source': 'env', 'tier': None}), self.events)
+
+    def test_conversions(self):
+        """
+        Conversions are timed per field type, cached conversions are counted as cache hits.
+        """
+        self.secret_manager.load(client=self.client)
+        self.assertEqual(self.secret_manager.int('test_int'), 1234)
+        self.assertEqual(self.secret_manager.int('test_int'), 1234)
+        self.assertEqual(self.secret_manager.list('test_list'), ['test1', 'test2', 'test3'])
+        self.assertEqual(self.secret_manager.dict('database').host, 'localhost')
+
+        stats = self.secret_manager.stats()
+        self.assertEqual(stats['conversions']['fields']['int']['count'], 1)
+        self.assertEqual(stats['conversions']['fields']['list']['count'], 1)
+        self.assertEqual(stats['conversions']['cache_hits'], {'int': 1})
+        self.assertEqual(stats['dict']['database']['count'], 1)
+        self.assertEqual(self.secret_manager._converted['test_int'], {('int',): 1234})
+
+    def test_uninstrument(self):
+        """
+        Metrics can be shared between managers and recording stops with uninstrument.
+        """
+        metrics = Metrics()
+        other = SecretManager('TestingSecret')
+        self.assertIs(other.instrument(metrics=metrics), metrics)
+        other.load(client=self.client)
+        other.uninstrument()
+        other.value('username')
+        self.assertEqual(other.stats(), {})
+        self.assertEqual(metrics.as_dict()['lookups']['sources'], {})
+        self.assertEqual(metrics.as_dict()['aws']['calls']['TestingSecret:GetSecretValue']['count'], 1)
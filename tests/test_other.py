@@ -2,10 +2,13 @@
 Test other parts of the supersecret package.
 """
 
+import copy
+import json
+import pickle
 import unittest
 
 from supersecret import get_version
-from supersecret.util import AttrDict
+from supersecret.util import AttrDict, FrozenDict
 
 
 class TestOther(unittest.TestCase):
@@ -28,3 +31,42 @@ class TestOther(unittest.TestCase):
 
         del d.test
         self.assertEqual(dict(d), {})
+        self.assertFalse(hasattr(d, 'test'))
+        with self.assertRaises(AttributeError):
+            del d.test
+        self.assertEqual(copy.copy(AttrDict({'test': 'test'})), {'test': 'test'})
+
+    def test_frozendict(self):
+        """
+        Test the FrozenDict class.
+        """
+        d = FrozenDict.freeze({'database': {'HOST': 'localhost', 'OPTIONS': {'ssl': 'True'}}, 'name': 'test'})
+        self.assertEqual(d.database.OPTIONS.ssl, 'True')
+        self.assertFalse(hasattr(d, 'missing'))
+        self.assertEqual(d, {'database': {'HOST': 'localhost', 'OPTIONS': {'ssl': 'True'}}, 'name': 'test'})
+        self.assertEqual(json.loads(json.dumps(d)), d)
+        for mutate in (lambda: d.__setitem__('name', 'x'), lambda: setattr(d, 'name', 'x'), lambda: d.pop('name'),
+                       lambda: d.update(name='x'), lambda: d.database.clear()):
+            with self.assertRaises(TypeError):
+                mutate()
+
+        self.assertEqual({d: 1}[FrozenDict.freeze(dict(d))], 1)
+        self.assertIs(copy.copy(d), d)
+        restored = pickle.loads(pickle.dumps(d))
+        self.assertIsInstance(restored.database, FrozenDict)
+        self.assertEqual(restored, d)
+
+        thawed = d.thaw()
+        thawed.database.OPTIONS.ssl = 'False'
+        self.assertIsInstance(thawed.database, AttrDict)
+        self.assertEqual(d.database.OPTIONS.ssl, 'True')
+
+    def test_frozendict_sharing(self):
+        """
+        Freezing against a previous tree reuses its unchanged subtrees.
+        """
+        previous = FrozenDict.freeze({'a': {'x': '1'}, 'b': {'y': {'z': '2'}}})
+        d = FrozenDict.freeze({'a': {'x': '1'}, 'b': {'y': {'z': '3'}}}, previous)
+        self.assertIs(d.a, previous.a)
+        self.assertIsNot(d.b, previous.b)
+        self.assertIs(FrozenDict.freeze({'a': {'x': '1'}, 'b': {'y': {'z': '2'}}}, previous), previous)
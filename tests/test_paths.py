@@ -0,0 +1,145 @@
+"""
+Tests for the paths of nested JSON values.
+"""
+import unittest
+from unittest.mock import patch
+
+import marshmallow as ma
+
+from supersecret import fields
+from supersecret.manager import SecretManager
+from supersecret.util import AttrDict, PathMapping
+from .test_manager import ReloadingSecretsClient
+
+NESTED = {'default': {'HOST': 'nested_host', 'PORT': '5432', 'OPTIONS': {'sslmode': 'require'}},
+          'replica': {'HOST': 'replica_host'}}
+
+
+class TestPathMapping(unittest.TestCase):
+    """
+    Tests for the path index of a tier.
+    """
+
+    def test_build(self):
+        """
+        Leaves of nested objects get a `__` path, explicit keys win.
+        """
+        values = {'database': NESTED, 'database__replica__HOST': 'explicit', 'flat': 'value'}
+        mapping = PathMapping.build(values)
+        self.assertEqual(mapping['database__default__OPTIONS__sslmode'], 'require')
+        self.assertEqual(mapping['database__replica__HOST'], 'explicit')
+        self.assertIs(mapping['database'], NESTED)
+        self.assertEqual(len(mapping), len(set(mapping)))
+        self.assertIs(PathMapping.build({'flat': 'value'}).__class__, dict)
+
+
+class TestPaths(unittest.TestCase):
+    """
+    Tests for path access through the SecretManager.
+    """
+
+    def setUp(self) -> None:
+        self.client = ReloadingSecretsClient()
+        self.client.update('TestingSecret', '1', database=NESTED, database__port=None, database__host=None)
+        self.secret_manager = SecretManager('TestingSecret')
+        self.secret_manager.load(client=self.client)
+
+    def test_value_by_path(self):
+        """
+        Nested values are reachable with a dotted path or the `__` convention.
+        """
+        self.assertEqual(self.secret_manager.value('database.default.HOST'), 'nested_host')
+        self.assertEqual(self.secret_manager.value('database__default__HOST'), 'nested_host')
+        self.assertEqual(self.secret_manager.int('database.default.PORT'), 5432)
+        self.assertIn('database__default__PORT', self.secret_manager._converted)
+        self.assertEqual(self.secret_manager.value('database.missing', default='default'), 'default')
+
+    def test_dotted_environment_name(self):
+        """
+        A dotted environment variable is read by its name, errors report the name as given.
+        """
+        with patch.dict('os.environ', {'my.key': 'dotted', 'other__key': '5'}):
+            self.assertEqual(self.secret_manager.value('my.key'), 'dotted')
+            self.assertEqual(self.secret_manager.str('my.key'), 'dotted')
+            self.assertEqual(self.secret_manager.many({'my.key': fields.Str}), {'my.key': 'dotted'})
+            self.assertEqual(self.secret_manager.int('other.key'), 5)
+        with self.assertRaisesRegex(KeyError, 'Key "my.key" is not found.'):
+            self.secret_manager.value('my.key')
+        with self.assertRaises(ma.ValidationError) as context:
+            self.secret_manager.many({'my.key': fields.Str})
+        self.assertEqual(list(context.exception.messages), ['my.key'])
+
+    def test_dict(self):
+        """
+        dict() merges nested and flattened keys, a dotted prefix selects a subtree.
+        """
+        database = self.secret_manager.dict('database')
+        self.assertEqual(database.default.OPTIONS.sslmode, 'require')
+        self.assertEqual(database.username, 'test_database_username')
+        self.assertEqual(self.secret_manager.dict('database.default'),
+                         AttrDict({'HOST': 'nested_host', 'PORT': '5432', 'OPTIONS': AttrDict({'sslmode': 'require'})}))
+
+    def test_dotted_dict_prefix(self):
+        """
+        A dotted prefix is used as given when keys start with it, as a path otherwise.
+        """
+        self.client.update('TestingSecret2', '2', **{'app.v1__host': 'v1_host', 'app__v2__host': 'v2_host'})
+        self.secret_manager.load('TestingSecret2', client=self.client)
+        self.assertEqual(self.secret_manager.dict('app.v1'), AttrDict({'host': 'v1_host'}))
+        self.assertEqual(self.secret_manager.dict('app.v2'), AttrDict({'host': 'v2_host'}))
+        with patch.dict('os.environ', {'env.v1__port': '80'}):
+            self.assertEqual(self.secret_manager.dict('env.v1'), AttrDict({'port': '80'}))
+
+    def test_dict_typed_leaves(self):
+        """
+        Non-string JSON leaves keep their type with the default string values, other fields convert them.
+        """
+        for lazy in (False, True):
+            self.client.update('TestingSecret', str(lazy), cache={'default': {'PORT': 6379, 'SSL': True, 'DB': None}},
+                               timeouts={'read': 5, 'write': '10'})
+            secret_manager = SecretManager('TestingSecret', lazy=lazy)
+            secret_manager.load(client=self.client)
+            self.assertEqual(secret_manager.dict('cache.default'), AttrDict({'PORT': 6379, 'SSL': True, 'DB': None}))
+            self.assertEqual(secret_manager.dict('cache').default.PORT, 6379)
+            timeouts = secret_manager.dict('timeouts', subcast_values=fields.Int)
+            self.assertEqual(timeouts, AttrDict({'read': 5, 'write': 10}))
+
+    def test_precedence_across_tiers(self):
+        """
+        A higher tier overrides nested values with flattened keys and the other way around.
+        """
+        self.client.update('TestingSecret2', '2', database__default__HOST='flat_host',
+                           cache={'default': {'HOST': 'cache_host'}})
+        self.client.update('TestingSecret', '3', cache__default__HOST='lower_host')
+        self.secret_manager.reload()
+        self.secret_manager.load('TestingSecret2', client=self.client)
+        self.assertEqual(self.secret_manager.value('database.default.HOST'), 'flat_host')
+        self.assertEqual(self.secret_manager.value('database.default.PORT'), '5432')
+        self.assertEqual(self.secret_manager.value('cache.default.HOST'), 'cache_host')
+        self.assertEqual(self.secret_manager.dict('database').default.HOST, 'flat_host')
+
+    def test_reload_changes_paths(self):
+        """
+        Subscribers and caches see the changes of nested leaves.
+        """
+        changes = []
+        self.secret_manager.subscribe('database__default', changes.append)
+        self.secret_manager.int('database.default.PORT')
+        nested = dict(NESTED, default=dict(NESTED['default'], PORT='6543'))
+        self.client.update('TestingSecret', '4', database=nested)
+        self.secret_manager.reload()
+        self.assertEqual(changes[0].changed, {'database__default__PORT': ('5432', '6543')})
+        self.assertEqual(self.secret_manager.int('database.default.PORT'), 6543)
+
+    def test_lazy_tier(self):
+        """
+        Lazy tiers index the paths without decoding the nested objects, a path decodes its leaf only.
+        """
+        secret_manager = SecretManager('TestingSecret', lazy=True)
+        secret_manager.load(client=self.client)
+        values = secret_manager._secrets['TestingSecret'].SecretValues.data
+        self.assertEqual(values._decoded, {})
+        self.assertEqual(secret_manager.value('database.replica.HOST'), 'replica_host')
+        self.assertEqual(values._decoded, {})
+        paths = secret_manager._index.tier('TestingSecret').mapping_of('database__replica__HOST')
+        self.assertEqual(paths._decoded, {'database__replica__HOST': 'replica_host'})
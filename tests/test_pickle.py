@@ -0,0 +1,97 @@
+"""
+Tests for pickling a loaded manager.
+"""
+import os
+import pickle
+import tempfile
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from unittest.mock import patch
+
+from supersecret.manager import SecretManager
+from supersecret.metrics import Metrics
+from .test_binary import BinarySecretsClient
+from .test_manager import ReloadingSecretsClient
+
+
+def read_port(secret_manager):
+    """
+    Process pool task: read a value and report if the worker had to fetch anything.
+    """
+    return secret_manager.int('database__port'), secret_manager.client is None
+
+
+class TestPickle(unittest.TestCase):
+    """
+    Tests for the pickled state of a manager.
+    """
+
+    def setUp(self) -> None:
+        self.client = ReloadingSecretsClient()
+        self.secret_manager = SecretManager('TestingSecret')
+        self.secret_manager.load(client=self.client)
+        self.secret_manager.load('TestingSecret2', client=self.client)
+
+    def test_roundtrip(self):
+        """
+        Tiers, index and caches are restored, clients and process-local state are not pickled.
+        """
+        self.secret_manager.int('test_int')
+        self.secret_manager.subscribe('database', lambda changes: None)
+        self.secret_manager.instrument()
+
+        restored = pickle.loads(pickle.dumps(self.secret_manager))
+        self.assertEqual(list(restored._secrets), ['TestingSecret', 'TestingSecret2'])
+        self.assertEqual(restored._index.owner('username'), 'TestingSecret2')
+        self.assertEqual(restored._converted['test_int'], {('int',): 5678})
+        self.assertEqual(restored.dict('database').host, 'remote_host')
+        self.assertIs(restored._env, os.environ)
+        self.assertIsNone(restored.client)
+        self.assertEqual(restored._clients, {})
+        self.assertFalse(restored._subscriptions)
+        self.assertEqual(restored.stats(), {})
+        self.assertIsInstance(self.secret_manager._metrics, Metrics)
+
+    def test_reconnects_lazily(self):
+        """
+        The unpickled manager only connects when it needs AWS again.
+        """
+        restored = pickle.loads(pickle.dumps(self.secret_manager))
+        with patch.object(SecretManager, 'connect') as mock_connect:
+            mock_connect.return_value = self.client
+            self.assertEqual(restored.str('username'), 'new_username')
+            mock_connect.assert_not_called()
+            self.client.update('TestingSecret2', '765432', username='reloaded')
+            restored.reload('TestingSecret2')
+            mock_connect.assert_called_once()
+        self.assertEqual(restored.str('username'), 'reloaded')
+
+    def test_lazy_snapshot_and_binary_tiers(self):
+        """
+        Lazy, snapshot and binary tiers are picklable.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'secrets.snapshot')
+            self.secret_manager.export_snapshot(path)
+            from_snapshot = SecretManager.from_snapshot(path)
+        from_snapshot.str('username')
+        restored = pickle.loads(pickle.dumps(from_snapshot))
+        self.assertEqual(restored.str('username'), 'new_username')
+        self.assertEqual(restored.str('database__host'), 'remote_host')
+
+        lazy = SecretManager('TestingSecret', lazy=True)
+        lazy.load(client=self.client)
+        self.assertEqual(pickle.loads(pickle.dumps(lazy)).int('test_int'), 1234)
+
+        binary = SecretManager('BinarySecret')
+        binary.load(client=BinarySecretsClient())
+        restored_binary = pickle.loads(pickle.dumps(binary))  # Closing a manager zeroes its binary tiers
+        self.assertEqual(bytes(restored_binary.binary()), bytes(binary.binary()))
+
+    def test_process_pool(self):
+        """
+        Process pool workers get the loaded tiers without fetching them.
+        """
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            results = list(executor.map(read_port, [self.secret_manager] * 2))
+        self.assertEqual(results, [(5678, True)] * 2)
@@ -0,0 +1,241 @@
+"""
+Tests for the secret providers: AWS providers with botocore's Stubber, and the file providers.
+"""
+import datetime
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import boto3
+from botocore.exceptions import ClientError
+from botocore.stub import Stubber
+
+from supersecret.manager import SecretManager
+from supersecret.providers import (DirectoryProvider, DotEnvProvider, JSONFileProvider, SSMParameterProvider,
+                                   SecretsManagerProvider)
+
+AWS_KWARGS = dict(region_name='us-east-1', aws_access_key_id='testing', aws_secret_access_key='testing')
+
+
+def parameter(name, value, version=1):
+    return {'Name': name, 'Type': 'String', 'Value': value, 'Version': version,
+            'LastModifiedDate': datetime.datetime(2024, 1, version)}
+
+
+class TestSSMParameterProvider(unittest.TestCase):
+    def setUp(self) -> None:
+        self.client = boto3.client('ssm', **AWS_KWARGS)
+        self.stubber = Stubber(self.client)
+        self.stubber.activate()
+
+    def tearDown(self) -> None:
+        self.stubber.deactivate()
+
+    def stub_pages(self, *pages, path='/app'):
+        token = None
+        for i, parameters in enumerate(pages):
+            expected = {'Path': path, 'Recursive': True, 'WithDecryption': True}
+            if token:
+                expected['NextToken'] = token
+            token = f'page-{i + 1}' if i + 1 < len(pages) else None
+            response = {'Parameters': parameters}
+            if token:
+                response['NextToken'] = token
+            self.stubber.add_response('get_parameters_by_path', response, expected)
+
+    def test_key(self):
+        """
+        Parameter names are mapped onto the `__` convention relative to the path.
+        """
+        self.assertEqual(SSMParameterProvider.key('/app/', '/app/database/host'), 'database__host')
+        self.assertEqual(SSMParameterProvider.key('/app/', '/app/debug'), 'debug')
+        self.assertEqual(SSMParameterProvider.key('/', '/database/options/ssl'), 'database__options__ssl')
+
+    def test_load_path(self):
+        """
+        All the pages of a path are merged into one tier.
+        """
+        self.stub_pages(
+            [parameter('/app/database/host', 'db.example.com'), parameter('/app/database/port', '5432')],
+            [parameter('/app/database/options/ssl', 'True'), parameter('/app/debug', 'false')],
+        )
+        secret_manager = SecretManager('TestingSecret')
+        secret_manager.load('/app', client=self.client, provider=SSMParameterProvider())
+        self.stubber.assert_no_pending_responses()
+
+        self.assertEqual(secret_manager.int('database__port'), 5432)
+        self.assertFalse(secret_manager.bool('debug'))
+        self.assertEqual(secret_manager.dict('database'),
+                         {'host': 'db.example.com', 'port': '5432', 'options': {'ssl': 'True'}})
+        self.assertEqual(secret_manager._secrets['/app'].CreatedDate, datetime.datetime(2024, 1, 1))
+
+    def test_reload_versions(self):
+        """
+        The tier version follows the parameter versions.
+        """
+        self.stub_pages([parameter('/app/debug', 'false')])
+        self.stub_pages([parameter('/app/debug', 'false')])
+        self.stub_pages([parameter('/app/debug', 'true', version=2)])
+        changes = []
+        secret_manager = SecretManager('TestingSecret')
+        secret_manager.subscribe('debug', changes.append)
+        secret_manager.load('/app', client=self.client, provider=SSMParameterProvider())
+        version = secret_manager._secrets['/app'].VersionId
+        secret_manager.reload('/app')
+        self.assertEqual(secret_manager._secrets['/app'].VersionId, version)
+        secret_manager.reload('/app')
+        self.assertNotEqual(secret_manager._secrets['/app'].VersionId, version)
+        self.assertEqual(changes[-1].changed, {'debug': ('false', 'true')})
+        self.assertTrue(secret_manager.bool('debug'))
+
+
+class TestSecretsManagerProvider(unittest.TestCase):
+    def setUp(self) -> None:
+        self.client = boto3.client('secretsmanager', **AWS_KWARGS)
+        self.stubber = Stubber(self.client)
+        self.stubber.activate()
+
+    def tearDown(self) -> None:
+        self.stubber.deactivate()
+
+    def test_stacked_with_ssm(self):
+        """
+        Secrets Manager and SSM tiers merge in load order.
+        """
+        self.stubber.add_response('get_secret_value', {
+            'ARN': 'arn:aws:secretsmanager:us-east-1:123456789012:secret:default-abcdef',
+            'Name': 'default',
+            'VersionId': 'EXAMPLE1-90ab-cdef-fedc-ba987EXAMPLE',
+            'SecretString': json.dumps({'database__host': 'localhost', 'database__user': 'app'}),
+            'VersionStages': ['AWSCURRENT'],
+        }, {'SecretId': 'default'})
+        ssm = boto3.client('ssm', **AWS_KWARGS)
+        with Stubber(ssm) as ssm_stubber:
+            ssm_stubber.add_response('get_parameters_by_path',
+                                     {'Parameters': [parameter('/service/database/host', 'db.example.com')]},
+                                     {'Path': '/service', 'Recursive': True, 'WithDecryption': True})
+            secret_manager = SecretManager('default')
+            secret_manager.load(client=self.client)
+            secret_manager.load('/service', provider=SSMParameterProvider(client=ssm))
+
+        self.assertEqual(secret_manager.dict('database'), {'host': 'db.example.com', 'user': 'app'})
+
+    def test_errors(self):
+        """
+        Client errors are raised for required secrets only.
+        """
+        self.stubber.add_client_error('get_secret_value', 'ResourceNotFoundException')
+        self.stubber.add_client_error('get_secret_value', 'ResourceNotFoundException')
+        secret_manager = SecretManager('missing')
+        self.assertIsNone(secret_manager.load(client=self.client))
+        self.assertRaises(ClientError, secret_manager.load, 'missing', self.client, True)
+
+    def test_provider_fetch(self):
+        """
+        The provider can be used on its own.
+        """
+        self.stubber.add_response('get_secret_value', {
+            'Name': 'default', 'VersionId': 'EXAMPLE1-90ab-cdef-fedc-ba987EXAMPLE',
+            'SecretString': json.dumps({'username': 'app'}),
+        }, {'SecretId': 'default'})
+        response = SecretsManagerProvider(lazy=True).fetch('default', self.client)
+        self.assertEqual(response.SecretValues.username, 'app')
+
+
+class TestFileProviders(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def write(self, name, content):
+        path = os.path.join(self.directory.name, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as file:
+            file.write(content)
+        return path
+
+    def test_json_file(self):
+        """
+        JSON files are tiers without any AWS client.
+        """
+        path = self.write('defaults.json', json.dumps({'username': 'file_username', 'database__port': '5432'}))
+        for lazy in (False, True):
+            secret_manager = SecretManager(path, provider=JSONFileProvider(lazy=lazy))
+            self.assertEqual(secret_manager.str('username'), 'file_username')
+            self.assertEqual(secret_manager.dict('database'), {'port': '5432'})
+            self.assertIsNone(secret_manager.client)
+
+    def test_dotenv(self):
+        """
+        .env lines, quotes and comments are parsed.
+        """
+        path = self.write('.env', '\n'.join([
+            '# A comment',
+            '',
+            'PLAIN=value',
+            'export EXPORTED=1',
+            'SPACED = spaced value  # trailing comment',
+            'URL=https://example.com/#anchor',
+            'DOUBLE="line\\nbreak \\"quoted\\"" # comment',
+            "SINGLE='literal \\n # not a comment'",
+            'EMPTY=',
+            'not a valid line',
+        ]))
+        values = DotEnvProvider().parse(path)
+        self.assertEqual(values, {
+            'PLAIN': 'value',
+            'EXPORTED': '1',
+            'SPACED': 'spaced value',
+            'URL': 'https://example.com/#anchor',
+            'DOUBLE': 'line\nbreak "quoted"',
+            'SINGLE': 'literal \\n # not a comment',
+            'EMPTY': '',
+        })
+        self.assertEqual(DotEnvProvider().parse(self.write('empty.env', '')), {})
+
+    def test_directory(self):
+        """
+        Directories map file names to keys, hidden entries are skipped.
+        """
+        self.write('mount/username', 'mounted\n')
+        self.write('mount/database__host', 'db.example.com')
+        self.write('mount/..data/username', 'hidden')
+        secret_manager = SecretManager()
+        secret_manager.load(os.path.join(self.directory.name, 'mount'), provider=DirectoryProvider())
+        self.assertEqual(secret_manager.str('username'), 'mounted')
+        self.assertEqual(secret_manager.dict('database'), {'host': 'db.example.com'})
+
+    def test_change_detection(self):
+        """
+        Files are only parsed again when they change.
+        """
+        path = self.write('settings.env', 'DEBUG=false\n')
+        provider = DotEnvProvider()
+        changes = []
+        secret_manager = SecretManager()
+        secret_manager.subscribe('DEBUG', changes.append)
+        with patch.object(provider, 'parse', wraps=provider.parse) as parse:
+            secret_manager.load(path, provider=provider)
+            secret_manager.reload(path)
+            self.assertEqual(parse.call_count, 1)
+
+            self.write('settings.env', 'DEBUG=true\n')
+            stat = os.stat(path)
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+            secret_manager.reload(path)
+            self.assertEqual(parse.call_count, 2)
+        self.assertTrue(secret_manager.bool('DEBUG'))
+        self.assertEqual(changes[-1].changed, {'DEBUG': ('false', 'true')})
+
+    def test_missing_file(self):
+        """
+        Missing files are skipped unless required.
+        """
+        path = os.path.join(self.directory.name, 'missing.json')
+        secret_manager = SecretManager()
+        self.assertIsNone(secret_manager.load(path, provider=JSONFileProvider()))
+        self.assertRaises(FileNotFoundError, secret_manager.load, path, None, True, JSONFileProvider())
@@ -0,0 +1,176 @@
+"""
+Tests for the multi-region replica provider.
+"""
+import pickle
+import time
+import unittest
+from unittest.mock import patch
+
+from botocore.exceptions import ClientError
+
+from supersecret.manager import SecretManager
+from supersecret.replicas import RegionStats, ReplicaProvider, ReplicaRouter
+from .test_manager import ReloadingSecretsClient
+
+
+class RegionSecretsClient(ReloadingSecretsClient):
+    """
+    Mock client of one region, with an injected delay or error.
+    """
+
+    def __init__(self, region, delay=0.0, fail=False):
+        super().__init__()
+        self.region = region
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+        self.update('TestingSecret', region, region=region)
+
+    def get_secret_value(self, SecretId):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.fail:
+            raise ClientError({'Error': {'Code': 'InternalServiceErrorException'}}, 'GetSecretValue')
+        return super().get_secret_value(SecretId)
+
+
+class TestRouter(unittest.TestCase):
+    """
+    Tests for the region statistics and ranking.
+    """
+
+    def test_stats(self):
+        """
+        Latency and error rate are moving averages, the p95 uses the recent latencies.
+        """
+        stats = RegionStats(alpha=0.5)
+        for seconds in (0.1, 0.2):
+            stats.success(seconds)
+        self.assertAlmostEqual(stats.latency, 0.15)
+        stats.error()
+        stats.error()
+        self.assertAlmostEqual(stats.error_rate, 0.75)
+        stats.success(0.3)
+        self.assertAlmostEqual(stats.error_rate, 0.375)
+        for i in range(20):
+            stats.success(i / 100)
+        self.assertEqual(stats.percentile(95), 0.2)  # Nearest rank: the 22nd of 23 latencies
+        self.assertIsNone(RegionStats().percentile(95))
+
+    def test_ranked(self):
+        """
+        Healthy regions from the fastest, unmeasured ones in order, unhealthy ones until their cooldown ends.
+        """
+        router = ReplicaRouter(['us-east-1', 'us-west-2', 'eu-west-1'], alpha=0.5, cooldown=30)
+        self.assertEqual(router.ranked(), ['us-east-1', 'us-west-2', 'eu-west-1'])
+        router.success('eu-west-1', 0.05)
+        router.success('us-west-2', 0.01)
+        self.assertEqual(router.ranked(), ['us-west-2', 'eu-west-1', 'us-east-1'])
+        router.error('us-west-2')
+        router.error('us-west-2')
+        self.assertEqual(router.ranked(), ['eu-west-1', 'us-east-1', 'us-west-2'])
+        self.assertFalse(router.as_dict()['us-west-2']['healthy'])
+        with patch('supersecret.replicas.time.monotonic', return_value=time.monotonic() + 31):
+            self.assertEqual(router.ranked()[0], 'us-west-2')
+
+    def test_hedge_delay(self):
+        """
+        The hedging delay is the default until the region has enough samples, then its p95.
+        """
+        router = ReplicaRouter(['us-east-1'], min_samples=3)
+        router.success('us-east-1', 0.01)
+        self.assertEqual(router.hedge_delay('us-east-1', 0.2), 0.2)
+        router.success('us-east-1', 0.02)
+        router.success('us-east-1', 0.03)
+        self.assertEqual(router.hedge_delay('us-east-1', 0.2), 0.03)
+
+
+class TestReplicaProvider(unittest.TestCase):
+    """
+    Tests for loads through the replica provider.
+    """
+
+    def build(self, **clients):
+        self.clients = clients
+        self.provider = ReplicaProvider(list(clients), clients=clients, hedge_delay=0.02, min_samples=3)
+        self.secret_manager = SecretManager('TestingSecret', provider=self.provider)
+        self.addCleanup(self.secret_manager.close)
+        self.addCleanup(self.provider.close)
+
+    def test_routes_to_fastest(self):
+        """
+        A slow preferred region is hedged, and the next loads go to the fastest region.
+        """
+        self.build(east=RegionSecretsClient('east', delay=0.2), west=RegionSecretsClient('west'))
+        start = time.monotonic()
+        self.assertEqual(self.secret_manager.str('region'), 'west')
+        self.assertLess(time.monotonic() - start, 0.15)
+        self.assertEqual(self.clients['west'].calls, 1)
+
+        for _ in range(3):
+            self.secret_manager.reload()
+        self.assertEqual(self.clients['west'].calls, 4)
+        self.assertEqual(self.clients['east'].calls, 1)
+        time.sleep(0.25)  # The losing hedged request is still recorded
+        self.assertEqual(self.provider.router.ranked(), ['west', 'east'])
+        self.assertIsNotNone(self.provider.stats()['east']['latency_ms'])
+
+    def test_fails_over(self):
+        """
+        Errors fail over to the next region, which is preferred from then on.
+        """
+        self.build(east=RegionSecretsClient('east', fail=True), west=RegionSecretsClient('west', delay=0.01))
+        self.assertEqual(self.secret_manager.load(required=True).VersionId, 'west')
+        self.secret_manager.reload()
+        self.assertEqual(self.clients['east'].calls, 1)
+        self.assertEqual(self.provider.router.ranked(), ['west', 'east'])
+        self.assertEqual(self.provider.stats()['east']['error_rate'], 0.2)
+
+        self.clients['west'].fail = True
+        self.assertIsNone(SecretManager('TestingSecret', provider=self.provider).load())
+        with self.assertRaises(ClientError):
+            SecretManager('TestingSecret', provider=self.provider).load(required=True)
+        self.assertEqual(self.clients['east'].calls, 3)  # Every region is tried
+
+    def test_hedges_after_fail_over(self):
+        """
+        The region failed over to is hedged too, after its own delay.
+        """
+        self.build(a=RegionSecretsClient('a', delay=0.1, fail=True), b=RegionSecretsClient('b', fail=True),
+                   c=RegionSecretsClient('c', delay=0.5), d=RegionSecretsClient('d'))
+        start = time.monotonic()
+        self.assertEqual(self.provider.fetch('TestingSecret').VersionId, 'd')
+        self.assertLess(time.monotonic() - start, 0.4)
+        self.assertEqual(self.clients['c'].calls, 1)
+
+    def test_close(self):
+        """
+        Closing the manager closes its provider.
+        """
+        self.build(east=RegionSecretsClient('east'))
+        self.secret_manager.load()
+        self.assertIsNotNone(self.provider._executor)
+        self.secret_manager.close()
+        self.assertIsNone(self.provider._executor)
+
+    def test_no_hedge(self):
+        """
+        Without hedging a slow region is waited for.
+        """
+        east, west = RegionSecretsClient('east', delay=0.05), RegionSecretsClient('west')
+        provider = ReplicaProvider(['east', 'west'], clients={'east': east, 'west': west}, hedge=False)
+        self.addCleanup(provider.close)
+        self.assertEqual(provider.fetch('TestingSecret').VersionId, 'east')
+        self.assertEqual(west.calls, 0)
+
+    def test_pickle(self):
+        """
+        Clients and statistics are process-local.
+        """
+        self.build(east=RegionSecretsClient('east'))
+        self.secret_manager.load()
+        restored = pickle.loads(pickle.dumps(self.secret_manager))
+        self.assertEqual(restored.provider.router.regions, ['east'])
+        self.assertEqual(restored.provider.clients, {})
+        self.assertIsNone(restored.provider.stats()['east']['latency_ms'])
+        self.assertEqual(restored.str('region'), 'east')
@@ -0,0 +1,152 @@
+"""
+Tests for the lazy settings bridge.
+"""
+import os
+import unittest
+from unittest.mock import patch
+
+import marshmallow as ma
+
+from supersecret import fields
+from supersecret.manager import SecretManager
+from supersecret.settings import LazyValue, SecretSettings, Setting, install_flask
+from .test_manager import ReloadingSecretsClient
+
+
+class Settings(SecretSettings):
+    USERNAME = Setting(key='username')
+    PORT = Setting(fields.Int, key='database.port')
+    DEBUG = Setting(fields.Bool, default='false')
+
+
+class ServiceSettings(Settings):
+    TIMEOUT = Setting(fields.Float, key='test_float')
+
+
+class Config(dict):
+    """
+    Stand-in for flask.Config
+    """
+
+    def __init__(self, root_path):
+        super().__init__()
+        self.root_path = root_path
+
+
+class TestSettings(unittest.TestCase):
+    """
+    Tests for SecretSettings
+    """
+
+    def setUp(self) -> None:
+        self.client = ReloadingSecretsClient()
+        self.secret_manager = SecretManager('TestingSecret')
+        self.secret_manager.client = self.client
+
+    def test_resolve_once(self):
+        """
+        Nothing is loaded until a setting is read, then the value is a plain attribute.
+        """
+        settings = ServiceSettings(self.secret_manager)
+        self.assertEqual(list(ServiceSettings._settings), ['USERNAME', 'PORT', 'DEBUG', 'TIMEOUT'])
+        self.assertFalse(self.secret_manager._secrets)
+
+        self.assertEqual(settings.PORT, 1234)
+        self.assertIn('TestingSecret', self.secret_manager._secrets)
+        self.assertEqual(settings.__dict__['PORT'], 1234)
+        with patch.object(SecretManager, 'many') as mock_many:
+            self.assertEqual(settings.PORT, 1234)
+            mock_many.assert_not_called()
+        self.assertIs(settings.DEBUG, False)
+        self.assertIsInstance(ServiceSettings.PORT, Setting)
+
+    def test_warm(self):
+        """
+        warm() resolves the remaining settings in one pass and reports every error.
+        """
+        settings = ServiceSettings(self.secret_manager)
+        settings.USERNAME
+        with patch.object(SecretManager, 'many', wraps=self.secret_manager.many) as mock_many:
+            self.assertEqual(settings.warm().as_dict(),
+                             {'USERNAME': 'test_username', 'PORT': 1234, 'DEBUG': False, 'TIMEOUT': 1.234})
+            self.assertEqual(mock_many.call_count, 1)
+            self.assertEqual(set(mock_many.call_args[0][0]), {'database.port', 'DEBUG', 'test_float'})
+
+        class Invalid(SecretSettings):
+            PORT = Setting(fields.Int, key='username')
+            MISSING = Setting()
+        with self.assertRaises(ma.ValidationError) as context:
+            Invalid(self.secret_manager).warm()
+        self.assertEqual(set(context.exception.messages), {'username', 'MISSING'})
+
+    def test_warm_same_key(self):
+        """
+        Settings reading the same key with other fields keep their own conversion.
+        """
+        class Ports(SecretSettings):
+            PORT = Setting(fields.Int, key='database.port')
+            PORT_STR = Setting(key='database.port')
+        self.assertEqual(Ports(self.secret_manager).warm().as_dict(), {'PORT': 1234, 'PORT_STR': '1234'})
+        settings = Ports(self.secret_manager)
+        self.assertEqual((settings.PORT, settings.PORT_STR), (1234, '1234'))
+
+    def test_reset(self):
+        """
+        Resolved settings are kept across reloads until reset.
+        """
+        settings = Settings(self.secret_manager)
+        self.assertEqual(settings.USERNAME, 'test_username')
+        self.client.update('TestingSecret', '654321', username='rotated')
+        self.secret_manager.reload()
+        self.assertEqual(settings.USERNAME, 'test_username')
+        settings.reset()
+        self.assertEqual(settings.USERNAME, 'rotated')
+
+    def test_lazy_values(self):
+        """
+        Proxies for settings modules resolve on first use and behave like their value.
+        """
+        namespace = {}
+        namespace.update(Settings(self.secret_manager).lazy())
+        self.assertIsInstance(namespace['PORT'], LazyValue)
+        self.assertFalse(self.secret_manager._secrets)
+        self.assertEqual(repr(namespace['PORT']), '<LazyValue PORT (not resolved)>')
+
+        self.assertEqual(namespace['PORT'] + 1, 1235)
+        self.assertEqual(1 + namespace['PORT'], 1235)
+        self.assertEqual(int(namespace['PORT']), 1234)
+        self.assertFalse(namespace['DEBUG'])
+        self.assertEqual(namespace['USERNAME'], 'test_username')
+        self.assertEqual(f'{namespace["USERNAME"]}', 'test_username')
+        self.assertEqual(namespace['USERNAME'].upper(), 'TEST_USERNAME')
+        self.assertEqual({namespace['USERNAME']: 1}, {'test_username': 1})
+        self.assertEqual(os.path.join('/tmp', str(namespace['USERNAME'])), '/tmp/test_username')
+
+        class DjangoSettings(Settings):
+            ALLOWED_HOSTS = Setting(fields.Choices, key='test_choices')
+        exported = DjangoSettings(self.secret_manager).lazy()
+        self.assertEqual(exported['ALLOWED_HOSTS'], [('test1', 'test2'), ('test3', 'test4')])
+        self.assertIsInstance(exported['ALLOWED_HOSTS'], list)  # Django rejects anything but a list or tuple
+        self.assertIsInstance(exported['USERNAME'], LazyValue)
+
+    def test_flask_config(self):
+        """
+        Declared settings missing from the config are resolved on first read and stored.
+        """
+        config = Config('/app')
+        config['DEBUG'] = True
+        app = type('App', (), {'config': config})()
+        install_flask(app, Settings(self.secret_manager))
+        self.assertIsInstance(app.config, Config)
+        self.assertEqual(app.config.root_path, '/app')
+        self.assertFalse(self.secret_manager._secrets)
+
+        self.assertIs(app.config['DEBUG'], True)  # Set in the config
+        self.assertIn('PORT', app.config)
+        self.assertEqual(app.config['PORT'], 1234)
+        self.assertEqual(dict.__getitem__(app.config, 'PORT'), 1234)
+        self.assertEqual(app.config.get('USERNAME'), 'test_username')
+        self.assertIsNone(app.config.get('OTHER'))
+        with self.assertRaises(KeyError):
+            app.config['OTHER']
+        self.assertIs(install_flask(app, Settings(self.secret_manager)).__class__, app.config.__class__)
@@ -0,0 +1,124 @@
+"""
+Tests for snapshot export and import.
+"""
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from botocore.config import Config
+
+from supersecret.exceptions import InvalidSnapshotException
+from supersecret.manager import SecretManager
+from supersecret.snapshot import SnapshotValues, read_snapshot
+from .test_manager import MockSecretsClient, ReloadingSecretsClient
+
+try:
+    import cryptography  # noqa: F401
+    HAS_CRYPTOGRAPHY = True
+except ImportError:
+    HAS_CRYPTOGRAPHY = False
+
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'secrets.snapshot')
+        self.secret_manager = SecretManager('TestingSecret')
+        self.secret_manager.load(client=MockSecretsClient())
+        self.secret_manager.load('TestingSecret2', client=MockSecretsClient())
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_round_trip(self):
+        """
+        A snapshot keeps the tiers, their versions and their precedence.
+        """
+        self.secret_manager.export_snapshot(self.path)
+        secret_manager = SecretManager.from_snapshot(self.path)
+
+        self.assertEqual(list(secret_manager._secrets), ['TestingSecret', 'TestingSecret2'])
+        self.assertEqual(secret_manager._secrets['TestingSecret'].VersionId, '123456')
+        self.assertEqual(secret_manager.str('username'), 'new_username')
+        self.assertEqual(secret_manager.int('test_int'), 5678)
+        self.assertEqual(secret_manager.dict('database'), self.secret_manager.dict('database'))
+        self.assertEqual(dict(secret_manager._secrets['TestingSecret'].SecretValues.items()),
+                         dict(self.secret_manager._secrets['TestingSecret'].SecretValues.items()))
+
+    def test_lazy_values(self):
+        """
+        Values are decoded on first access.
+        """
+        self.secret_manager.export_snapshot(self.path)
+        snapshot = read_snapshot(self.path)
+        name, response = snapshot.tiers[0]
+        values = response.SecretValues.data
+        self.assertEqual(name, 'TestingSecret')
+        self.assertIsInstance(values, SnapshotValues)
+        self.assertIn('username', values)
+        self.assertEqual(values._decoded, {})
+        self.assertEqual(response.SecretValues.username, 'test_username')
+        self.assertEqual(values._decoded, {'username': 'test_username'})
+
+    def test_max_age(self):
+        """
+        A snapshot older than max_age reloads the tiers from AWS.
+        """
+        self.secret_manager.export_snapshot(self.path)
+        client = ReloadingSecretsClient()
+        client.update('TestingSecret2', '765432', username='live_username')
+        with patch.object(SecretManager, 'connect') as mock_connect_to_session:
+            mock_connect_to_session.return_value = client
+            secret_manager = SecretManager.from_snapshot(self.path, max_age=3600)
+            self.assertEqual(secret_manager.str('username'), 'new_username')
+            mock_connect_to_session.assert_not_called()
+
+            secret_manager = SecretManager.from_snapshot(self.path, max_age=0)
+            self.assertEqual(secret_manager.str('username'), 'live_username')
+            self.assertEqual(secret_manager._secrets['TestingSecret2'].VersionId, '765432')
+
+    def test_max_age_offline(self):
+        """
+        Tiers that can't be fetched (no network) keep their snapshot values.
+        """
+        self.secret_manager.export_snapshot(self.path)
+        secret_manager = SecretManager.from_snapshot(
+            self.path, max_age=0, endpoint_url='http://127.0.0.1:1', region_name='us-east-1',
+            aws_access_key_id='testing', aws_secret_access_key='testing',
+            config=Config(retries={'max_attempts': 1}, connect_timeout=1))
+        self.assertEqual(secret_manager.str('username'), 'new_username')
+        self.assertEqual(secret_manager._secrets['TestingSecret2'].VersionId, '123457')
+        secret_manager.close()
+
+    def test_invalid(self):
+        """
+        Invalid files raise InvalidSnapshotException.
+        """
+        with open(self.path, 'wb') as file:
+            file.write(b'not a snapshot file at all')
+        self.assertRaises(InvalidSnapshotException, read_snapshot, self.path)
+        open(self.path, 'wb').close()
+        self.assertRaises(InvalidSnapshotException, read_snapshot, self.path)
+
+    @unittest.skipUnless(HAS_CRYPTOGRAPHY, 'cryptography is not installed')
+    def test_encrypted(self):
+        """
+        Encrypted snapshots need the key to be read.
+        """
+        key = os.urandom(32)
+        self.secret_manager.export_snapshot(self.path, key=key)
+        with open(self.path, 'rb') as file:
+            self.assertNotIn(b'new_username', file.read())
+        self.assertRaises(InvalidSnapshotException, read_snapshot, self.path)
+        self.assertRaises(InvalidSnapshotException, read_snapshot, self.path, key=os.urandom(32))
+        secret_manager = SecretManager.from_snapshot(self.path, key=key)
+        self.assertEqual(secret_manager.str('username'), 'new_username')
+
+    def test_key_requires_encryption(self):
+        """
+        With a key, an unencrypted snapshot is rejected.
+        """
+        self.secret_manager.export_snapshot(self.path)
+        self.assertRaises(InvalidSnapshotException, read_snapshot, self.path, key=os.urandom(32))
+        self.assertRaises(InvalidSnapshotException, SecretManager.from_snapshot, self.path, key=os.urandom(32))
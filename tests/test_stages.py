@@ -0,0 +1,131 @@
+"""
+Tests for serving several version stages of a tier.
+"""
+import json
+import pickle
+import unittest
+
+import boto3
+from botocore.stub import Stubber
+
+from supersecret.manager import SecretManager
+from .test_providers import AWS_KWARGS
+
+
+def version(version_id, stages, **values):
+    return {'ARN': 'arn:aws:secretsmanager:us-east-1:123456789012:secret:database-abcdef', 'Name': 'database',
+            'VersionId': version_id, 'SecretString': json.dumps(values), 'VersionStages': stages}
+
+
+class TestStages(unittest.TestCase):
+    """
+    Tests for load(..., stages=...) and value(name, stage=...)
+    """
+
+    def setUp(self) -> None:
+        self.client = boto3.client('secretsmanager', **AWS_KWARGS)
+        self.stubber = Stubber(self.client)
+        self.stubber.activate()
+        self.secret_manager = SecretManager('database')
+
+    def tearDown(self) -> None:
+        self.stubber.deactivate()
+
+    def expect(self, response, stage=None):
+        expected = {'SecretId': 'database'}
+        if stage is not None:
+            expected['VersionStage'] = stage
+        self.stubber.add_response('get_secret_value', response, expected)
+
+    def expect_rotation(self, pending=None):
+        self.expect(version('v2aaaaaaaaaaaaaaaaaaaaaaaaaaaaaaa', ['AWSCURRENT'], password='current',
+                            options={'user': 'app'}))
+        self.expect(version('v1aaaaaaaaaaaaaaaaaaaaaaaaaaaaaaa', ['AWSPREVIOUS'], password='previous',
+                            options={'user': 'old_app'}), 'AWSPREVIOUS')
+        if pending is None:
+            self.stubber.add_client_error('get_secret_value', 'ResourceNotFoundException',
+                                          expected_params={'SecretId': 'database', 'VersionStage': 'AWSPENDING'})
+        else:
+            self.expect(version('v3aaaaaaaaaaaaaaaaaaaaaaaaaaaaaaa', ['AWSPENDING'], password=pending), 'AWSPENDING')
+
+    def test_stage_values(self):
+        """
+        The stages are fetched with the tier and served locally, stages without a version are skipped.
+        """
+        self.expect_rotation()
+        self.secret_manager.load(client=self.client, stages=['AWSCURRENT', 'AWSPREVIOUS', 'AWSPENDING'])
+        self.stubber.assert_no_pending_responses()
+
+        self.assertEqual(self.secret_manager.value('password'), 'current')
+        self.assertEqual(self.secret_manager.value('password', stage='AWSCURRENT'), 'current')
+        self.assertEqual(self.secret_manager.value('password', stage='AWSPREVIOUS'), 'previous')
+        self.assertEqual(self.secret_manager.value('options.user', stage='AWSPREVIOUS'), 'old_app')
+        self.assertEqual(self.secret_manager.value('password', stage='AWSPENDING', default=None), None)
+        with self.assertRaises(KeyError):
+            self.secret_manager.value('password', stage='AWSPENDING')
+        self.assertEqual(set(self.secret_manager._secrets['database'].Stages), {'AWSCURRENT', 'AWSPREVIOUS'})
+
+    def test_reload_refreshes_stages(self):
+        """
+        A reload fetches the stages again, even if the current version did not change.
+        """
+        self.expect_rotation()
+        self.expect_rotation(pending='pending')
+        changes = []
+        self.secret_manager.subscribe('password', changes.append)
+        self.secret_manager.load(client=self.client, stages=['AWSPREVIOUS', 'AWSPENDING'])
+        self.secret_manager.reload()
+        self.stubber.assert_no_pending_responses()
+        self.assertEqual(self.secret_manager.value('password', stage='AWSPENDING'), 'pending')
+        self.assertEqual(self.secret_manager.value('password'), 'current')
+        self.assertEqual(len(changes), 1)  # Only the load changed the current values
+
+        restored = pickle.loads(pickle.dumps(self.secret_manager))
+        self.assertEqual(restored.value('password', stage='AWSPREVIOUS'), 'previous')
+
+    def test_transient_stage_error(self):
+        """
+        A stage that fails to fetch on reload keeps its previous version, a stage without a version is dropped.
+        """
+        self.expect(version('v2aaaaaaaaaaaaaaaaaaaaaaaaaaaaaaa', ['AWSCURRENT'], password='current'))
+        self.expect(version('v1aaaaaaaaaaaaaaaaaaaaaaaaaaaaaaa', ['AWSPREVIOUS'], password='previous'), 'AWSPREVIOUS')
+        self.expect(version('v4aaaaaaaaaaaaaaaaaaaaaaaaaaaaaaa', ['AWSCURRENT'], password='rotated'))
+        self.stubber.add_client_error('get_secret_value', 'ThrottlingException',
+                                      expected_params={'SecretId': 'database', 'VersionStage': 'AWSPREVIOUS'})
+        self.expect(version('v4aaaaaaaaaaaaaaaaaaaaaaaaaaaaaaa', ['AWSCURRENT'], password='rotated'))
+        self.stubber.add_client_error('get_secret_value', 'ResourceNotFoundException',
+                                      expected_params={'SecretId': 'database', 'VersionStage': 'AWSPREVIOUS'})
+        self.secret_manager.load(client=self.client, stages=['AWSPREVIOUS'])
+        self.secret_manager.reload()
+        self.assertEqual(self.secret_manager.value('password'), 'rotated')
+        self.assertEqual(self.secret_manager.value('password', stage='AWSPREVIOUS'), 'previous')
+        self.secret_manager.reload()
+        self.stubber.assert_no_pending_responses()
+        self.assertEqual(self.secret_manager.value('password', stage='AWSPREVIOUS', default=None), None)
+
+    def test_stage_of_serving_tier(self):
+        """
+        Stage values come from the tier serving the key, never from a lower tier.
+        """
+        shared = dict(version('s2aaaaaaaaaaaaaaaaaaaaaaaaaaaaaaa', ['AWSCURRENT'], password='shared', host='shared'),
+                      Name='shared')
+        self.stubber.add_response('get_secret_value', shared, {'SecretId': 'shared'})
+        self.stubber.add_response('get_secret_value', dict(shared, SecretString=json.dumps({'password': 'old'}),
+                                                           VersionId='s1aaaaaaaaaaaaaaaaaaaaaaaaaaaaaaa'),
+                                  {'SecretId': 'shared', 'VersionStage': 'AWSPREVIOUS'})
+        self.expect(version('v2aaaaaaaaaaaaaaaaaaaaaaaaaaaaaaa', ['AWSCURRENT'], password='current'))
+        self.secret_manager.load('shared', client=self.client, stages=['AWSPREVIOUS'])
+        self.secret_manager.load(client=self.client)
+        self.assertEqual(self.secret_manager.value('password'), 'current')
+        with self.assertRaises(KeyError):
+            self.secret_manager.value('password', stage='AWSPREVIOUS')
+        self.assertEqual(self.secret_manager.value('host', stage='AWSPREVIOUS', default=None), None)
+
+    def test_without_stages(self):
+        """
+        Tiers loaded without stages only serve the current version.
+        """
+        self.expect(version('v2aaaaaaaaaaaaaaaaaaaaaaaaaaaaaaa', ['AWSCURRENT'], password='current'))
+        self.secret_manager.load(client=self.client)
+        self.assertEqual(self.secret_manager.value('password', stage='AWSPREVIOUS', default='none'), 'none')
+        self.assertIsNone(self.secret_manager._secrets['database'].Stages)
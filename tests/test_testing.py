@@ -0,0 +1,144 @@
+"""
+Tests for the fake Secrets Manager server and the load generator.
+"""
+import time
+import unittest
+from functools import partial
+
+from botocore.exceptions import ClientError
+
+from supersecret.manager import SecretManager
+from supersecret.testing import FakeSecretsManager, load_test, percentile
+
+
+class TestFakeServer(unittest.TestCase):
+    """
+    Tests for the Secrets Manager API served by FakeSecretsManager
+    """
+
+    def setUp(self) -> None:
+        self.server = FakeSecretsManager({'app': {'username': 'app', 'database': {'host': 'localhost'}}}).start()
+        self.addCleanup(self.server.stop)
+        self.secret_manager = SecretManager('app', **self.server.aws_kwargs())
+        self.addCleanup(self.secret_manager.close)
+
+    def test_get_secret_value(self):
+        """
+        Secrets are fetched through boto3, rotations move the stage labels.
+        """
+        self.assertEqual(self.secret_manager.str('database.host'), 'localhost')
+        first = self.secret_manager.load().VersionId
+
+        self.server.rotate('app', username='rotated')
+        self.server.put('app', {'username': 'pending'}, stages=['AWSPENDING'])
+        self.secret_manager.load('app', stages=['AWSPREVIOUS', 'AWSPENDING'])
+        self.secret_manager.reload()
+        self.assertEqual(self.secret_manager.str('username'), 'rotated')
+        self.assertEqual(self.secret_manager.value('username', stage='AWSPREVIOUS'), 'app')
+        self.assertEqual(self.secret_manager.value('username', stage='AWSPENDING'), 'pending')
+        self.assertEqual(self.secret_manager._secrets['app'].Stages['AWSPREVIOUS'].VersionId, first)
+
+        self.server.put('certificate', binary=b'\x00\x01')
+        self.secret_manager.load('certificate')
+        self.assertEqual(bytes(self.secret_manager.binary('certificate')), b'\x00\x01')
+        self.assertEqual(self.server.stats(), {'calls': {'GetSecretValue': 5}, 'errors': {}})
+
+    def test_list_secrets(self):
+        """
+        ListSecrets is paginated and filtered, `discover` works against it.
+        """
+        self.server.put('org/default', {'level': 'default'}, tags={'team': 'payments'})
+        self.server.put('org/service', {'level': 'service'}, tags={'team': 'payments'})
+        self.server.put('org/other', {'level': 'other'}, tags={'team': 'search'})
+        client = self.server.client()
+        page = client.list_secrets(MaxResults=2, Filters=[{'Key': 'name', 'Values': ['ORG/']}])
+        self.assertEqual([secret['Name'] for secret in page['SecretList']], ['org/default', 'org/other'])
+        self.assertEqual(page['NextToken'], '2')
+
+        self.assertEqual(self.secret_manager.discover('org/', tags={'team': 'payments'}),
+                         ['org/default', 'org/service'])
+        self.assertEqual(self.secret_manager.str('level'), 'service')
+
+    def test_failures(self):
+        """
+        Injected errors, random errors, throttling and unknown secrets are AWS errors.
+        """
+        self.server.inject('InternalServiceError')
+        self.assertIsNone(self.secret_manager.load())
+        self.assertEqual(self.secret_manager.load().Name, 'app')
+        with self.assertRaises(ClientError) as context:
+            self.secret_manager.load('missing', required=True)
+        self.assertEqual(context.exception.response['Error']['Code'], 'ResourceNotFoundException')
+
+        self.server.error_rate = 1.0
+        with self.assertRaises(ClientError):
+            self.secret_manager.reload(required=True)
+        self.server.error_rate = 0.0
+        self.server.throttle(1.0)
+        self.secret_manager.reload(required=True)
+        with self.assertRaises(ClientError) as context:
+            self.secret_manager.reload(required=True)
+        self.assertEqual(context.exception.response['Error']['Code'], 'ThrottlingException')
+        self.assertEqual(self.server.stats()['errors'], {'InternalServiceError': 2, 'ResourceNotFoundException': 1,
+                                                         'ThrottlingException': 1})
+
+    def test_latency(self):
+        """
+        Every call is delayed by the latency.
+        """
+        self.server.latency = 0.05
+        start = time.monotonic()
+        self.secret_manager.load()
+        self.assertGreaterEqual(time.monotonic() - start, 0.05)
+
+
+class TestLoadTest(unittest.TestCase):
+    """
+    Tests for load_test
+    """
+
+    def setUp(self) -> None:
+        self.server = FakeSecretsManager({'app': {'username': 'app'}}, latency=0.01).start()
+        self.addCleanup(self.server.stop)
+        self.secret_manager = SecretManager('app', **self.server.aws_kwargs())
+        self.addCleanup(self.secret_manager.close)
+        self.secret_manager.load()
+
+    def test_threads(self):
+        """
+        Reads keep being served while a background thread reloads, the AWS calls of the run are reported.
+        """
+        report = load_test(partial(self.secret_manager.str, 'username'), workers=4, duration=0.2,
+                           server=self.server, background=self.secret_manager.reload, interval=0.02)
+        self.assertEqual(report['mode'], 'threads')
+        self.assertGreater(report['operations'], 4)
+        self.assertEqual(report['errors'], {})
+        self.assertGreater(report['background']['calls'], 0)
+        self.assertEqual(report['aws']['calls']['GetSecretValue'], report['background']['calls'])
+        self.assertLessEqual(report['latency_ms']['p50'], report['latency_ms']['p99'])
+
+    def test_asyncio_and_processes(self):
+        """
+        Coroutine functions are awaited by the tasks, processes use a pickled manager.
+        """
+        async def read():
+            return self.secret_manager.str('username')
+        report = load_test(read, workers=3, iterations=5, mode='asyncio')
+        self.assertEqual(report['operations'], 15)
+
+        report = load_test(self.secret_manager.reload, workers=2, iterations=2, mode='processes', server=self.server)
+        self.assertEqual(report['operations'], 4)
+        self.assertEqual(report['aws'], {'calls': {'GetSecretValue': 4}, 'errors': {}})
+
+    def test_errors(self):
+        """
+        Failed operations are counted by type, a limit is required.
+        """
+        self.server.inject('InternalServiceError', count=2)
+        report = load_test(partial(self.secret_manager.reload, required=True), workers=1, iterations=3)
+        self.assertEqual(report['errors'], {'InternalServiceError': 2})  # botocore's modeled error class
+        self.assertEqual(report['operations'], 3)
+        with self.assertRaises(ValueError):
+            load_test(self.secret_manager.reload)
+        self.assertEqual(percentile([0.1, 0.2, 0.3], 50), 0.2)
+        self.assertIsNone(percentile([], 99))
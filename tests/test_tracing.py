@@ -0,0 +1,112 @@
+"""
+Tests for the supersecret.tracing module.
+"""
+import json
+import unittest
+
+from supersecret.manager import SecretManager
+from supersecret.tracing import NOOP_SPAN, NoopTracer, OpenTelemetryTracer, RecordingTracer
+from .test_manager import ReloadingSecretsClient, SECRETS_MOCK
+
+try:
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+    HAS_OPENTELEMETRY = True
+except ImportError:
+    HAS_OPENTELEMETRY = False
+
+LOAD_TREE = ('supersecret.load', [
+    ('supersecret.fetch', [('supersecret.decode', []), ('supersecret.dto', [])]),
+    ('supersecret.index', []),
+])
+
+
+class TestRecordingTracer(unittest.TestCase):
+    """
+    Tests for the spans emitted by the manager.
+    """
+
+    def setUp(self) -> None:
+        self.client = ReloadingSecretsClient()
+        self.tracer = RecordingTracer()
+        self.secret_manager = SecretManager('TestingSecret', tracer=self.tracer)
+
+    def test_noop_by_default(self):
+        """
+        The default tracer records nothing and always hands out the same span.
+        """
+        secret_manager = SecretManager('TestingSecret')
+        self.assertIsInstance(secret_manager.tracer, NoopTracer)
+        with secret_manager.tracer.span('supersecret.load') as span:
+            self.assertIs(span, NOOP_SPAN)
+
+    def test_load_span_tree(self):
+        """
+        A load has a fetch span (with the decode and dto spans) and an index span.
+        """
+        self.secret_manager.load(client=self.client)
+        self.secret_manager.load(client=self.client)
+        self.assertEqual([root.tree() for root in self.tracer.roots], [LOAD_TREE, ('supersecret.load', [])])
+
+        load, cached = self.tracer.roots
+        self.assertEqual(load.attributes['supersecret.cache'], 'miss')
+        self.assertEqual(load.attributes['supersecret.version_id'], '123456')
+        self.assertEqual(cached.attributes['supersecret.cache'], 'hit')
+        fetch, index = load.children
+        self.assertEqual(fetch.attributes['supersecret.operation'], 'GetSecretValue')
+        decode = fetch.children[0]
+        self.assertEqual(decode.attributes['supersecret.payload_size'],
+                         len(SECRETS_MOCK['TestingSecret']['SecretString']))
+        self.assertEqual(index.attributes['supersecret.key_count'], 20)
+        self.assertIsNotNone(load.duration)
+
+    def test_refresh_spans(self):
+        """
+        Refresh has a reload span per tier with the cache outcome.
+        """
+        self.secret_manager.load(client=self.client)
+        self.client.update('TestingSecret', '654321', username='changed')
+        self.secret_manager.refresh()
+        self.secret_manager.refresh()
+        first, second = self.tracer.roots[1:]
+        self.assertEqual(first.tree(), ('supersecret.refresh', [('supersecret.reload', LOAD_TREE[1])]))
+        self.assertEqual(first.children[0].attributes['supersecret.cache'], 'miss')
+        self.assertEqual(second.children[0].attributes['supersecret.cache'], 'unchanged')
+
+    def test_no_secret_values(self):
+        """
+        Span attributes never contain secret values.
+        """
+        self.secret_manager.load(client=self.client)
+        values = set(json.loads(SECRETS_MOCK['TestingSecret']['SecretString']).values())
+        for span in self.tracer.spans():
+            self.assertFalse(values & set(map(str, span.attributes.values())), span)
+
+
+@unittest.skipUnless(HAS_OPENTELEMETRY, 'opentelemetry-sdk is not installed')
+class TestOpenTelemetryTracer(unittest.TestCase):
+    """
+    Tests for the OpenTelemetry adapter.
+    """
+
+    def test_span_tree(self):
+        """
+        Spans are exported with their parents and attributes.
+        """
+        exporter = InMemorySpanExporter()
+        provider = TracerProvider()
+        provider.add_span_processor(SimpleSpanProcessor(exporter))
+        secret_manager = SecretManager('TestingSecret', tracer=OpenTelemetryTracer(provider))
+        secret_manager.load(client=ReloadingSecretsClient())
+
+        spans = {span.name: span for span in exporter.get_finished_spans()}
+        self.assertEqual(set(spans), {'supersecret.load', 'supersecret.fetch', 'supersecret.decode',
+                                      'supersecret.dto', 'supersecret.index'})
+        load = spans['supersecret.load']
+        self.assertIsNone(load.parent)
+        self.assertEqual(spans['supersecret.fetch'].parent.span_id, load.context.span_id)
+        self.assertEqual(spans['supersecret.index'].parent.span_id, load.context.span_id)
+        self.assertEqual(spans['supersecret.decode'].parent.span_id, spans['supersecret.fetch'].context.span_id)
+        self.assertEqual(load.attributes['supersecret.secret_name'], 'TestingSecret')
+        self.assertEqual(load.attributes['supersecret.cache'], 'miss')